@@ -1,39 +1,14 @@
 import streamlit as st
 import easyocr
 import re
-import cv2
-import numpy as np
 from PIL import Image
-from io import BytesIO
+from preprocessing import preprocess_and_rotate
 
 # Initialize OCR Reader.
 # The 'en' language model is downloaded automatically the first time it's used.
 # gpu=False to run on CPU, which is fine for this task.
 reader = easyocr.Reader(['en'], gpu=False)
 
-def preprocess_and_rotate(image):
-    """
-    Preprocesses the image for better OCR results and corrects its orientation.
-    """
-    img = np.array(image.convert("RGB"))
-    
-    # Simple rotation check based on image dimensions
-    h, w, _ = img.shape
-    if h > w:
-        img = cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
-
-    # Convert to grayscale for better processing
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    
-    # Apply a sharpening filter to make text clearer
-    sharpen_kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
-    sharp = cv2.filter2D(gray, -1, sharpen_kernel)
-
-    # Binarization using Otsu's thresholding
-    _, thresh = cv2.threshold(sharp, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    
-    return thresh, img
-
 def extract_email(text):
     """
     Extracts an email address from the given text using a regular expression.
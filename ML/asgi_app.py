@@ -0,0 +1,257 @@
+"""Opt-in ASGI entry point for the newLogic.py service.
+
+Serves the same ``/upload``, ``/extract-id-number``, their ``/batch`` variants
+and ``/health`` contract as newLogic.py, but uploads are received on the event loop and the blocking
+work (decode, preprocessing, OCR) is handed to a thread executor sized to the
+OCR pool, so slow clients never hold a worker thread. The executor queues
+without limit, so requests are admitted in front of it: once every pool slot
+(OCR_WORKERS + OCR_QUEUE_SIZE) has a request, more are answered 503 with a
+Retry-After, as newLogic.py does when the pool is full. Run it with:
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port $PORT --timeout-graceful-shutdown 30
+
+This is not what the default Procfile deploys: that runs lightweight_app.py
+(Flask, ID cards only, in-process reader with the memory governor).
+Procfile_asgi is an alternative with a different feature set - newLogic's
+OCR over the worker pool, business cards and the batch endpoints, but no
+memory governor and no Gemini path (that lives in AI_Agent.py). Switching
+the deployment to it changes the service, not just the server.
+
+On SIGTERM uvicorn stops accepting connections; the lifespan shutdown then
+waits up to ASGI_DRAIN_TIMEOUT seconds for in-flight requests before the
+executor and the OCR pool are torn down.
+"""
+import asyncio
+import contextlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from werkzeug.exceptions import HTTPException
+
+import batch
+import newLogic
+import uploads
+from ocr_pool import get_pool, PoolSaturated, OCRTimeout, OCR_WORKERS, OCR_QUEUE_SIZE
+
+ASGI_DRAIN_TIMEOUT = float(os.environ.get('ASGI_DRAIN_TIMEOUT', 30))
+ALLOWED_ORIGINS = ["http://localhost:3000", "https://your-frontend-domain.onrender.com"]
+
+# One thread per OCR pool slot, and as many requests admitted to them; the
+# executor's own queue has no bound, so it must never see more
+OCR_SLOTS = OCR_WORKERS + OCR_QUEUE_SIZE
+executor = ThreadPoolExecutor(max_workers=OCR_SLOTS, thread_name_prefix='ocr-request')
+slots = asyncio.Semaphore(OCR_SLOTS)
+
+
+class BodyTooLarge(Exception):
+    """Raised while receiving a request body that passes the upload limit."""
+
+
+class InFlightMiddleware:
+    """Counts in-flight HTTP requests and caps the body size while it streams in."""
+
+    def __init__(self, app, max_body=uploads.MAX_UPLOAD_BYTES, max_batch_body=uploads.MAX_BATCH_UPLOAD_BYTES):
+        self.app = app
+        self.max_body = max_body
+        self.max_batch_body = max_batch_body
+        self.count = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        # The batch endpoints take several images, or zips of them, per request
+        max_body = self.max_batch_body if scope['path'].endswith('/batch') else self.max_body
+        headers = dict(scope.get('headers') or [])
+        content_length = headers.get(b'content-length')
+        if content_length and content_length.isdigit() and int(content_length) > max_body:
+            response = JSONResponse({'error': f'Upload exceeds the {max_body / (1024 * 1024):g} MB limit'}, 413)
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            received += len(message.get('body', b''))
+            if received > max_body:
+                raise BodyTooLarge()
+            return message
+
+        self.count += 1
+        self.idle.clear()
+        try:
+            await self.app(scope, limited_receive, send)
+        finally:
+            self.count -= 1
+            if self.count == 0:
+                self.idle.set()
+
+    async def drain(self, timeout):
+        """Waits until no request is in flight, or the timeout passes."""
+        try:
+            await asyncio.wait_for(self.idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Shutting down with {self.count} request(s) still in flight")
+
+
+def error_response(message, status, headers=None):
+    return JSONResponse({'error': message}, status, headers=headers)
+
+
+async def read_upload(request, missing_error, empty_error):
+    """Receives the multipart body and validates the file header.
+
+    Returns ``(upload, form, error_response)``.
+    """
+    try:
+        form = await request.form()
+    except BodyTooLarge:
+        return None, None, error_response(f'Upload exceeds the {uploads.MAX_UPLOAD_MB:g} MB limit', 413)
+    upload = form.get('file')
+    if upload is None or not hasattr(upload, 'filename'):
+        return None, form, error_response(missing_error, 400)
+    if upload.filename == '':
+        return None, form, error_response(empty_error, 400)
+
+    header = await upload.read(uploads.HEADER_SNIFF_BYTES)
+    await upload.seek(0)
+    try:
+        uploads.check_header(header)
+    except HTTPException as e:
+        return None, form, error_response(e.description, e.code)
+    return upload, form, None
+
+
+async def run_blocking(fn, *args):
+    """Runs decode/preprocess/OCR work on the executor, mapping pool errors to responses.
+
+    Refused with 503 straight away when every slot is taken, rather than
+    waiting in the executor's queue.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        if slots.locked():
+            raise PoolSaturated()
+        async with slots:
+            return await loop.run_in_executor(executor, fn, *args), None
+    except PoolSaturated as e:
+        return None, error_response(str(e), 503, {'Retry-After': str(e.retry_after)})
+    except OCRTimeout as e:
+        return None, error_response(str(e), 504)
+
+
+async def extract_id_number(request):
+    """Extract Aadhar, PAN, and general numbers from an uploaded image."""
+    upload, _, error = await read_upload(request, 'No file part in the request', 'No file selected')
+    if error:
+        return error
+    try:
+        result, error = await run_blocking(newLogic.process_id_image, upload.file)
+    except Exception as e:
+        return error_response(f'Failed to process image: {str(e)}', 500)
+    finally:
+        await upload.close()
+    return error or JSONResponse(result)
+
+
+async def upload_image(request):
+    """Extract details from an image based on user prompt."""
+    upload, form, error = await read_upload(request, 'No file part', 'No selected file')
+    if error:
+        return error
+    if not newLogic.allowed_file(upload.filename):
+        await upload.close()
+        return error_response('Invalid file type. Allowed types: jpg, jpeg, png', 400)
+    prompt = (form.get('prompt') or '').strip()
+    try:
+        result, error = await run_blocking(newLogic.process_business_card_image, upload.file, prompt)
+    except Exception as e:
+        return error_response(f'An error occurred during processing: {e}', 500)
+    finally:
+        await upload.close()
+    return error or JSONResponse(result)
+
+
+async def batch_response(request, processor):
+    """Streams NDJSON results for every uploaded image (see batch.py).
+
+    ``processor(form)`` returns the function that turns one image stream into its result.
+    """
+    try:
+        form = await request.form()
+    except BodyTooLarge:
+        return error_response(f'Upload exceeds the {uploads.MAX_BATCH_UPLOAD_MB:g} MB batch limit', 413)
+    files = [upload for upload in form.getlist('file') + form.getlist('files') if hasattr(upload, 'filename')]
+    if not files:
+        await form.close()
+        return error_response('No file part in the request', 400)
+    try:
+        items = batch.expand_uploads([(upload.filename, upload.file) for upload in files])
+    except batch.BatchTooLarge as e:
+        await form.close()
+        return error_response(str(e), 413)
+    # Starlette iterates the blocking generator on its thread pool; the
+    # uploads are closed once the last line is sent
+    return StreamingResponse(batch.stream_results(items, processor(form)), media_type=batch.NDJSON_MIMETYPE,
+                             background=BackgroundTask(form.close))
+
+
+async def extract_id_number_batch(request):
+    """Extract ID numbers from many images (or zips of them), streamed back as NDJSON."""
+    return await batch_response(request, lambda form: newLogic.process_id_image)
+
+
+async def upload_image_batch(request):
+    """Extract business card details from many images (or zips of them), streamed back as NDJSON."""
+    def processor(form):
+        prompt = (form.get('prompt') or '').strip()
+        return lambda stream: newLogic.process_business_card_image(stream, prompt)
+    return await batch_response(request, processor)
+
+
+async def health_check(request):
+    """Health check with OCR pool occupancy and cache counters"""
+    return JSONResponse(newLogic.health_status())
+
+
+async def readiness_check(request):
+    """Readiness probe: 503 until the OCR workers are warmed up"""
+    status = get_pool().readiness.status()
+    return JSONResponse(status, 200 if status['ready'] else 503)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    started = time.perf_counter()
+    # Runs before uvicorn accepts connections, so the fork happens with no request threads around
+    get_pool().start()
+    print(f"ASGI service ready in {time.perf_counter() - started:.2f}s")
+    yield
+    await in_flight.drain(ASGI_DRAIN_TIMEOUT)
+    executor.shutdown(wait=True)
+    get_pool().shutdown()
+
+
+starlette_app = Starlette(
+    routes=[
+        Route('/extract-id-number', extract_id_number, methods=['POST']),
+        Route('/upload', upload_image, methods=['POST']),
+        Route('/extract-id-number/batch', extract_id_number_batch, methods=['POST']),
+        Route('/upload/batch', upload_image_batch, methods=['POST']),
+        Route('/health', health_check, methods=['GET']),
+        Route('/health/ready', readiness_check, methods=['GET']),
+    ],
+    lifespan=lifespan,
+)
+in_flight = InFlightMiddleware(starlette_app)
+# CORS outermost, so the 413s the size check answers early carry its headers too
+app = CORSMiddleware(in_flight, allow_origins=ALLOWED_ORIGINS, allow_methods=['GET', 'POST'], allow_headers=['*'])
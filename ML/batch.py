@@ -0,0 +1,139 @@
+"""Batch processing of many card images in one request.
+
+Reception often receives a stack of cards at once. The batch endpoints take
+several ``file`` (or ``files``) parts and/or zip archives of images, run every
+image through the same pipeline as the single-image endpoints with up to
+BATCH_CONCURRENCY of them in flight, and stream back one NDJSON line per image
+as soon as it finishes:
+
+    {"filename": "card1.jpg", "status": "ok", "result": {...}}
+    {"filename": "cards.zip/card2.png", "status": "error", "error": "..."}
+
+``result`` has exactly the schema of the matching single-image endpoint.
+Lines arrive in completion order, not upload order.
+"""
+import io
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from werkzeug.exceptions import HTTPException
+
+import uploads
+from ocr_pool import PoolSaturated, OCRTimeout
+
+# Batch configuration (overridable through environment variables)
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 2))
+MAX_BATCH_FILES = int(os.environ.get('MAX_BATCH_FILES', 100))
+# How often an image is retried when the OCR pool is full, before it is reported busy
+BATCH_RETRIES = int(os.environ.get('BATCH_RETRIES', 3))
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+class BatchTooLarge(Exception):
+    """Raised when a request carries more images than MAX_BATCH_FILES."""
+
+
+class BatchItem:
+    """One image of a batch: a direct upload or a member of a zip archive."""
+
+    def __init__(self, filename, stream=None, archive=None, member=None, error=None):
+        self.filename = filename
+        self.stream = stream
+        self.archive = archive
+        self.member = member
+        self.error = error
+
+    def open(self):
+        if self.archive is None:
+            return self.stream
+        # Members are read when their turn comes, so only the images in
+        # flight are held in memory
+        return io.BytesIO(self.archive.read(self.member))
+
+
+def _archive_items(filename, stream):
+    """Lists the images inside an uploaded zip archive."""
+    try:
+        archive = zipfile.ZipFile(stream)
+    except zipfile.BadZipFile:
+        return [BatchItem(filename, error='Invalid zip archive')]
+
+    items = []
+    for info in archive.infolist():
+        name = info.filename
+        if info.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith('.'):
+            continue
+        label = f"{filename}/{name}"
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            items.append(BatchItem(label, error='Invalid file type. Allowed types: jpg, jpeg, png'))
+        elif info.file_size > uploads.MAX_UPLOAD_BYTES:
+            items.append(BatchItem(label, error=f'Upload exceeds the {uploads.MAX_UPLOAD_MB:g} MB limit'))
+        else:
+            items.append(BatchItem(label, archive=archive, member=info))
+    return items
+
+
+def expand_uploads(files):
+    """Turns ``(filename, stream)`` uploads into batch items, unpacking zip archives.
+
+    Raises BatchTooLarge when the batch holds more than MAX_BATCH_FILES images.
+    """
+    items = []
+    for filename, stream in files:
+        header = stream.read(len(uploads.ZIP_SIGNATURE))
+        stream.seek(0)
+        if header == uploads.ZIP_SIGNATURE:
+            items.extend(_archive_items(filename, stream))
+        elif not filename:
+            items.append(BatchItem(filename, error='No file selected'))
+        else:
+            items.append(BatchItem(filename, stream=stream))
+        if len(items) > MAX_BATCH_FILES:
+            raise BatchTooLarge(f'A batch can hold at most {MAX_BATCH_FILES} images')
+    return items
+
+
+def process_item(item, process):
+    """Runs one batch item through ``process(stream)`` and returns its NDJSON record."""
+    if item.error:
+        return {'filename': item.filename, 'status': 'error', 'error': item.error}
+    try:
+        stream = item.open()
+        header = stream.read(uploads.HEADER_SNIFF_BYTES)
+        stream.seek(0)
+        uploads.check_header(header)
+        for attempt in range(BATCH_RETRIES + 1):
+            try:
+                result = process(stream)
+                break
+            except PoolSaturated as e:
+                # Interactive requests get the pool first; wait our turn
+                if attempt == BATCH_RETRIES:
+                    raise
+                stream.seek(0)
+                time.sleep(e.retry_after)
+        return {'filename': item.filename, 'status': 'ok', 'result': result}
+    except HTTPException as e:
+        error = e.description
+    except (PoolSaturated, OCRTimeout) as e:
+        error = str(e)
+    except Exception as e:
+        error = f'Failed to process image: {str(e)}'
+    return {'filename': item.filename, 'status': 'error', 'error': error}
+
+
+def stream_results(items, process, concurrency=BATCH_CONCURRENCY):
+    """Yields one NDJSON line per item as it finishes processing."""
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='ocr-batch-item')
+    try:
+        futures = [executor.submit(process_item, item, process) for item in items]
+        for future in as_completed(futures):
+            yield json.dumps(future.result()) + '\n'
+    finally:
+        # Stops queued items when the client goes away mid-stream
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,133 @@
+"""Card detection and perspective crop on photos of cards lying on a desk.
+
+Places labeled cards from the synthetic corpus generator (card_corpus.py)
+on textured backgrounds under a random perspective, then reports how often
+``preprocessing.find_card_quad`` finds the card, how far its corners are
+off, what the crop costs and how many pixels it takes away from the OCR.
+With ``--ocr`` it also times CRAFT detection on the full frame versus the
+crop:
+
+    python benchmarks/bench_card_crop.py [--photos 40] [--ocr --backend torch]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import preprocessing  # noqa: E402
+from card_corpus import business_card, id_card, render  # noqa: E402
+
+FRAME = (1600, 1200)
+
+
+def desk_photo(rng, frame=FRAME):
+    """A rendered card warped onto a noisy desk; returns (photo, true corners tl/tr/br/bl)."""
+    make, size = rng.choice([(business_card, (1000, 600)), (id_card, (1012, 638))])
+    card = render(make(rng)[0], rng, size)
+    height, width = card.shape[:2]
+    frame_width, frame_height = frame
+
+    # Card covers 30-70% of the frame width, somewhere near the middle, corners jittered
+    scale = rng.uniform(0.3, 0.7) * frame_width / max(width, height)
+    center_x = frame_width / 2 + rng.uniform(-0.1, 0.1) * frame_width
+    center_y = frame_height / 2 + rng.uniform(-0.1, 0.1) * frame_height
+    angle = np.radians(rng.uniform(-25, 25))
+    rotation = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    source = np.array([[0, 0], [width, 0], [width, height], [0, height]], dtype=np.float32)
+    corners = (source - [width / 2, height / 2]) * scale @ rotation.T + [center_x, center_y]
+    corners += np.array([[rng.uniform(-0.04, 0.04) * width * scale for _ in range(2)] for _ in range(4)])
+    corners = corners.astype(np.float32)
+
+    background = rng.randint(60, 150)
+    photo = np.random.default_rng(rng.randint(0, 2 ** 31)).normal(
+        background, 18, (frame_height, frame_width, 3)).clip(0, 255).astype(np.uint8)
+    matrix = cv2.getPerspectiveTransform(source, corners)
+    warped = cv2.warpPerspective(card, matrix, (frame_width, frame_height))
+    mask = cv2.warpPerspective(np.full((height, width), 255, np.uint8), matrix, (frame_width, frame_height))
+    photo[mask > 0] = warped[mask > 0]
+    return cv2.cvtColor(photo, cv2.COLOR_BGR2RGB), corners
+
+
+def in_frame(corners, frame=FRAME):
+    return bool(((corners >= 0) & (corners < frame)).all())
+
+
+def corner_error(found, truth):
+    """Mean distance between found and true corners, allowing for the quad's start corner."""
+    return min(float(np.linalg.norm(np.roll(found, shift, axis=0) - truth, axis=1).mean()) for shift in range(4))
+
+
+def timed_ms(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def describe(values, unit):
+    if not values:
+        return 'n/a'
+    return f"median {statistics.median(values):.1f}{unit}, max {max(values):.1f}{unit}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--photos', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ocr', action='store_true', help='Also time text detection on frame vs crop')
+    parser.add_argument('--backend', default=None)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    photos = [desk_photo(rng) for _ in range(args.photos)]
+    reader = None
+    if args.ocr:
+        from easyocr.utils import reformat_input
+        from ocr_backends import create_reader
+        reader = create_reader(args.backend)
+
+    found, clipped, errors, detect_ms, warp_ms, kept, ocr_full_ms, ocr_crop_ms = 0, 0, [], [], [], [], [], []
+    for photo, truth in photos:
+        quad, elapsed = timed_ms(preprocessing.find_card_quad, photo)
+        detect_ms.append(elapsed)
+        crop = photo
+        if not in_frame(truth):
+            # Cards running off the edge have no quad to find; the full frame is used
+            clipped += quad is None
+        elif quad is not None:
+            found += 1
+            errors.append(corner_error(quad, truth))
+            crop, elapsed = timed_ms(preprocessing.warp_card, photo, quad)
+            warp_ms.append(elapsed)
+        kept.append(crop.shape[0] * crop.shape[1] / (photo.shape[0] * photo.shape[1]))
+        if reader is not None:
+            for image, timings in ((photo, ocr_full_ms), (crop, ocr_crop_ms)):
+                img, _ = reformat_input(image)
+                timings.append(timed_ms(lambda: reader.detect(img, reformat=False))[1])
+
+    # Frames that already are the card must come through untouched
+    scans = [render(business_card(rng)[0], rng) for _ in range(10)]
+    untouched = sum(preprocessing.find_card_quad(cv2.cvtColor(scan, cv2.COLOR_BGR2RGB)) is None for scan in scans)
+
+    print(f"{args.photos} desk photos at {FRAME[0]}x{FRAME[1]}")
+    inside = sum(in_frame(truth) for _, truth in photos)
+    print(f"  card found:      {found}/{inside} fully in frame")
+    print(f"  full frame used: {clipped}/{args.photos - inside} partly out of frame")
+    print(f"  corner error:    {describe(errors, ' px')}")
+    print(f"  detect time:     {describe(detect_ms, ' ms')}")
+    print(f"  warp time:       {describe(warp_ms, ' ms')}")
+    print(f"  pixels kept:     mean {statistics.mean(kept):.0%} of the frame")
+    print(f"  full-card scans left uncropped: {untouched}/{len(scans)}")
+    if reader is not None:
+        print(f"  text detection:  full frame {describe(ocr_full_ms, ' ms')}; crop {describe(ocr_crop_ms, ' ms')}")
+
+
+if __name__ == '__main__':
+    main()
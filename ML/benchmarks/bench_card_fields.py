@@ -0,0 +1,203 @@
+"""Benchmark of the single-pass business card field engine.
+
+Generates thousands of synthetic OCR line lists (names, designations,
+companies, phones with and without extensions, addresses with OCR noise,
+placeholder text, junk lines), checks that ``card_fields.extract_business_card``
+returns exactly what newLogic's old extractor chain (kept in
+legacy_card_fields.py) returns for every one of them, does the same for
+prompt mode against the old ``extract_custom_data``, and times both:
+
+    python benchmarks/bench_card_fields.py [--cards 5000] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import card_fields  # noqa: E402
+import legacy_card_fields  # noqa: E402
+import newLogic  # noqa: E402
+
+FIRST_NAMES = ['Ravi', 'Priya', 'Anil', 'Sneha', 'John', 'Fatima', 'Arjun', 'Meera', 'ramesh', 'KAVYA']
+LAST_NAMES = ['Kumar', 'Sharma', 'Mehta', 'Iyer', 'Doe', 'Khan', 'Reddy', 'Nair', 'patel', 'SINGH']
+DESIGNATIONS = ['Senior Engineer', 'Project Manager', 'Director - Strategy', 'CEO', 'Head of Delivery',
+                'Lead Designer', 'Sales Executive', 'Chief Technology Officer', 'Business Analyst',
+                'Founder & Partner', 'Team Leader', 'Headquarters Liaison', 'Software Developer']
+COMPANIES = ['Acme Solutions Pvt Ltd', 'GLOBAL TECH INDUSTRIES', 'Sunrise Consulting LLP', 'Blue Ocean Inc',
+             'NOVA DIGITAL WORKS', 'Infra Group', 'Kite Software', 'Orbit Associates', 'Pixel Labs',
+             'BRIGHT FUTURE TRADING CO']
+DOMAINS = ['acme.com', 'gmail.com', 'globaltech.in', 'sunrise-consulting.co.in', 'outlook.com', 'kite.io',
+           'orbit.org', 'pixel-labs.tech', 'nova.net', 'yahoo.com']
+STREETS = ['12, MG Road', 'Plot 45; Sector 18', 'House No. 221B Baker Street', '3rd Floor, Tower B',
+           'Block C, Phase Iil', 'Near City Park', 'Banjara Hills', 'Anna Nagar West', '5th Avenue',
+           'Income Tax Colony', 'Welcome Building, Lane 4']
+CITIES = ['Hyderabad - 500034', 'Bengaluru 560001', 'Mumbai, Maharashtra', 'Chennai 600040, India',
+          'New Delhi 110001', 'Pune', 'Noida, UP 201301', 'Kolkata India']
+JUNK = ['Scan me', 'Follow us', '@acme_in', 'Products & Items', 'Our Items: Pumps', 'Estd 1998',
+        'ISO 9001:2015', 'Telecom Partner', 'M: ', 'Fax: 040-2345678', 'www.', 'Company Tagline']
+
+
+def phone(rng):
+    number = rng.choice('6789') + ''.join(rng.choice('0123456789') for _ in range(9))
+    return rng.choice(['', '+91 ', '+91-', 'M: ', 'Mob: ', 'Mobile ', 'Ext ', 'x']) + number
+
+
+def landline(rng):
+    digits = ''.join(rng.choice('0123456789') for _ in range(rng.choice([6, 7, 8])))
+    prefix = rng.choice(['Tel: ', 'Ph: ', 'Office ', 'O: ', '+91 40 ', '+91-80-', 'Fax: ', 'Work '])
+    suffix = rng.choice(['', ' ext 204', ' x12', ' Extension: 5'])
+    return f"{prefix}{rng.choice(['040', '(022)', '080', '11'])} {digits}{suffix}"
+
+
+def synthetic_card(rng):
+    """One card as EasyOCR would return it: an unordered-ish list of lines."""
+    lines = []
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    domain = rng.choice(DOMAINS)
+    candidates = [
+        name,
+        rng.choice(DESIGNATIONS),
+        rng.choice(COMPANIES),
+        f"{name.split()[0].lower()}.{name.split()[1].lower()}@{domain}",
+        phone(rng),
+        landline(rng),
+        rng.choice(['www.', 'https://', '']) + rng.choice(DOMAINS),
+        rng.choice(STREETS),
+        rng.choice(STREETS),
+        rng.choice(CITIES),
+    ]
+    for line in candidates:
+        if rng.random() < 0.85:
+            lines.append(line)
+    for _ in range(rng.randint(0, 3)):
+        lines.append(rng.choice(JUNK + list(newLogic.PLACEHOLDER_PHRASES)))
+    if rng.random() < 0.3:
+        lines = [line.upper() for line in lines]
+    if rng.random() < 0.2:
+        lines = [f"  {line} " for line in lines]
+    rng.shuffle(lines)
+    return lines
+
+
+def legacy_business_card(lines):
+    """The extractor chain newLogic used before card_fields."""
+    full_text = ' '.join(lines)
+    email = legacy_card_fields.extract_email(full_text)
+    mobile_number = legacy_card_fields.extract_mobile_number(full_text)
+    company_number = legacy_card_fields.extract_company_number(full_text)
+    website = legacy_card_fields.extract_website(full_text)
+    name, designation = legacy_card_fields.extract_name_and_designation(lines)
+    company = legacy_card_fields.extract_company_name(lines)
+    if company == "Not Found" and email:
+        domain = email.split('@')[1]
+        if domain.lower() not in card_fields.PUBLIC_EMAIL_DOMAINS:
+            tlds = ['.com', '.in', '.org', '.net', '.co.uk', '.co.in', '.co']
+            for tld in sorted(tlds, key=len, reverse=True):
+                if domain.endswith(tld):
+                    domain = domain[:-len(tld)]
+                    break
+            company = domain.replace('-', ' ').title()
+    address = legacy_card_fields.extract_address(lines)
+    return {
+        "name": name if name else "Not Found",
+        "designation": designation if designation else "Not Found",
+        "company": company if company else "Not Found",
+        "email": email if email else "Not Found",
+        "personal_mobile_number": mobile_number if mobile_number else "Not Found",
+        "company_number": company_number if company_number else "Not Found",
+        "website": website if website else "Not Found",
+        "address": address if address else "Not Found",
+    }
+
+
+PROMPTS = ['name and designation', 'mobile / phone', 'company number and company tel', 'email',
+           'business card', 'receipt', 'give me everything', 'Company Name, website, ADDRESS', 'username',
+           'items and products', 'phone number']
+
+
+def legacy_custom_data(lines, prompt):
+    """extract_custom_data as newLogic had it before card_fields took over."""
+    if not prompt:
+        return None
+    prompt = prompt.lower().strip()
+    full_text = ' '.join(lines)
+    result = {}
+    field_extractors = {
+        'name': lambda: legacy_card_fields.extract_name_and_designation(lines)[0],
+        'designation': lambda: legacy_card_fields.extract_name_and_designation(lines)[1],
+        'company': lambda: legacy_card_fields.extract_company_name(lines),
+        'email': lambda: legacy_card_fields.extract_email(full_text),
+        'mobile': lambda: legacy_card_fields.extract_mobile_number(full_text),
+        'phone': lambda: legacy_card_fields.extract_mobile_number(full_text),
+        'company number': lambda: legacy_card_fields.extract_company_number(full_text),
+        'company tel': lambda: legacy_card_fields.extract_company_number(full_text),
+        'website': lambda: legacy_card_fields.extract_website(full_text),
+        'address': lambda: legacy_card_fields.extract_address(lines),
+        'items': lambda: ', '.join([line for line in lines if any(kw in line.lower() for kw in ['item', 'items', 'product', 'products'])])
+    }
+    requested_fields = [field for field in field_extractors.keys() if field in prompt]
+    if not requested_fields:
+        if 'receipt' in prompt:
+            requested_fields = ['items', 'company', 'address']
+        elif 'business card' in prompt:
+            requested_fields = ['name', 'designation', 'company', 'email', 'mobile', 'company tel', 'website', 'address']
+        else:
+            requested_fields = list(field_extractors.keys())
+    for field in requested_fields:
+        result[field] = field_extractors[field]() or "Not Found"
+    return result or {"message": "No relevant data extracted based on prompt"}
+
+
+def report_mismatches(label, cards, expected, actual):
+    mismatches = [(lines, want, got) for lines, want, got in zip(cards, expected, actual)
+                  if want != got or list(want) != list(got)]
+    for lines, want, got in mismatches[:5]:
+        print(f"MISMATCH ({label}) for {lines}")
+        for field in want:
+            if want[field] != got.get(field):
+                print(f"  {field}: legacy={want[field]!r} engine={got.get(field)!r}")
+        if list(want) != list(got):
+            print(f"  keys: legacy={list(want)} engine={list(got)}")
+    return len(mismatches)
+
+
+def timed(fn, cards):
+    started = time.perf_counter()
+    outputs = [fn(lines) for lines in cards]
+    return time.perf_counter() - started, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cards', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cards = [synthetic_card(rng) for _ in range(args.cards)]
+
+    prompted = [(lines, PROMPTS[i % len(PROMPTS)]) for i, lines in enumerate(cards)]
+    runs = [
+        ('default', cards, legacy_business_card, card_fields.extract_business_card),
+        ('prompt', prompted, lambda args: legacy_custom_data(*args), lambda args: card_fields.extract_custom_data(*args)),
+    ]
+
+    failed = 0
+    print(f"{'mode':>8} {'pipeline':>10} {'total s':>8} {'us/card':>9}")
+    for mode, inputs, legacy, engine in runs:
+        legacy_seconds, expected = timed(legacy, inputs)
+        engine_seconds, actual = timed(engine, inputs)
+        mismatches = report_mismatches(mode, inputs, expected, actual)
+        failed += mismatches
+        for name, seconds in [('legacy', legacy_seconds), ('engine', engine_seconds)]:
+            print(f"{mode:>8} {name:>10} {seconds:8.3f} {seconds / len(inputs) * 1e6:9.1f}")
+        print(f"{mode:>8} speed-up {legacy_seconds / engine_seconds:.2f}x, "
+              f"{len(inputs) - mismatches}/{len(inputs)} cards identical")
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+"""End-to-end benchmark over a labeled card corpus.
+
+Two phases, both over the corpus of benchmarks/card_corpus.py (rendered on
+first use) or any directory labeled the same way:
+
+* stages - every image goes through the newLogic.py pipeline in this process,
+  timed per stage: decode, preprocess, detection, recognition and field
+  extraction. The fields are scored against the ground truth, per field.
+* throughput - the Flask app is started as a subprocess (or ``--url`` points
+  at a running one) and N concurrent clients post the corpus to it. Reports
+  requests/s, latency percentiles, rejected requests and the peak RSS of the
+  server and its OCR workers.
+
+Everything is written to a JSON report; ``--baseline`` compares the run with
+an earlier report:
+
+    python benchmarks/bench_e2e.py [--corpus DIR] [--clients 1 4] [--requests 40] [--json report.json]
+    python benchmarks/bench_e2e.py --app lightweight_app --clients 2 --baseline report.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ML_DIR)
+# Repeated corpus images must not be answered from the result cache
+os.environ.setdefault('OCR_CACHE_ENTRIES', '0')
+
+import card_corpus  # noqa: E402
+from id_roi import find_numbers  # noqa: E402
+from ocr_backends import create_reader  # noqa: E402
+from preprocessing import load_image, preprocess_and_rotate  # noqa: E402
+
+STAGES = ['decode', 'preprocess', 'detection', 'recognition', 'fields']
+# Endpoint per corpus kind, for each app that can be benchmarked
+APP_ENDPOINTS = {
+    'newLogic': {'business_card': '/upload', 'id_card': '/extract-id-number'},
+    'lightweight_app': {'id_card': '/extract-id-number'},
+}
+MAX_DIMENSION = {'business_card': 'CARD_MAX_DIMENSION', 'id_card': 'ID_MAX_DIMENSION'}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process, from /proc (Linux only)."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def tree_rss_mb(pid):
+    """Current RSS of a process and all its descendants, from /proc (Linux only)."""
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as status:
+                total += next((int(line.split()[1]) for line in status if line.startswith('VmRSS:')), 0)
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as children:
+                    pending.extend(int(child) for child in children.read().split())
+        except OSError:
+            continue
+    return total / 1024
+
+
+def summarize(seconds):
+    values = np.array(seconds) * 1000
+    if len(values) == 0:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean_ms': round(float(values.mean()), 2),
+        'p50_ms': round(float(np.percentile(values, 50)), 2),
+        'p95_ms': round(float(np.percentile(values, 95)), 2),
+        'p99_ms': round(float(np.percentile(values, 99)), 2),
+        'total_s': round(float(values.sum() / 1000), 3),
+    }
+
+
+# --- Accuracy ---
+
+def normalize(field, value):
+    """Puts a field into the form ground truth and output are compared in."""
+    if value is None:
+        value = 'Not Found'
+    value = str(value)
+    if value == 'Not Found':
+        return value
+    if field in ('personal_mobile_number', 'company_number'):
+        # '+91 98765 43210' and '9876543210' are the same number
+        return re.sub(r'\D', '', value)[-10:]
+    if field == 'primary_number':
+        return re.sub(r'\s', '', value)
+    if field == 'website':
+        value = re.sub(r'^(https?://)?(www\.)?', '', value.lower()).rstrip('/')
+    return re.sub(r'[^a-z0-9@.]', '', value.lower())
+
+
+def score(expected, actual):
+    """{field: whether ``actual`` got it right} over the labeled fields."""
+    return {field: normalize(field, actual.get(field)) == normalize(field, value)
+            for field, value in expected.items()}
+
+
+# --- Stages phase ---
+
+def run_stages(reader, path, kind, timings):
+    """Runs one image through the pipeline, adding each stage's time to ``timings``."""
+    import newLogic
+    from easyocr.utils import reformat_input
+
+    max_dimension = getattr(newLogic, MAX_DIMENSION[kind])
+    started = time.perf_counter()
+    with open(path, 'rb') as stream:
+        image = load_image(stream, max_dimension)
+    timings['decode'].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    processed_img, _ = preprocess_and_rotate(image, max_dimension)
+    timings['preprocess'].append(time.perf_counter() - started)
+
+    # readtext, split into its two networks
+    started = time.perf_counter()
+    img, grey = reformat_input(processed_img)
+    horizontal_list, free_list = reader.detect(img, reformat=False)
+    horizontal_list, free_list = horizontal_list[0], free_list[0]
+    timings['detection'].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    texts = []
+    if horizontal_list or free_list:
+        texts = reader.recognize(grey, horizontal_list, free_list, detail=0, paragraph=False, reformat=False)
+    timings['recognition'].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    if kind == 'business_card':
+        result = newLogic.build_business_card_response(texts)
+    else:
+        result = newLogic.build_id_response(find_numbers(' '.join(texts)), texts)
+    timings['fields'].append(time.perf_counter() - started)
+    return result
+
+
+def stages_phase(samples, backend, threads, show_misses):
+    started = time.perf_counter()
+    reader = create_reader(backend, threads=threads)
+    load_seconds = time.perf_counter() - started
+    # First inference allocates the networks' buffers; keep it out of the timings
+    run_stages(reader, samples[0][0], samples[0][1]['kind'], {stage: [] for stage in STAGES})
+
+    timings = {stage: [] for stage in STAGES}
+    fields = {}
+    for path, label in samples:
+        result = run_stages(reader, path, label['kind'], timings)
+        for field, correct in score(label['expected'], result).items():
+            counts = fields.setdefault(f"{label['kind']}.{field}", [0, 0])
+            counts[0] += correct
+            counts[1] += 1
+            if show_misses and not correct:
+                print(f"  miss {os.path.basename(path)} {field}: "
+                      f"expected {label['expected'][field]!r}, got {result.get(field)!r}")
+
+    accuracy = {field: {'correct': correct, 'total': total, 'accuracy': round(correct / total, 4)}
+                for field, (correct, total) in sorted(fields.items())}
+    correct = sum(item['correct'] for item in accuracy.values())
+    total = sum(item['total'] for item in accuracy.values())
+    return {
+        'reader_load_s': round(load_seconds, 2),
+        'stages': {stage: summarize(values) for stage, values in timings.items()},
+        'end_to_end': summarize([sum(values) for values in zip(*timings.values())]),
+        'accuracy': accuracy,
+        'overall_accuracy': round(correct / total, 4) if total else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+# --- Throughput phase ---
+
+def post_image(url, path, timeout):
+    """Posts one image as the ``file`` form field; returns (status, seconds)."""
+    boundary = uuid.uuid4().hex
+    with open(path, 'rb') as image:
+        data = image.read()
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+            f'filename="{os.path.basename(path)}"\r\nContent-Type: image/jpeg\r\n\r\n').encode()
+    body += data + f'\r\n--{boundary}--\r\n'.encode()
+    request = urllib.request.Request(url, data=body, method='POST',
+                                     headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError:
+        status = None
+    return status, time.perf_counter() - started
+
+
+def start_server(app, port):
+    """Starts ``app``.py as the deployment would and waits until it is ready."""
+    env = dict(os.environ, PORT=str(port))
+    server = subprocess.Popen([sys.executable, f'{app}.py'], cwd=ML_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 600
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'{app}.py exited with code {server.returncode}')
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/health/ready', timeout=2) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            pass
+        time.sleep(0.5)
+    server.kill()
+    raise RuntimeError(f'{app}.py did not become ready')
+
+
+def throughput_phase(samples, base_url, endpoints, clients, requests, timeout, pid):
+    """Posts ``requests`` images with ``clients`` concurrent clients."""
+    jobs = [(base_url + endpoints[label['kind']], path) for path, label in samples if label['kind'] in endpoints]
+    if not jobs:
+        return None
+    jobs = [jobs[i % len(jobs)] for i in range(requests)]
+
+    peak = [0.0]
+    sampling = threading.Event()
+
+    def sample_rss():
+        while not sampling.wait(0.1):
+            peak[0] = max(peak[0], tree_rss_mb(pid))
+
+    sampler = threading.Thread(target=sample_rss, daemon=True) if pid else None
+    if sampler:
+        sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        outcomes = list(executor.map(lambda job: post_image(job[0], job[1], timeout), jobs))
+    elapsed = time.perf_counter() - started
+    sampling.set()
+    if sampler:
+        sampler.join()
+
+    statuses = {}
+    for status, _ in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    ok = [seconds for status, seconds in outcomes if status == 200]
+    return {
+        'clients': clients,
+        'requests': len(jobs),
+        'seconds': round(elapsed, 3),
+        'requests_per_s': round(len(ok) / elapsed, 3),
+        'latency': summarize(ok),
+        'statuses': statuses,
+        'peak_server_rss_mb': round(peak[0], 1) if pid else None,
+    }
+
+
+# --- Report ---
+
+def flatten(report, prefix=''):
+    flat = {}
+    for key, value in report.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline, report):
+    """Prints the headline metrics of both runs side by side."""
+    old, new = flatten(baseline), flatten(report)
+    keys = [key for key in new if key in old and key.endswith(('mean_ms', 'p95_ms', 'requests_per_s',
+                                                                 'accuracy', 'peak_rss_mb', 'peak_server_rss_mb'))]
+    print(f"\n{'metric':<52} {'baseline':>10} {'this run':>10} {'change':>8}")
+    for key in keys:
+        change = f"{(new[key] - old[key]) / old[key] * 100:+7.1f}%" if old[key] else f"{'':>8}"
+        print(f"{key:<52} {old[key]:10.2f} {new[key]:10.2f} {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', default=card_corpus.DEFAULT_CORPUS, help='labeled images (rendered if missing)')
+    parser.add_argument('--backend', default=None, help='OCR backend for the stages phase (default: OCR_BACKEND)')
+    parser.add_argument('--threads', type=int, default=1, help='intra-op threads, as in one OCR pool worker')
+    parser.add_argument('--app', choices=list(APP_ENDPOINTS), default='newLogic', help='Flask app to load')
+    parser.add_argument('--url', help='benchmark a running server instead of starting --app')
+    parser.add_argument('--pid', type=int, help='with --url: server process to measure RSS of')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--clients', type=int, nargs='*', default=[1, 4], help='concurrency levels; none skips')
+    parser.add_argument('--requests', type=int, default=40, help='requests per concurrency level')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--skip-stages', action='store_true')
+    parser.add_argument('--show-misses', action='store_true', help='print every wrong field')
+    parser.add_argument('--json', help='write the report to this file')
+    parser.add_argument('--baseline', help='earlier report to compare against')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.corpus) or not card_corpus.load_corpus(args.corpus):
+        card_corpus.build_corpus(args.corpus)
+    samples = card_corpus.load_corpus(args.corpus)
+    print(f"{len(samples)} labeled images in {args.corpus}")
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'backend': args.backend or os.environ.get('OCR_BACKEND', 'easyocr'),
+        'corpus': {'path': args.corpus, 'images': len(samples)},
+    }
+
+    if not args.skip_stages:
+        stages = report['stages_phase'] = stages_phase(samples, args.backend, args.threads, args.show_misses)
+        print(f"\n{'stage':>12} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for stage, summary in list(stages['stages'].items()) + [('end-to-end', stages['end_to_end'])]:
+            print(f"{stage:>12} {summary['mean_ms']:9.2f} {summary['p50_ms']:8.2f} {summary['p95_ms']:8.2f}")
+        print(f"\n{'field':>40} {'accuracy':>9}")
+        for field, item in stages['accuracy'].items():
+            print(f"{field:>40} {item['accuracy']:9.2%} ({item['correct']}/{item['total']})")
+        print(f"{'overall':>40} {stages['overall_accuracy']:9.2%}, peak RSS {stages['peak_rss_mb']:.0f} MB")
+
+    if args.clients:
+        server = None
+        pid = args.pid
+        base_url = args.url.rstrip('/') if args.url else f'http://127.0.0.1:{args.port}'
+        if not args.url:
+            server = start_server(args.app, args.port)
+            pid = server.pid
+        report['app'] = args.url or args.app
+        report['throughput'] = []
+        try:
+            print(f"\n{'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'server MB':>10} statuses")
+            for clients in args.clients:
+                level = throughput_phase(samples, base_url, APP_ENDPOINTS[args.app], clients, args.requests,
+                                         args.timeout, pid)
+                if level is None:
+                    print(f"{args.app} serves none of the corpus kinds")
+                    break
+                report['throughput'].append(level)
+                latency = level['latency']
+                rss = f"{level['peak_server_rss_mb']:10.0f}" if level['peak_server_rss_mb'] else f"{'n/a':>10}"
+                print(f"{clients:>8} {level['requests_per_s']:8.2f} {latency.get('p50_ms', 0):8.1f} "
+                      f"{latency.get('p95_ms', 0):8.1f} {latency.get('p99_ms', 0):8.1f} {rss} {level['statuses']}")
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=30)
+        # Keyed by concurrency, so reports compare level by level
+        report['throughput'] = {f"clients_{level['clients']}": level for level in report['throughput']}
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(report, output, indent=2)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            compare(json.load(baseline), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Size and encode time of the image sent to Gemini.
+
+Compares the lossless full-frame PNG AI_Agent.py used to upload with
+``gemini_input.prepare_image`` at a few edge / format / quality settings, on
+synthetic photos of a card lying on a desk - the whole frame, and the card as
+``preprocessing.crop_to_card`` cuts it out before Gemini sees it - and checks
+that the fake Gemini model (fake_gemini.py) receives exactly the encoded
+bytes:
+
+    python benchmarks/bench_gemini_payload.py [--repeat 10]
+"""
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gemini_input  # noqa: E402
+import preprocessing  # noqa: E402
+from fake_gemini import FakeGenerativeModel  # noqa: E402
+
+FRAMES = [(1600, 1200), (4032, 3024)]
+SETTINGS = [
+    ('jpeg', 1024, 85),
+    ('jpeg', 1024, 70),
+    ('jpeg', 1600, 85),
+    ('webp', 1024, 80),
+]
+
+
+def desk_photo(width, height, seed=0):
+    """A card with text, covering about half of a textured desk frame."""
+    rng = np.random.default_rng(seed)
+    frame = rng.normal(110, 25, (height, width, 3)).clip(0, 255).astype(np.uint8)
+    card_w, card_h = int(width * 0.7), int(width * 0.7 / 1.75)
+    x0, y0 = (width - card_w) // 2, (height - card_h) // 2
+    card = rng.normal(235, 8, (card_h, card_w, 3)).clip(0, 255).astype(np.uint8)
+    scale = card_w / 900
+    for row, text in enumerate(['Ravi Kumar', 'Senior Engineer', 'ACME SOLUTIONS PVT LTD',
+                                '+91 98765 43210', 'ravi@acme.com', '12, MG Road, Hyderabad']):
+        cv2.putText(card, text, (int(40 * scale), int((70 + row * 80) * scale)), cv2.FONT_HERSHEY_SIMPLEX,
+                    1.4 * scale, (30, 30, 30), max(1, int(3 * scale)), cv2.LINE_AA)
+    frame[y0:y0 + card_h, x0:x0 + card_w] = card
+    return frame
+
+
+def legacy_png(img):
+    ok, encoded = cv2.imencode('.png', cv2.cvtColor(img, cv2.COLOR_RGB2BGR))
+    return encoded.tobytes()
+
+
+def timed(fn, repeat):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    # prepare_image logs every call; keep the table readable
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    rows = []
+    model = FakeGenerativeModel(latency=0)
+    try:
+        for width, height in FRAMES:
+            img = desk_photo(width, height)
+            card = preprocessing.crop_to_card(img)
+            data, seconds = timed(lambda: legacy_png(img), args.repeat)
+            rows.append((f'{width}x{height}', 'png full frame', len(data), seconds))
+            for image_format, max_edge, quality in SETTINGS:
+                for crop in (False, True):
+                    source = card if crop else img
+                    part, seconds = timed(lambda: gemini_input.prepare_image(source, max_edge, image_format, quality),
+                                          args.repeat)
+                    model.generate_content([{'text': 'Extract'}, part])
+                    assert model.payload_sizes[-1] == len(part['data'])
+                    label = f"{image_format} {max_edge}px q{quality}{' crop' if crop else ''}"
+                    rows.append((f'{width}x{height}', label, len(part['data']), seconds))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"{'frame':>10} {'payload':>24} {'KB':>8} {'encode ms':>10}")
+    for frame, label, size, seconds in rows:
+        print(f"{frame:>10} {label:>24} {size / 1024:8.0f} {seconds * 1000:10.1f}")
+    print(f"fake Gemini received {model.payload_stats()}")
+
+
+if __name__ == '__main__':
+    main()
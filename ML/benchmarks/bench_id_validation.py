@@ -0,0 +1,145 @@
+"""Aadhaar / PAN validation and correction on simulated OCR misreads.
+
+Generates valid numbers the way the synthetic corpus does (card_corpus.py),
+garbles them the way the recognizer does and compares what the old plain
+regex accepted with what ``id_validation.find_candidates`` makes of them:
+
+* ``clean`` - the number as printed;
+* ``letters`` - one or two digits read as look-alike letters (0/O, 1/I, 8/B,
+  ...), or PAN letters read as digits;
+* ``digit`` - one Aadhaar digit read as a look-alike digit (8/3, 1/7, ...);
+* ``random`` - random 12-digit runs (phone numbers, dates, noise).
+
+It also reports how often guessing the digit back would have picked the
+right number, and times the scalar Verhoeff loop against the vectorized
+batch check:
+
+    python benchmarks/bench_id_validation.py [--numbers 5000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import id_validation  # noqa: E402
+from card_corpus import aadhaar_number, pan_number  # noqa: E402
+
+# The pattern id_roi matched before validation
+OLD_RE = re.compile(r'\b(?:\d{4}\s?\d{4}\s?\d{4}|\d{12})\b|\b[A-Z]{5}\d{4}[A-Z]\b')
+LOOKALIKE_DIGITS = {'0': '86', '1': '7', '3': '85', '5': '63', '6': '580', '7': '1', '8': '3609', '9': '8'}
+CONDITIONS = ['clean', 'letters', 'digit', 'random']
+
+
+def printed(number):
+    return f'{number[:4]} {number[4:8]} {number[8:]}' if len(number) == 12 else number
+
+
+def garble(number, condition, rng):
+    """The OCR reading of ``number`` under a condition."""
+    chars = list(number)
+    if condition == 'letters':
+        if len(number) == 12:
+            positions = [i for i, char in enumerate(chars) if char in id_validation.LETTER_FOR_DIGIT]
+            for i in rng.sample(positions, min(len(positions), rng.randint(1, 2))):
+                chars[i] = id_validation.LETTER_FOR_DIGIT[chars[i]]
+        else:
+            positions = [i for i, char in enumerate(chars) if char in id_validation.DIGIT_FOR_LETTER
+                         and (5 <= i <= 8) != char.isdigit() and char != 'D']
+            positions += [i for i in range(5, 9) if chars[i] in id_validation.LETTER_FOR_DIGIT]
+            if positions:
+                i = rng.choice(positions)
+                chars[i] = (id_validation.LETTER_FOR_DIGIT[chars[i]] if chars[i].isdigit()
+                            else id_validation.DIGIT_FOR_LETTER[chars[i]])
+    elif condition == 'digit':
+        i = rng.choice([i for i, char in enumerate(chars) if char in LOOKALIKE_DIGITS])
+        chars[i] = rng.choice(LOOKALIKE_DIGITS[chars[i]])
+    return printed(''.join(chars))
+
+
+def valid_swaps(reading):
+    """Numbers one look-alike digit away from ``reading`` that pass the checksum."""
+    found = []
+    for i, char in enumerate(reading):
+        for other in LOOKALIKE_DIGITS.get(char, ''):
+            candidate = reading[:i] + other + reading[i + 1:]
+            if id_validation.is_valid_aadhaar(candidate):
+                found.append(candidate)
+    return found
+
+
+def scalar_verhoeff(number):
+    check = 0
+    for position, digit in enumerate(reversed(number)):
+        check = int(id_validation.VERHOEFF_D[check, id_validation.VERHOEFF_P[position % 8, int(digit)]])
+    return check == 0
+
+
+def best_ms(function, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--numbers', type=int, default=5000, help='Numbers per condition')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    surnames = ['Kumar', 'Sharma', 'Iyer', 'Das', 'Gupta', 'Reddy', 'Nair', 'Singh']
+    print(f"{'condition':>10} {'old accepted':>13} {'right':>8} {'wrong':>8} {'flagged':>8} {'dropped':>8}")
+    for condition in CONDITIONS:
+        counts = dict.fromkeys(['old', 'right', 'wrong', 'flagged', 'dropped'], 0)
+        guessed = ambiguous = 0
+        for index in range(args.numbers):
+            if condition == 'random':
+                truth = None
+                reading = str(rng.randint(10 ** 11, 10 ** 12 - 1))
+            else:
+                aadhaar = condition == 'digit' or index % 2 == 0
+                truth = aadhaar_number(rng) if aadhaar else pan_number(rng, rng.choice(surnames))
+                reading = garble(truth, condition, rng)
+
+            counts['old'] += bool(OLD_RE.search(reading))
+            found = list(id_validation.find_candidates(reading))
+            if not found:
+                counts['dropped'] += 1
+            elif not id_validation.is_valid_number(found[0][2]):
+                counts['flagged'] += 1
+            elif found[0][2] == truth:
+                counts['right'] += 1
+            else:
+                counts['wrong'] += 1
+            if condition == 'digit':
+                swaps = valid_swaps(reading.replace(' ', ''))
+                guessed += swaps == [truth]
+                ambiguous += len(swaps) > 1
+        total = args.numbers
+        print(f"{condition:>10} " + ' '.join(f'{counts[key] / total:>{13 if key == "old" else 8}.1%}'
+                                             for key in ['old', 'right', 'wrong', 'flagged', 'dropped']))
+        if condition == 'digit':
+            print(f"{'':>10} guessing the misread digit: right {guessed / total:.1%}, "
+                  f"several valid readings {ambiguous / total:.1%}")
+
+    numbers = [aadhaar_number(rng) for _ in range(args.numbers)]
+    scalar = best_ms(lambda: [scalar_verhoeff(number) for number in numbers])
+    batch = best_ms(lambda: id_validation.validate_aadhaar_batch(numbers))
+    lines = [garble(number, 'letters', rng) for number in numbers]
+    correct = best_ms(lambda: [list(id_validation.find_candidates(line)) for line in lines])
+    print(f"Verhoeff over {len(numbers)} numbers: scalar {scalar:.2f} ms, vectorized {batch:.2f} ms "
+          f"({scalar / batch:.0f}x); find_candidates {correct * 1000 / len(lines):.1f} us per misread line")
+
+
+if __name__ == '__main__':
+    main()
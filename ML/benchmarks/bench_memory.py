@@ -0,0 +1,166 @@
+"""Cost of explicit gc.collect() calls, and the memory governor under load.
+
+Two phases over ID cards rendered by card_corpus.py, run through the
+lightweight_app.py request path (decode, preprocess, tiered OCR) in this
+process, with the app's OCR reader loaded so the heap is the app's heap:
+
+* gc - every request once with the four ``gc.collect()`` calls the app used
+  to make (after preprocessing, after OCR, after dropping the images, at the
+  end) and once without. Reports time per request, the share of it spent in
+  ``gc.collect()``, the objects it actually found and the RSS either way.
+* governor - N client threads post concurrently through
+  ``MemoryGovernor.admit`` with a small budget (``--limit-mb``), calibrated
+  on the warmed-up process and after three requests on their own to
+  measure the footprint. Reports how
+  images were admitted, the decode sizes used, the peak RSS against the
+  watermark and the footprint per megapixel the governor measured.
+
+Without an OCR backend installed only decode and preprocessing run:
+
+    python benchmarks/bench_memory.py [--requests 30] [--clients 4] [--limit-mb 600]
+"""
+import argparse
+import gc
+import io
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Every request has to run the pipeline, not come from the result cache
+os.environ.setdefault('OCR_CACHE_ENTRIES', '0')
+
+import lightweight_app  # noqa: E402
+import memory_governor  # noqa: E402
+import metrics  # noqa: E402
+from card_corpus import id_card, render  # noqa: E402
+from preprocessing import load_image  # noqa: E402
+
+MB = memory_governor.MB
+
+
+def uploads(count, seed):
+    """JPEG bytes of ``count`` ID cards photographed at 2000 px."""
+    rng = random.Random(seed)
+    images = []
+    for _ in range(count):
+        card = render(id_card(rng)[0], rng, (2000, 1260))
+        images.append(cv2.imencode('.jpg', card, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes())
+    return images
+
+
+def handle(data, max_dimension, collect):
+    """One request through the lightweight path; returns (seconds in gc.collect, objects it found)."""
+    spent, found = 0.0, 0
+
+    def checkpoint():
+        nonlocal spent, found
+        if collect:
+            started = time.perf_counter()
+            found += gc.collect()
+            spent += time.perf_counter() - started
+
+    image = load_image(io.BytesIO(data), max_dimension)
+    gray, card, _ = lightweight_app.lightweight_preprocess(image, max_dimension)
+    checkpoint()
+    lightweight_app.extract_text_lightweight(gray, card)
+    checkpoint()
+    del image, gray, card
+    checkpoint()
+    checkpoint()
+    return spent, found
+
+
+def gc_phase(images, max_dimension):
+    print(f"{'gc.collect':>10} {'ms/request':>11} {'in gc ms':>9} {'gc share':>9} {'objects':>8} "
+          f"{'RSS MB':>7} {'peak MB':>8}")
+    for collect in (True, False):
+        memory_governor.reset_peak_rss()
+        timings, in_gc, found = [], 0.0, 0
+        for data in images:
+            started = time.perf_counter()
+            spent, objects = handle(data, max_dimension, collect)
+            timings.append(time.perf_counter() - started)
+            in_gc += spent
+            found += objects
+        total = sum(timings)
+        print(f"{'4x' if collect else 'none':>10} {total * 1000 / len(images):11.1f} "
+              f"{in_gc * 1000 / len(images):9.2f} {in_gc / total:9.1%} {found / len(images):8.1f} "
+              f"{metrics.process_rss_bytes() / MB:7.0f} {metrics.process_peak_rss_bytes() / MB:8.0f}")
+
+
+def governor_phase(images, clients, limit_mb, max_dimension):
+    governor = memory_governor.MemoryGovernor(limit_mb=limit_mb, on_recycle=None)
+    governor.calibrate()
+    before = Counter({outcome: memory_governor.ADMISSIONS.labels(outcome)._value
+                      for outcome in ('admitted', 'downscaled', 'queued', 'rejected')})
+    dimensions = Counter()
+    lock = threading.Lock()
+    # A few requests on their own first, as in any lull, so the footprint gets measured
+    for data in images[:3]:
+        with governor.admit(max_dimension) as ticket:
+            handle(data, ticket.max_dimension, collect=False)
+    jobs = list(images)
+    memory_governor.reset_peak_rss()
+
+    def client():
+        while True:
+            with lock:
+                if not jobs:
+                    return
+                data = jobs.pop()
+            try:
+                with governor.admit(max_dimension) as ticket:
+                    handle(data, ticket.max_dimension, collect=False)
+                with lock:
+                    dimensions[ticket.max_dimension] += 1
+            except memory_governor.MemoryBusy:
+                pass
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    outcomes = {outcome: memory_governor.ADMISSIONS.labels(outcome)._value - count
+                for outcome, count in before.items()}
+    stats = governor.stats()
+    print(f"{clients} clients, {len(images)} requests in {elapsed:.1f}s with a {limit_mb:.0f} MB budget "
+          f"(high watermark {stats['high_watermark_mb']:.0f} MB)")
+    print('  admissions: ' + ', '.join(f'{outcome} {count:.0f}' for outcome, count in outcomes.items()))
+    print('  decode sizes: ' + ', '.join(f'{dimension} px x{count}' for dimension, count in sorted(dimensions.items())))
+    print(f"  baseline {stats['baseline_mb']:.0f} MB, peak RSS {metrics.process_peak_rss_bytes() / MB:.0f} MB; "
+          f"footprint {stats['footprint_mb_per_megapixel']:.1f} MB/MP from {stats['measured_requests']} solo requests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=30)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--limit-mb', type=float, default=None,
+                        help='Governor budget (default: a high watermark 150 MB above the current RSS)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    reader = lightweight_app.get_ocr_reader()
+    print(f"OCR reader: {'none (decode and preprocessing only)' if reader == 'basic' else type(reader).__name__}")
+    images = uploads(args.requests, args.seed)
+    # Warm caches and buffers before measuring
+    handle(images[0], lightweight_app.ID_MAX_DIMENSION, collect=False)
+
+    gc_phase(images, lightweight_app.ID_MAX_DIMENSION)
+    limit_mb = args.limit_mb or metrics.process_rss_bytes() / MB + 150 / memory_governor.MEMORY_HIGH_WATERMARK
+    governor_phase(images, args.clients, limit_mb, lightweight_app.ID_MAX_DIMENSION)
+
+
+if __name__ == '__main__':
+    main()
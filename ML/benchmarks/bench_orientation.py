@@ -0,0 +1,81 @@
+"""Card orientation from text lines versus the portrait-only aspect rule.
+
+Renders labeled cards (card_corpus.py) under the capture conditions of
+bench_profiles.py, turns each one 0, 90, 180 and 270 degrees and reports how
+often ``orientation.detect_orientation`` brings it back upright, next to the
+old rule (turn portrait frames counter-clockwise), how often it had to fall
+back to that rule and what a decision costs:
+
+    python benchmarks/bench_orientation.py [--cards 20]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orientation  # noqa: E402
+from bench_profiles import CONDITIONS, capture  # noqa: E402
+from card_corpus import business_card, id_card, render  # noqa: E402
+
+TURNS = (0, 90, 180, 270)
+
+
+def upright_card(rng, index):
+    """A rendered RGB card, the right way up."""
+    make, size = (business_card, (1000, 600)) if index % 2 == 0 else (id_card, (1012, 638))
+    image = render(make(rng)[0], rng, size)
+    if image.shape[0] > image.shape[1]:
+        # render() turns some cards to portrait (clockwise); undo it for the ground truth
+        image = cv2.rotate(image, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cards', type=int, default=20, help='Cards per condition')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    right = {}     # (method, condition, turn) -> count
+    fallbacks = 0
+    seconds = []
+    for condition in CONDITIONS:
+        for index in range(args.cards):
+            card = capture(upright_card(rng, index), condition, rng)
+            for turn in TURNS:
+                image = card if not turn else cv2.rotate(card, orientation.ROTATIONS[turn])
+                # Turning the card back upright undoes ``turn``
+                expected = (360 - turn) % 360
+                started = time.perf_counter()
+                decision = orientation.detect_orientation(image, 'text')
+                seconds.append(time.perf_counter() - started)
+                fallbacks += decision.method != 'text'
+                for method, angle in [('text', decision.angle),
+                                      ('aspect', orientation.aspect_orientation(image).angle)]:
+                    key = (method, condition, turn)
+                    right[key] = right.get(key, 0) + (angle == expected)
+
+    total = len(CONDITIONS) * args.cards * len(TURNS)
+    print(f"{total} decisions, share turned upright (text lines / aspect rule)")
+    print(f"{'condition':>10} " + ' '.join(f'{f"{turn} deg":>14}' for turn in TURNS))
+    for condition in CONDITIONS:
+        cells = [f"{right['text', condition, turn] / args.cards:.0%} / {right['aspect', condition, turn] / args.cards:.0%}"
+                 for turn in TURNS]
+        print(f"{condition:>10} " + ' '.join(f'{cell:>14}' for cell in cells))
+    for method in ('text', 'aspect'):
+        share = sum(count for key, count in right.items() if key[0] == method) / total
+        print(f"{method:>10}: {share:.1%} upright")
+    print(f"fell back to the aspect rule: {fallbacks / total:.1%}; "
+          f"{np.median(seconds) * 1000:.1f} ms median, {np.percentile(seconds, 95) * 1000:.1f} ms p95 per decision")
+
+
+if __name__ == '__main__':
+    main()
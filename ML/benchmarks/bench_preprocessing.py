@@ -0,0 +1,107 @@
+"""Micro-benchmark of the shared preprocessing pipeline.
+
+Compares ``preprocessing.preprocess_and_rotate`` against the per-app copy it
+replaced, reporting time per megapixel and peak traced memory at a few
+typical upload sizes. The pipeline is pinned to the work the copy did
+(portrait rule, no card crop, sharpen + Otsu), and run at full resolution
+with its per-thread buffers and without them (one-off arrays, as
+PREPROCESS_BUFFER_MAX_PIXELS=0 gives), so the rows isolate the buffer
+reuse; ``shared-downscaled`` adds the downscale to PREPROCESS_MAX_DIMENSION.
+
+    python benchmarks/bench_preprocessing.py [--repeat 10]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The same steps as the legacy copy; card crop and text orientation are benchmarked on their own
+os.environ.setdefault('PREPROCESS_CARD_CROP', '0')
+os.environ.setdefault('PREPROCESS_ORIENTATION', 'aspect')
+
+import preprocessing  # noqa: E402
+
+SIZES = [(1200, 800), (3000, 2000), (4032, 3024)]
+
+
+def legacy_preprocess_and_rotate(image):
+    """The copy that used to live in app.py, newLogic.py, AI_Agent.py and scan_Bussinesscard.py."""
+    img = np.array(image.convert("RGB"))
+    h, w, _ = img.shape
+    if h > w:
+        img = cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    sharpen_kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])
+    sharp = cv2.filter2D(gray, -1, sharpen_kernel)
+    _, thresh = cv2.threshold(sharp, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return thresh, img
+
+
+def synthetic_photo(width, height, seed=0):
+    """Noisy card-like frame with dark text strokes, shot in portrait to force a rotation."""
+    rng = np.random.default_rng(seed)
+    img = rng.normal(200, 20, (height, width, 3)).clip(0, 255).astype(np.uint8)
+    for row in range(40, height - 40, 60):
+        cv2.putText(img, 'ACME SOLUTIONS 98765 43210', (20, row), cv2.FONT_HERSHEY_SIMPLEX,
+                    1.2, (20, 20, 20), 2)
+    return Image.fromarray(cv2.rotate(img, cv2.ROTATE_90_CLOCKWISE))
+
+
+def measure(fn, image, repeat):
+    fn(image)  # warm buffers and caches
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(image)
+    elapsed = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    fn(image)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    def shared(image):
+        return preprocessing.preprocess_and_rotate(image, max_dimension=0, profile='sharpen')
+
+    def without_reuse(image):
+        max_pixels = preprocessing.PREPROCESS_BUFFER_MAX_PIXELS
+        preprocessing.PREPROCESS_BUFFER_MAX_PIXELS = 0
+        try:
+            return shared(image)
+        finally:
+            preprocessing.PREPROCESS_BUFFER_MAX_PIXELS = max_pixels
+
+    candidates = [
+        ('legacy', legacy_preprocess_and_rotate),
+        ('shared-no-reuse', without_reuse),
+        ('shared', shared),
+        ('shared-downscaled', lambda image: preprocessing.preprocess_and_rotate(image, profile='sharpen')),
+    ]
+    print(f"{'size':>11} {'pipeline':>16} {'ms/MP':>8} {'ms':>8} {'peak MB':>8}")
+    for width, height in SIZES:
+        image = synthetic_photo(width, height)
+        megapixels = width * height / 1e6
+
+        legacy, _ = legacy_preprocess_and_rotate(image)
+        assert np.array_equal(legacy, shared(image)[0]), 'full-resolution output differs from the legacy copy'
+
+        for name, fn in candidates:
+            elapsed, peak = measure(fn, image, args.repeat)
+            print(f"{width:>5}x{height:<5} {name:>16} {elapsed * 1000 / megapixels:8.2f} "
+                  f"{elapsed * 1000:8.1f} {peak / 1e6:8.1f}")
+
+
+if __name__ == '__main__':
+    main()
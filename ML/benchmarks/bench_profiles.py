@@ -0,0 +1,156 @@
+"""Adaptive preprocessing profiles versus always sharpen + Otsu.
+
+Renders labeled cards (card_corpus.py) under several capture conditions -
+clean, coloured stock, soft focus, faded and unevenly lit - and runs each one
+through every preprocessing profile as well as ``auto``, which picks one per
+image from ``preprocessing.analyze_quality``. Reports preprocessing time per
+profile, which profile ``auto`` chose for each condition and, unless
+``--no-ocr``, the OCR field accuracy each profile reaches. The last lines
+compare ``auto`` with the default, always sharpen + Otsu: the time its
+quality check adds, and whether its accuracy makes up for it:
+
+    python benchmarks/bench_profiles.py [--cards 12] [--backend torch] [--no-ocr]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orientation  # noqa: E402
+import preprocessing  # noqa: E402
+from bench_e2e import score  # noqa: E402
+from card_corpus import business_card, id_card, render  # noqa: E402
+from id_roi import find_numbers  # noqa: E402
+
+CONDITIONS = ['clean', 'coloured', 'blurred', 'faded', 'uneven']
+STRATEGIES = ['auto'] + list(preprocessing.PROFILES)
+
+
+def capture(image, condition, rng):
+    """Applies a capture condition to a rendered (BGR) card."""
+    if condition == 'coloured':
+        tint = np.array([rng.uniform(0.6, 0.8), rng.uniform(0.85, 1.0), 1.0])
+        return (image * tint).astype(np.uint8)
+    if condition == 'blurred':
+        return cv2.GaussianBlur(image, (0, 0), rng.uniform(1.5, 3.0))
+    if condition == 'faded':
+        floor, gain = rng.uniform(90, 130), rng.uniform(0.2, 0.35)
+        return (floor + image.astype(np.float32) * gain).clip(0, 255).astype(np.uint8)
+    if condition == 'uneven':
+        # Light falling off across the card in a random direction
+        height, width = image.shape[:2]
+        angle = rng.uniform(0, 2 * np.pi)
+        rows, cols = np.mgrid[0:height, 0:width]
+        ramp = np.cos(angle) * cols / width + np.sin(angle) * rows / height
+        ramp = (ramp - ramp.min()) / (ramp.max() - ramp.min())
+        darkest = rng.uniform(0.25, 0.45)
+        return (image * (darkest + ramp * (1 - darkest))[..., None]).clip(0, 255).astype(np.uint8)
+    return image
+
+
+def make_samples(cards, seed):
+    """``[(condition, kind, RGB image, expected fields)]``, ``cards`` per condition."""
+    rng = random.Random(seed)
+    samples = []
+    for condition in CONDITIONS:
+        for index in range(cards):
+            kind, make, size = (('business_card', business_card, (1000, 600)) if index % 2 == 0
+                                else ('id_card', id_card, (1012, 638)))
+            lines, expected = make(rng)
+            image = capture(render(lines, rng, size), condition, rng)
+            samples.append((condition, kind, cv2.cvtColor(image, cv2.COLOR_BGR2RGB), expected))
+    return samples
+
+
+def prepare(image, strategy):
+    """Times one strategy on an image; returns (OCR input, chosen profile, seconds)."""
+    started = time.perf_counter()
+    profile = strategy
+    if strategy == 'auto':
+        # Measured on the small copy the pipeline shares between its stages
+        small = orientation.shrink(image, preprocessing.ANALYSIS_DIMENSION)
+        profile = preprocessing.choose_profile(preprocessing.analyze_quality(small))
+    processed = preprocessing.apply_profile(image, profile)
+    return processed.copy(), profile, time.perf_counter() - started
+
+
+def read_fields(reader, processed, kind):
+    import newLogic
+
+    texts = reader.readtext(processed, detail=0)
+    if kind == 'business_card':
+        return newLogic.build_business_card_response(texts)
+    return newLogic.build_id_response(find_numbers(' '.join(texts)), texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cards', type=int, default=12, help='Cards per condition')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help='Timing repetitions per image')
+    parser.add_argument('--backend', default=None)
+    parser.add_argument('--no-ocr', action='store_true', help='Only time the preprocessing')
+    args = parser.parse_args()
+
+    samples = make_samples(args.cards, args.seed)
+    reader = None
+    if not args.no_ocr:
+        from ocr_backends import create_reader
+        reader = create_reader(args.backend)
+
+    seconds = {}   # (condition, strategy) -> [s]
+    correct = {}   # (condition, strategy) -> [right, total]
+    chosen = {condition: Counter() for condition in CONDITIONS}
+    for condition, kind, image, expected in samples:
+        for strategy in STRATEGIES:
+            timings = []
+            for _ in range(args.repeat):
+                processed, profile, elapsed = prepare(image, strategy)
+                timings.append(elapsed)
+            seconds.setdefault((condition, strategy), []).append(min(timings))
+            if strategy == 'auto':
+                chosen[condition][profile] += 1
+            if reader is not None:
+                fields = score(expected, read_fields(reader, processed, kind))
+                counts = correct.setdefault((condition, strategy), [0, 0])
+                counts[0] += sum(fields.values())
+                counts[1] += len(fields)
+
+    print(f"{len(samples)} cards, preprocessing ms (best of {args.repeat}) / field accuracy")
+    print(f"{'condition':>10} " + ' '.join(f'{strategy:>16}' for strategy in STRATEGIES))
+    for condition in CONDITIONS:
+        cells = []
+        for strategy in STRATEGIES:
+            cell = f"{np.mean(seconds[condition, strategy]) * 1000:.2f}"
+            if (condition, strategy) in correct:
+                right, total = correct[condition, strategy]
+                cell += f" / {right / total:.0%}"
+            cells.append(f'{cell:>16}')
+        print(f"{condition:>10} " + ' '.join(cells))
+
+    print('auto chose:')
+    for condition in CONDITIONS:
+        print(f"  {condition:>10}: " + ', '.join(f'{profile} {count}' for profile, count in chosen[condition].most_common()))
+    auto = sum(sum(seconds[condition, 'auto']) for condition in CONDITIONS) * 1000 / len(samples)
+    always = sum(sum(seconds[condition, 'sharpen']) for condition in CONDITIONS) * 1000 / len(samples)
+    print(f"auto vs always sharpen + Otsu: {auto:.2f} vs {always:.2f} ms per card "
+          f"({abs(auto - always):.2f} ms {'slower' if auto > always else 'faster'})")
+    if not correct:
+        print("field accuracy not measured (--no-ocr)")
+        return
+    for strategy in ('auto', 'sharpen'):
+        right = sum(correct[condition, strategy][0] for condition in CONDITIONS)
+        total = sum(correct[condition, strategy][1] for condition in CONDITIONS)
+        print(f"{strategy} field accuracy over all conditions: {right / total:.1%}")
+
+
+if __name__ == '__main__':
+    main()
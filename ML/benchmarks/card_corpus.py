@@ -0,0 +1,186 @@
+"""Synthetic labeled corpus of business cards and Aadhaar / PAN style cards.
+
+Renders card images with OpenCV's built-in fonts, with light scanner noise,
+a small skew and some portrait shots, and writes a ground-truth JSON next to
+each image:
+
+    benchmarks/corpus/card-000.jpg
+    benchmarks/corpus/card-000.json   {"kind": "business_card", "lines": [...], "expected": {...}}
+
+``expected`` uses the keys of the matching endpoint response (``/upload`` or
+``/extract-id-number``). The corpus is deterministic for a given seed:
+
+    python benchmarks/card_corpus.py [--output benchmarks/corpus] [--cards 24] [--ids 16] [--seed 0]
+
+``load_corpus`` reads such a directory back; a directory of real cards
+labeled the same way works too.
+"""
+import argparse
+import json
+import os
+import random
+
+import cv2
+import numpy as np
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+FIRST_NAMES = ['Ravi', 'Priya', 'Anil', 'Sneha', 'John', 'Fatima', 'Arjun', 'Meera', 'Ramesh', 'Kavya']
+LAST_NAMES = ['Kumar', 'Sharma', 'Mehta', 'Iyer', 'Doe', 'Khan', 'Reddy', 'Nair', 'Patel', 'Singh']
+DESIGNATIONS = ['Senior Engineer', 'Project Manager', 'Sales Director', 'Chief Executive Officer',
+                'Business Analyst', 'Lead Designer', 'Software Developer', 'Marketing Executive']
+COMPANIES = [('Acme Solutions Pvt Ltd', 'acme.com'), ('Global Tech Industries', 'globaltech.in'),
+             ('Sunrise Consulting LLP', 'sunriseconsulting.co.in'), ('Blue Ocean Technologies', 'blueocean.io'),
+             ('Orbit Associates', 'orbit.org'), ('Kite Software Services', 'kitesoft.net')]
+STREETS = ['12, MG Road', 'Plot 45, Sector 18', '3rd Floor, Tower B, Cyber Park', 'House No. 221, Main Street',
+           '7, Anna Nagar West', 'Block C, Ring Road']
+CITIES = [('Hyderabad', '500034'), ('Bengaluru', '560001'), ('Chennai', '600040'), ('New Delhi', '110001'),
+          ('Pune', '411001'), ('Noida', '201301')]
+DOBS = ['12/04/1990', '01/01/1985', '23/11/1978', '05/06/2001', '30/09/1994']
+
+# Verhoeff tables, for Aadhaar numbers that carry a valid check digit
+_VERHOEFF_D = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 2, 3, 4, 0, 6, 7, 8, 9, 5], [2, 3, 4, 0, 1, 7, 8, 9, 5, 6],
+    [3, 4, 0, 1, 2, 8, 9, 5, 6, 7], [4, 0, 1, 2, 3, 9, 5, 6, 7, 8], [5, 9, 8, 7, 6, 0, 4, 3, 2, 1],
+    [6, 5, 9, 8, 7, 1, 0, 4, 3, 2], [7, 6, 5, 9, 8, 2, 1, 0, 4, 3], [8, 7, 6, 5, 9, 3, 2, 1, 0, 4],
+    [9, 8, 7, 6, 5, 4, 3, 2, 1, 0],
+]
+_VERHOEFF_P = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 5, 7, 6, 2, 8, 3, 0, 9, 4], [5, 8, 0, 3, 7, 9, 6, 1, 4, 2],
+    [8, 9, 1, 6, 0, 4, 3, 5, 2, 7], [9, 4, 5, 3, 1, 2, 6, 8, 7, 0], [4, 2, 8, 6, 5, 7, 3, 9, 0, 1],
+    [2, 7, 9, 3, 8, 0, 6, 4, 1, 5], [7, 0, 4, 6, 9, 1, 3, 2, 5, 8],
+]
+_VERHOEFF_INV = [0, 4, 3, 2, 1, 5, 6, 7, 8, 9]
+
+
+def aadhaar_number(rng):
+    """12 digits, not starting with 0 or 1, ending in a Verhoeff check digit."""
+    digits = [rng.randint(2, 9)] + [rng.randint(0, 9) for _ in range(10)]
+    check = 0
+    for i, digit in enumerate(reversed(digits)):
+        check = _VERHOEFF_D[check][_VERHOEFF_P[(i + 1) % 8][digit]]
+    return ''.join(map(str, digits)) + str(_VERHOEFF_INV[check])
+
+
+def pan_number(rng, surname):
+    """AAAAA9999A with the holder-type (P) and surname letters in place."""
+    letters = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    return (''.join(rng.choice(letters) for _ in range(3)) + 'P' + surname[0].upper()
+            + ''.join(rng.choice('0123456789') for _ in range(4)) + rng.choice(letters))
+
+
+def business_card(rng):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    company, domain = rng.choice(COMPANIES)
+    mobile = rng.choice('6789') + ''.join(rng.choice('0123456789') for _ in range(9))
+    landline = f"040 {''.join(rng.choice('0123456789') for _ in range(8))}"
+    street = rng.choice(STREETS)
+    city, pincode = rng.choice(CITIES)
+    has_landline = rng.random() < 0.6
+    has_website = rng.random() < 0.7
+
+    lines = [name, rng.choice(DESIGNATIONS), company, f"Mobile: +91 {mobile}"]
+    if has_landline:
+        lines.append(f"Tel: {landline}")
+    email = f"{name.split()[0].lower()}@{domain}"
+    lines.append(email)
+    if has_website:
+        lines.append(f"www.{domain}")
+    lines += [street, f"{city} - {pincode}, India"]
+    expected = {
+        'name': name,
+        'designation': lines[1],
+        'company': company,
+        'email': email,
+        'personal_mobile_number': mobile,
+        'company_number': landline if has_landline else 'Not Found',
+        'website': f"www.{domain}" if has_website else 'Not Found',
+        'address': f"{street}, {city} - {pincode}, India",
+    }
+    return lines, expected
+
+
+def id_card(rng):
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}".upper()
+    if rng.random() < 0.5:
+        number = aadhaar_number(rng)
+        lines = ['GOVERNMENT OF INDIA', name.title(), f"DOB: {rng.choice(DOBS)}",
+                 rng.choice(['MALE', 'FEMALE']), f"{number[:4]} {number[4:8]} {number[8:]}",
+                 'Aadhaar - Aam Aadmi ka Adhikar']
+        card_type = 'Aadhar'
+    else:
+        number = pan_number(rng, name.split()[1])
+        lines = ['INCOME TAX DEPARTMENT', 'GOVT. OF INDIA', name, f"{rng.choice(LAST_NAMES).upper()} {name.split()[1]}",
+                 rng.choice(DOBS), 'Permanent Account Number', number]
+        card_type = 'PAN'
+    expected = {'detected_card_type': card_type, 'primary_number': number, 'primary_type': card_type}
+    return lines, expected
+
+
+def render(lines, rng, size=(1000, 600)):
+    """Draws the lines on a card, then adds noise, skew and sometimes a portrait turn."""
+    width, height = size
+    background = rng.randint(215, 245)
+    image = np.full((height, width, 3), background, dtype=np.uint8)
+    row_height = (height - 60) // max(len(lines), 1)
+    scale = min(1.3, row_height / 42)
+    font = rng.choice([cv2.FONT_HERSHEY_SIMPLEX, cv2.FONT_HERSHEY_DUPLEX])
+    for row, text in enumerate(lines):
+        ink = rng.randint(10, 60)
+        cv2.putText(image, text, (40 + rng.randint(0, 20), 50 + row * row_height + row_height // 2),
+                    font, scale, (ink, ink, ink), 2, cv2.LINE_AA)
+
+    noise = np.random.default_rng(rng.randint(0, 2 ** 31)).normal(0, 6, image.shape)
+    image = (image + noise).clip(0, 255).astype(np.uint8)
+    angle = rng.uniform(-2.0, 2.0)
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    image = cv2.warpAffine(image, matrix, (width, height), borderMode=cv2.BORDER_REPLICATE)
+    if rng.random() < 0.15:
+        # A phone held upright; the apps turn portrait frames back to landscape
+        image = cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)
+    return image
+
+
+def build_corpus(output, cards=24, ids=16, seed=0):
+    """Writes the corpus into ``output`` and returns the number of images."""
+    rng = random.Random(seed)
+    os.makedirs(output, exist_ok=True)
+    jobs = [('card', 'business_card', business_card, (1000, 600))] * cards
+    jobs += [('id', 'id_card', id_card, (1012, 638))] * ids
+    counters = {}
+    for prefix, kind, make, size in jobs:
+        index = counters[prefix] = counters.get(prefix, -1) + 1
+        lines, expected = make(rng)
+        image = render(lines, rng, size)
+        stem = os.path.join(output, f'{prefix}-{index:03d}')
+        cv2.imwrite(stem + '.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        with open(stem + '.json', 'w') as label:
+            json.dump({'kind': kind, 'lines': lines, 'expected': expected}, label, indent=2)
+    return len(jobs)
+
+
+def load_corpus(directory):
+    """Returns ``[(image path, label dict)]`` for every labeled image in ``directory``."""
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        label_path = os.path.join(directory, stem + '.json')
+        if extension.lower() in ('.jpg', '.jpeg', '.png') and os.path.exists(label_path):
+            with open(label_path) as label:
+                samples.append((os.path.join(directory, name), json.load(label)))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default=DEFAULT_CORPUS)
+    parser.add_argument('--cards', type=int, default=24, help='business cards to render')
+    parser.add_argument('--ids', type=int, default=16, help='Aadhaar / PAN cards to render')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    count = build_corpus(args.output, args.cards, args.ids, args.seed)
+    print(f"Wrote {count} labeled images to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
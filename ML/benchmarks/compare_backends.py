@@ -0,0 +1,156 @@
+"""Side-by-side comparison of the OCR backends in ocr_backends.py.
+
+Each backend runs in its own process so load time and peak RSS are not
+polluted by the other one. Every image goes through the shared preprocessing
+first, like in the apps, and the recognised text is compared against the
+first backend listed (the reference):
+
+    python benchmarks/compare_backends.py [--backends easyocr onnx] [--images DIR] [--repeat 3] [--json out.json]
+
+Without --images a handful of synthetic cards is rendered instead.
+"""
+import argparse
+import difflib
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import preprocessing  # noqa: E402
+from ocr_backends import BACKENDS, create_reader  # noqa: E402
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+SYNTHETIC_LINES = [
+    ['ACME SOLUTIONS PVT LTD', 'Ravi Kumar', 'Senior Engineer', '+91 98765 43210', 'ravi.kumar@acme.com'],
+    ['GOVERNMENT OF INDIA', 'Priya Sharma', 'DOB: 12/04/1990', '2345 6789 0123'],
+    ['INCOME TAX DEPARTMENT', 'ANIL MEHTA', 'Permanent Account Number', 'ABCDE1234F'],
+]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process, from /proc (Linux only)."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def synthetic_card(lines):
+    image = np.full((600, 1000, 3), 235, dtype=np.uint8)
+    for row, text in enumerate(lines):
+        cv2.putText(image, text, (40, 90 + row * 100), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (30, 30, 30), 3)
+    return image
+
+
+def load_images(directory):
+    """Returns ``[(name, preprocessed image)]`` from a directory or the synthetic set."""
+    from PIL import Image
+    if directory is None:
+        sources = [(f'synthetic-{i}', Image.fromarray(synthetic_card(lines)))
+                   for i, lines in enumerate(SYNTHETIC_LINES)]
+    else:
+        sources = []
+        for name in sorted(os.listdir(directory)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                with open(os.path.join(directory, name), 'rb') as stream:
+                    sources.append((name, preprocessing.load_image(stream, preprocessing.PREPROCESS_MAX_DIMENSION)))
+    return [(name, preprocessing.preprocess_and_rotate(image)[0].copy()) for name, image in sources]
+
+
+def run_backend(backend, images_dir, repeat, threads, results):
+    """Child process: loads one backend and times it over every image."""
+    images = load_images(images_dir)
+    started = time.perf_counter()
+    reader = create_reader(backend, threads=threads)
+    load_seconds = time.perf_counter() - started
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+    started = time.perf_counter()
+    reader.readtext(images[0][1], detail=0)
+    warmup_seconds = time.perf_counter() - started
+
+    latencies, texts = [], {}
+    for name, image in images:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            texts[name] = reader.readtext(image, detail=0)
+            latencies.append(time.perf_counter() - started)
+
+    results.put({
+        'backend': backend,
+        'load_seconds': load_seconds,
+        'warmup_seconds': warmup_seconds,
+        'mean_ms': float(np.mean(latencies) * 1000),
+        'p50_ms': float(np.percentile(latencies, 50) * 1000),
+        'p95_ms': float(np.percentile(latencies, 95) * 1000),
+        'peak_rss_mb': peak_rss_mb(),
+        'texts': texts,
+    })
+
+
+def agreement(reference, candidate):
+    """Mean character-level similarity of the joined text per image (1.0 = identical)."""
+    ratios = [difflib.SequenceMatcher(None, ' '.join(reference[name]), ' '.join(candidate.get(name, []))).ratio()
+              for name in reference]
+    return float(np.mean(ratios)) if ratios else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--images', help='directory of card photos (default: synthetic cards)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=1, help='intra-op threads, as in one OCR pool worker')
+    parser.add_argument('--json', help='also write the full report, including the texts, to this file')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    reports = []
+    for backend in args.backends:
+        results = context.Queue()
+        process = context.Process(target=run_backend, args=(backend, args.images, args.repeat, args.threads, results))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"{backend}: failed with exit code {process.exitcode}")
+            continue
+        reports.append(results.get())
+
+    if not reports:
+        return
+    reference = reports[0]
+    print(f"{'backend':>10} {'load s':>8} {'warm s':>8} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'peak MB':>8} {'agree':>6}")
+    for report in reports:
+        report['agreement'] = agreement(reference['texts'], report['texts'])
+        rss = f"{report['peak_rss_mb']:8.0f}" if report['peak_rss_mb'] is not None else f"{'n/a':>8}"
+        print(f"{report['backend']:>10} {report['load_seconds']:8.2f} {report['warmup_seconds']:8.2f} "
+              f"{report['mean_ms']:9.1f} {report['p50_ms']:8.1f} {report['p95_ms']:8.1f} {rss} "
+              f"{report['agreement']:6.3f}")
+    for report in reports[1:]:
+        for name, lines in reference['texts'].items():
+            if report['texts'].get(name) != lines:
+                print(f"  {report['backend']} differs on {name}: {report['texts'].get(name)} vs {lines}")
+
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump({'reference': reference['backend'], 'backends': reports}, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
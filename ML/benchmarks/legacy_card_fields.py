@@ -0,0 +1,181 @@
+"""The business card extractors newLogic.py used before card_fields.py.
+
+Kept verbatim as the reference that benchmarks/bench_card_fields.py checks
+``card_fields`` against; the apps no longer call them.
+"""
+import re
+
+
+def extract_email(text):
+    """Extracts email addresses using regex."""
+    match = re.search(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
+    return match.group(0) if match else None
+
+def extract_mobile_number(text):
+    """Extracts a 10-digit mobile number, optionally with a +91 prefix."""
+    mobile_patterns = [
+        r'(?:m|mob|mobile)?[:\s]*(\+91[-\s]?)?([6-9]\d{9})\b',
+        r'\b([6-9]\d{9})\b'
+    ]
+    
+    for pattern in mobile_patterns:
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        for match in matches:
+            number = "".join(filter(None, match)).strip()
+            if not re.search(r'(?:ext|extension|x|fax)\s*[:\s]*' + re.escape(number), text, re.IGNORECASE):
+                return number
+    
+    return None
+
+def extract_company_number(text):
+    """Extracts a company landline number, potentially with context or an extension."""
+    patterns = [
+        r'(?:tel|phone|ph|o|office|work|fax)[:\s]*([\+]\d{1,3}[-\s]?)?(\(?\d{2,5}\)?[-\s]?\d{6,8}(\s*(?:ext|extension|x)[-:\s]*\d+)?)',
+        r'(\+91[-\s]*(?:0?[1-5]\d|40|80|11|22|33|44)[-\s]*\d{6,8})(\s*(?:ext|extension|x)[-:\s]*\d+)?'
+    ]
+    
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            full_number = "".join([g for g in match.groups() if g is not None]).strip()
+            clean_number = re.sub(r'[^\d]', '', full_number)
+            if len(clean_number) == 10 and clean_number.startswith(('6','7','8','9')):
+                continue
+            return full_number
+    
+    return None
+
+def extract_website(text):
+    """Extracts a website URL, improved to not misidentify email addresses."""
+    match = re.search(r'\b(?:https?:\/\/)?(?:www\.)?[-a-zA-Z0-9:%._\+~#=]{2,256}\.[a-zA-Z]{2,6}\b', text, re.IGNORECASE)
+    if match:
+        url = match.group(0)
+        if '@' in url:
+            return None
+        if any(tld in url for tld in ['.com', '.in', '.org', '.net', '.co', '.io', '.tech']):
+            return url
+    return None
+
+def extract_company_name(lines):
+    """Extracts company name using a broader list of keywords."""
+    company_keywords = [
+        'pvt', 'ltd', 'limited', 'llp', 'inc', 'corp', 'solutions', 'services', 
+        'industries', 'group', 'associates', 'consulting', 'global', 'technologies', 'software'
+    ]
+    for line in lines:
+        if any(keyword in line.lower() for keyword in company_keywords):
+            return line.strip().title()
+    for line in lines:
+        if line.isupper() and 2 < len(line.split()) < 5:
+            return line.title()
+    return "Not Found"
+
+def extract_address(lines):
+    """Extracts address by identifying generic address-related keywords."""
+    address_parts = []
+    address_keywords = [
+        'block', 'house', 'road', 'street', 'avenue', 'lane', 'floor', 'building', 
+        'marg', 'sector', 'pincode', 'india', r'\b\d{5,6}\b', 'nagar', 'park', 'ave'
+    ]
+    non_address_keywords = ['@', 'www', '.com', 'phone', 'mobile', 'email', 'pvt', 'ltd', r'\+91', 'director', 'manager']
+    
+    cleaned_lines = []
+    for line in lines:
+        cleaned_line = line.strip()
+        cleaned_line = re.sub(r'[Ii][Ii][lI](?=\s|,|$)', 'III', cleaned_line, flags=re.IGNORECASE)
+        cleaned_line = cleaned_line.replace(';', ',')
+        if cleaned_line:
+            cleaned_lines.append(cleaned_line)
+    
+    start_index = -1
+    for i, line in enumerate(cleaned_lines):
+        if any(re.search(keyword, line.lower()) for keyword in address_keywords):
+            if not any(re.search(keyword, line.lower()) for keyword in non_address_keywords):
+                start_index = i
+                break
+    
+    if start_index != -1:
+        for i in range(start_index, len(cleaned_lines)):
+            line = cleaned_lines[i].strip()
+            line_lower = line.lower()
+            if not line: continue
+            if any(re.search(keyword, line_lower) for keyword in non_address_keywords): break
+            words = line.split()
+            if len(words) in [2, 3] and all(word.isalpha() for word in words):
+                if not any(re.search(keyword, line_lower) for keyword in address_keywords):
+                    continue
+            address_parts.append(line)
+            if len(address_parts) >= 2 and any(re.search(keyword, line_lower) for keyword in ['india', r'\b\d{5,6}\b']):
+                break
+    
+    pincode = None
+    for line in cleaned_lines:
+        pincode_match = re.search(r'\b(\d{6})\b', line)
+        if pincode_match:
+            pincode = pincode_match.group(1)
+            break
+    
+    if pincode and not any(pincode in part for part in address_parts):
+        address_parts.append(pincode)
+        
+    if address_parts:
+        address = ', '.join(part for part in address_parts if part).strip()
+        address = re.sub(r'\s*,\s*', ', ', address).replace(" ,", ",")
+        
+        address_parts_formatted = address.split(', ')
+        final_parts = []
+        for part in address_parts_formatted:
+            formatted_part = part.title()
+            formatted_part = re.sub(r'\bIii\b', 'III', formatted_part)
+            words = formatted_part.split(' ')
+            corrected_words = [word.upper() if len(word) == 2 and word.isalpha() else word for word in words]
+            final_parts.append(' '.join(corrected_words))
+        
+        address = ', '.join(final_parts)
+        address = re.sub(r'([A-Za-z]+)\s*-\s*(III)', r'\1-\2', address)
+        address = re.sub(r',\s*(\d{5,6})$', r' - \1', address)
+        return address
+
+    return "Not Found"
+
+def extract_name_and_designation(lines):
+    """Extracts name and designation using a more robust filtering approach."""
+    name = None
+    designation = None
+    
+    designation_keywords = [
+        'director', 'manager', 'engineer', 'strategy', 'delivery', 'officer', 'ceo', 'cto', 
+        'cfo', 'coo', 'founder', 'partner', 'consultant', 'president', 'executive', 
+        'analyst', 'developer', 'designer', 'architect', 'head', 'lead', 'specialist', 'project manager'
+    ]
+    
+    non_name_keywords = [
+        '@', '.com', 'www', 'http', '+', 'tel', 'mob', 'email', 'website',
+        'pvt', 'ltd', 'inc', 'corp', 'solutions', 'services', 'technologies', 'industries', 'llp', 'group',
+        'road', 'street', 'floor', 'lane', 'marg', 'sector', 'pincode', 'nagar', 'house', 
+        'block', 'building', 'avenue', 'india'
+    ]
+    
+    candidates = []
+    for line in lines:
+        line_lower = line.lower()
+        if not any(char.isdigit() for char in line) and not any(kw in line_lower for kw in non_name_keywords):
+            if 0 < len(line.split()) < 5:
+                candidates.append(line.strip())
+
+    remaining_candidates = []
+    for line in candidates:
+        if any(re.search(r'\b' + keyword + r'\b', line.lower()) for keyword in designation_keywords):
+            if not designation:
+                designation = line.title()
+        else:
+            remaining_candidates.append(line)
+
+    if remaining_candidates:
+        name_candidates = [c for c in remaining_candidates if len(c.split()) in [2, 3]]
+        if name_candidates:
+            name = max(name_candidates, key=len).title()
+        elif remaining_candidates:
+            name = max(remaining_candidates, key=len).title()
+
+    return name, designation
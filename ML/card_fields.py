@@ -0,0 +1,439 @@
+"""Single-pass field extraction for business cards.
+
+Produces exactly what running ``extract_email``, ``extract_mobile_number``,
+``extract_company_number``, ``extract_website``,
+``extract_name_and_designation``, ``extract_company_name`` and
+``extract_address`` one after another produced, but scans the card once:
+
+* every keyword list those extractors use goes into one compiled scanner;
+  each line is lowered and run through it a single time, and the hits are
+  folded into a bitmask of field categories per line;
+* the full-text patterns (email, phone numbers, website) are compiled once.
+  They keep a search each, because their matches overlap (a website match
+  sits inside every email) and each field keeps its own first-match rule.
+
+Fields are computed on first use and kept on the CardAnalysis, so prompt
+mode (``extract_custom_data``) serves aliases such as 'mobile' / 'phone'
+and the name / designation pair from one computation. The prompt itself is
+matched against the field names by one precompiled scanner as well.
+
+The extractors above are kept as the reference in
+benchmarks/legacy_card_fields.py; benchmarks/bench_card_fields.py checks
+both give the same output.
+"""
+import functools
+import re
+from bisect import bisect_right
+
+# --- Keyword lists, as used by the extractors ---
+COMPANY_KEYWORDS = [
+    'pvt', 'ltd', 'limited', 'llp', 'inc', 'corp', 'solutions', 'services',
+    'industries', 'group', 'associates', 'consulting', 'global', 'technologies', 'software'
+]
+# extract_address also treats a 5-6 digit run as an address keyword
+ADDRESS_KEYWORDS = [
+    'block', 'house', 'road', 'street', 'avenue', 'lane', 'floor', 'building',
+    'marg', 'sector', 'pincode', 'india', 'nagar', 'park', 'ave'
+]
+# extract_address searches '.com' as a regex: any character followed by 'com'
+NON_ADDRESS_KEYWORDS = ['@', 'www', 'phone', 'mobile', 'email', 'pvt', 'ltd', '+91', 'director', 'manager']
+DESIGNATION_KEYWORDS = [
+    'director', 'manager', 'engineer', 'strategy', 'delivery', 'officer', 'ceo', 'cto',
+    'cfo', 'coo', 'founder', 'partner', 'consultant', 'president', 'executive',
+    'analyst', 'developer', 'designer', 'architect', 'head', 'lead', 'specialist', 'project manager'
+]
+NON_NAME_KEYWORDS = [
+    '@', '.com', 'www', 'http', '+', 'tel', 'mob', 'email', 'website',
+    'pvt', 'ltd', 'inc', 'corp', 'solutions', 'services', 'technologies', 'industries', 'llp', 'group',
+    'road', 'street', 'floor', 'lane', 'marg', 'sector', 'pincode', 'nagar', 'house',
+    'block', 'building', 'avenue', 'india'
+]
+ITEM_KEYWORDS = ['item', 'items', 'product', 'products']
+
+# Public email domains to avoid misinterpreting as company names
+PUBLIC_EMAIL_DOMAINS = {
+    'gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com', 'aol.com', 'icloud.com', 'protonmail.com'
+}
+EMAIL_DOMAIN_TLDS = sorted(['.com', '.in', '.org', '.net', '.co.uk', '.co.in', '.co'], key=len, reverse=True)
+WEBSITE_TLDS = ['.com', '.in', '.org', '.net', '.co', '.io', '.tech']
+
+# --- Field categories a line can fall into ---
+COMPANY = 1
+ADDRESS = 2
+# 'india' or a 5-6 digit run: where an address usually ends
+ADDRESS_END = 4
+NON_ADDRESS = 8
+DESIGNATION = 16
+NON_NAME = 32
+ITEM = 64
+CATEGORY_NAMES = {
+    COMPANY: 'company', ADDRESS: 'address', ADDRESS_END: 'address_end', NON_ADDRESS: 'non_address',
+    DESIGNATION: 'designation', NON_NAME: 'non_name', ITEM: 'item',
+}
+
+_CATEGORY_LISTS = [
+    (COMPANY, COMPANY_KEYWORDS),
+    (ADDRESS, ADDRESS_KEYWORDS),
+    (ADDRESS_END, ['india']),
+    (NON_ADDRESS, NON_ADDRESS_KEYWORDS),
+    (NON_NAME, NON_NAME_KEYWORDS),
+    (ITEM, ITEM_KEYWORDS),
+]
+_DESIGNATION_SET = frozenset(DESIGNATION_KEYWORDS)
+# 'com' stands in for the '.com' regex of extract_address
+_KEYWORDS = sorted({kw for _, kws in _CATEGORY_LISTS for kw in kws} | _DESIGNATION_SET | {'com'},
+                   key=len, reverse=True)
+_MASKS = {kw: sum(category for category, kws in _CATEGORY_LISTS if kw in kws) for kw in _KEYWORDS}
+# Longer keywords come first, so the scanner reports the longest keyword
+# starting at each offset; any other keyword starting there is a prefix of it
+_PREFIXES = {kw: [other for other in _KEYWORDS if kw.startswith(other)] for kw in _KEYWORDS}
+KEYWORD_SCANNER = re.compile(
+    r'(?=(' + '|'.join(re.escape(kw) for kw in _KEYWORDS) + r'))|\b(\d{5,6})\b'
+)
+
+# --- Full-text patterns ---
+EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+MOBILE_RES = [
+    re.compile(r'(?:m|mob|mobile)?[:\s]*(\+91[-\s]?)?([6-9]\d{9})\b', re.IGNORECASE),
+    re.compile(r'\b([6-9]\d{9})\b', re.IGNORECASE),
+]
+COMPANY_NUMBER_RES = [
+    re.compile(r'(?:tel|phone|ph|o|office|work|fax)[:\s]*([\+]\d{1,3}[-\s]?)?(\(?\d{2,5}\)?[-\s]?\d{6,8}(\s*(?:ext|extension|x)[-:\s]*\d+)?)', re.IGNORECASE),
+    re.compile(r'(\+91[-\s]*(?:0?[1-5]\d|40|80|11|22|33|44)[-\s]*\d{6,8})(\s*(?:ext|extension|x)[-:\s]*\d+)?', re.IGNORECASE),
+]
+WEBSITE_RE = re.compile(r'\b(?:https?:\/\/)?(?:www\.)?[-a-zA-Z0-9:%._\+~#=]{2,256}\.[a-zA-Z]{2,6}\b', re.IGNORECASE)
+# A label that ends right where a number starts (searched with endpos)
+EXTENSION_TAIL_RE = re.compile(r'(?:ext|extension|x|fax)\s*[:\s]*\Z', re.IGNORECASE)
+NON_DIGIT_RE = re.compile(r'[^\d]')
+ROMAN_THREE_RE = re.compile(r'[Ii][Ii][lI](?=\s|,|$)', re.IGNORECASE)
+PINCODE_RE = re.compile(r'\b(\d{6})\b')
+COMMA_RE = re.compile(r'\s*,\s*')
+III_RE = re.compile(r'\bIii\b')
+HYPHEN_III_RE = re.compile(r'([A-Za-z]+)\s*-\s*(III)')
+TRAILING_PIN_RE = re.compile(r',\s*(\d{5,6})$')
+
+
+def _is_word(char):
+    # What \b considers a word character
+    return char.isalnum() or char == '_'
+
+
+def scan_line(lower):
+    """Runs the keyword scanner over one lowered line.
+
+    Returns ``(mask, hits)``: the category bitmask and ``(keyword, offset)``
+    for every keyword occurrence (the digit runs are reported as '#####').
+    """
+    mask = 0
+    hits = []
+    for match in KEYWORD_SCANNER.finditer(lower):
+        start = match.start()
+        longest = match.group(1)
+        if longest is None:
+            mask |= ADDRESS | ADDRESS_END
+            hits.append(('#####', start))
+            continue
+        for keyword in _PREFIXES[longest]:
+            hits.append((keyword, start))
+            mask |= _MASKS[keyword]
+            if keyword == 'com' and start > 0 and lower[start - 1] != '\n':
+                mask |= NON_ADDRESS
+            if (keyword in _DESIGNATION_SET and not mask & DESIGNATION
+                    and (start == 0 or not _is_word(lower[start - 1]))
+                    and (start + len(keyword) == len(lower) or not _is_word(lower[start + len(keyword)]))):
+                mask |= DESIGNATION
+    return mask, hits
+
+
+def _memoized(method):
+    """Computes a CardAnalysis field once per card, however often it is asked for."""
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self):
+        if name not in self._memo:
+            self._memo[name] = method(self)
+        return self._memo[name]
+    return wrapper
+
+
+def clean_address_line(line):
+    """The per-line clean-up extract_address applies before matching."""
+    cleaned = ROMAN_THREE_RE.sub('III', line.strip())
+    return cleaned.replace(';', ',')
+
+
+class CardAnalysis:
+    """The OCR lines of one card, scanned once; fields are derived from the scan."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.full_text = ' '.join(lines)
+        self.masks = []
+        self.hits = []
+        for line in lines:
+            mask, hits = scan_line(line.lower())
+            self.masks.append(mask)
+            self.hits.append(hits)
+
+        self._memo = {}
+
+    # --- Full-text fields ---
+
+    @_memoized
+    def email(self):
+        match = EMAIL_RE.search(self.full_text)
+        return match.group(0) if match else None
+
+    @_memoized
+    def mobile_number(self):
+        text = self.full_text
+        for pattern in MOBILE_RES:
+            for match in pattern.findall(text):
+                number = "".join(filter(None, match)).strip()
+                if not self._after_extension(number):
+                    return number
+        return None
+
+    def _after_extension(self, number):
+        """Whether ``number`` appears right after an ext/x/fax label.
+
+        Same answer as extract_mobile_number's per-number pattern search,
+        without compiling a new pattern for every number.
+        """
+        text = self.full_text
+        at = text.find(number)
+        while at != -1:
+            if EXTENSION_TAIL_RE.search(text, 0, at):
+                return True
+            at = text.find(number, at + 1)
+        return False
+
+    @_memoized
+    def company_number(self):
+        for pattern in COMPANY_NUMBER_RES:
+            match = pattern.search(self.full_text)
+            if match:
+                full_number = "".join([g for g in match.groups() if g is not None]).strip()
+                clean_number = NON_DIGIT_RE.sub('', full_number)
+                if len(clean_number) == 10 and clean_number.startswith(('6', '7', '8', '9')):
+                    continue
+                return full_number
+        return None
+
+    @_memoized
+    def website(self):
+        match = WEBSITE_RE.search(self.full_text)
+        if match:
+            url = match.group(0)
+            if '@' in url:
+                return None
+            if any(tld in url for tld in WEBSITE_TLDS):
+                return url
+        return None
+
+    # --- Line fields ---
+
+    @_memoized
+    def company_name(self):
+        for line, mask in zip(self.lines, self.masks):
+            if mask & COMPANY:
+                return line.strip().title()
+        for line in self.lines:
+            if line.isupper() and 2 < len(line.split()) < 5:
+                return line.title()
+        return "Not Found"
+
+    @_memoized
+    def name_and_designation(self):
+        name = None
+        designation = None
+        remaining = []
+        for line, mask in zip(self.lines, self.masks):
+            if mask & NON_NAME or any(map(str.isdigit, line)) or not 0 < len(line.split()) < 5:
+                continue
+            if mask & DESIGNATION:
+                if not designation:
+                    designation = line.strip().title()
+            else:
+                remaining.append(line.strip())
+
+        if remaining:
+            name_candidates = [c for c in remaining if len(c.split()) in [2, 3]]
+            name = max(name_candidates or remaining, key=len).title()
+        return name, designation
+
+    @_memoized
+    def address_lines(self):
+        """The cleaned, non-empty lines extract_address works on, with their masks.
+
+        Most lines come out of the clean-up unchanged and keep their scan.
+        """
+        lines, masks = [], []
+        for line, mask in zip(self.lines, self.masks):
+            cleaned = clean_address_line(line)
+            if not cleaned:
+                continue
+            if cleaned != line:
+                mask = scan_line(cleaned.lower())[0]
+            lines.append(cleaned)
+            masks.append(mask)
+        return lines, masks
+
+    @_memoized
+    def address(self):
+        lines, masks = self.address_lines()
+        address_parts = []
+        start_index = next((i for i, mask in enumerate(masks) if mask & ADDRESS and not mask & NON_ADDRESS), -1)
+        if start_index != -1:
+            for line, mask in zip(lines[start_index:], masks[start_index:]):
+                if mask & NON_ADDRESS:
+                    break
+                words = line.split()
+                if len(words) in [2, 3] and all(word.isalpha() for word in words) and not mask & ADDRESS:
+                    continue
+                address_parts.append(line)
+                if len(address_parts) >= 2 and mask & ADDRESS_END:
+                    break
+
+        pincode = None
+        for line in lines:
+            pincode_match = PINCODE_RE.search(line)
+            if pincode_match:
+                pincode = pincode_match.group(1)
+                break
+        if pincode and not any(pincode in part for part in address_parts):
+            address_parts.append(pincode)
+
+        if not address_parts:
+            return "Not Found"
+        address = ', '.join(part for part in address_parts if part).strip()
+        address = COMMA_RE.sub(', ', address).replace(" ,", ",")
+        final_parts = []
+        for part in address.split(', '):
+            formatted_part = III_RE.sub('III', part.title())
+            words = formatted_part.split(' ')
+            final_parts.append(' '.join(word.upper() if len(word) == 2 and word.isalpha() else word for word in words))
+        address = HYPHEN_III_RE.sub(r'\1-\2', ', '.join(final_parts))
+        return TRAILING_PIN_RE.sub(r' - \1', address)
+
+    @_memoized
+    def items(self):
+        return ', '.join(line for line, mask in zip(self.lines, self.masks) if mask & ITEM)
+
+    def candidates(self):
+        """Every field candidate with the index of the line it came from.
+
+        Returns ``(field, line_index, text)`` tuples: one per keyword
+        category a line falls into, and one per full-text pattern match.
+        """
+        found = []
+        for index, mask in enumerate(self.masks):
+            for category, field in CATEGORY_NAMES.items():
+                if mask & category:
+                    found.append((field, index, self.lines[index]))
+        starts = [0]
+        for line in self.lines[:-1]:
+            starts.append(starts[-1] + len(line) + 1)
+        patterns = [('email', EMAIL_RE), ('website', WEBSITE_RE)]
+        patterns += [('mobile', pattern) for pattern in MOBILE_RES]
+        patterns += [('company_number', pattern) for pattern in COMPANY_NUMBER_RES]
+        for field, pattern in patterns:
+            for match in pattern.finditer(self.full_text):
+                found.append((field, bisect_right(starts, match.start()) - 1, match.group(0).strip()))
+        return found
+
+
+def company_from_email(email):
+    """Company name guessed from a non-public email domain, or None."""
+    domain = email.split('@')[1]
+    if domain.lower() in PUBLIC_EMAIL_DOMAINS:
+        return None
+    for tld in EMAIL_DOMAIN_TLDS:
+        if domain.endswith(tld):
+            domain = domain[:-len(tld)]
+            break
+    return domain.replace('-', ' ').title()
+
+
+def extract_business_card(lines):
+    """Default business card fields for the (placeholder-filtered) OCR lines."""
+    card = CardAnalysis(lines)
+    email = card.email()
+    mobile_number = card.mobile_number()
+    company_number = card.company_number()
+    website = card.website()
+    name, designation = card.name_and_designation()
+    company = card.company_name()
+    if company == "Not Found" and email:
+        company = company_from_email(email) or company
+    address = card.address()
+
+    return {
+        "name": name if name else "Not Found",
+        "designation": designation if designation else "Not Found",
+        "company": company if company else "Not Found",
+        "email": email if email else "Not Found",
+        "personal_mobile_number": mobile_number if mobile_number else "Not Found",
+        "company_number": company_number if company_number else "Not Found",
+        "website": website if website else "Not Found",
+        "address": address if address else "Not Found",
+    }
+
+
+# --- Prompt mode ---
+
+# Fields a prompt can ask for, in the order they appear in the response
+PROMPT_FIELDS = {
+    'name': lambda card: card.name_and_designation()[0],
+    'designation': lambda card: card.name_and_designation()[1],
+    'company': lambda card: card.company_name(),
+    'email': lambda card: card.email(),
+    'mobile': lambda card: card.mobile_number(),
+    'phone': lambda card: card.mobile_number(),  # Alias for mobile
+    'company number': lambda card: card.company_number(),
+    'company tel': lambda card: card.company_number(),  # Alias
+    'website': lambda card: card.website(),
+    'address': lambda card: card.address(),
+    'items': lambda card: card.items(),
+}
+# Used only when the prompt names no field
+PROMPT_FALLBACKS = [
+    ('receipt', ['items', 'company', 'address']),
+    ('business card', ['name', 'designation', 'company', 'email', 'mobile', 'company tel', 'website', 'address']),
+]
+_PROMPT_TERMS = sorted(set(PROMPT_FIELDS) | {term for term, _ in PROMPT_FALLBACKS}, key=len, reverse=True)
+# Fields are picked by substring, so naming one names every term inside it
+# ('company number' asks for 'company' as well)
+IMPLIED_TERMS = {term: [other for other in _PROMPT_TERMS if other in term] for term in _PROMPT_TERMS}
+PROMPT_SCANNER = re.compile('(?=(' + '|'.join(re.escape(term) for term in _PROMPT_TERMS) + '))')
+
+
+def requested_fields(prompt):
+    """The fields a prompt asks for, in response order; every field if it names none."""
+    prompt = prompt.lower().strip()
+    named = set()
+    for match in PROMPT_SCANNER.finditer(prompt):
+        named.update(IMPLIED_TERMS[match.group(1)])
+    fields = [field for field in PROMPT_FIELDS if field in named]
+    if fields:
+        return fields
+    for term, fallback in PROMPT_FALLBACKS:
+        if term in named:
+            return fallback
+    return list(PROMPT_FIELDS)
+
+
+def extract_custom_data(lines, prompt):
+    """Extracts the fields named in the user prompt.
+
+    All requested fields are served from one CardAnalysis, so aliases
+    ('mobile' / 'phone') and paired fields (name / designation) are
+    computed once.
+    """
+    if not prompt:
+        return None
+
+    card = CardAnalysis(lines)
+    result = {field: PROMPT_FIELDS[field](card) or "Not Found" for field in requested_fields(prompt)}
+    return result or {"message": "No relevant data extracted based on prompt"}
@@ -0,0 +1,99 @@
+"""Exports the EasyOCR models to int8 ONNX for OCR_BACKEND=onnx.
+
+Loads the stock English reader (unquantized, so the graphs trace cleanly),
+exports the CRAFT detector and the recognizer with dynamic batch and image
+sizes, then applies ONNX Runtime dynamic int8 quantization to both:
+
+    python export_onnx.py [--output models/onnx] [--keep-fp32]
+
+Needs torch, easyocr, onnx and onnxruntime; none of them beyond the runtime
+are required on the serving side once the files exist.
+"""
+import argparse
+import os
+
+import torch
+import torch.nn as nn
+
+from ocr_backends import OCR_LANGUAGES, OCR_ONNX_DIR, ONNX_DETECTOR_FILE, ONNX_RECOGNIZER_FILE
+
+OPSET = 17
+
+
+class DetectorScores(nn.Module):
+    """CRAFT with only the score maps as output; test_net never reads the features."""
+
+    def __init__(self, craft):
+        super().__init__()
+        self.craft = craft
+
+    def forward(self, x):
+        return self.craft(x)[0]
+
+
+class RecognizerLogits(nn.Module):
+    """Recognizer with the (None, 1) adaptive pooling spelled out as a mean.
+
+    ``AdaptiveAvgPool2d((None, 1))`` over the permuted feature map is a mean
+    over the last axis, but the exporter cannot handle the dynamic width it
+    sees there; ``mean`` exports to a plain ReduceMean.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, image):
+        visual = self.model.FeatureExtraction(image)
+        visual = visual.permute(0, 3, 1, 2).mean(dim=3)
+        contextual = self.model.SequenceModeling(visual)
+        return self.model.Prediction(contextual.contiguous())
+
+
+def unwrap(module):
+    return module.module if isinstance(module, nn.DataParallel) else module
+
+
+def export(module, dummy, path, input_name, output_name, dynamic_axes):
+    module.eval()
+    with torch.no_grad():
+        torch.onnx.export(module, dummy, path, opset_version=OPSET,
+                          input_names=[input_name], output_names=[output_name],
+                          dynamic_axes=dynamic_axes, do_constant_folding=True)
+    print(f"Exported {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+def quantize(fp32_path, int8_path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    print(f"Quantized {int8_path} ({os.path.getsize(int8_path) / 1e6:.1f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default=OCR_ONNX_DIR)
+    parser.add_argument('--keep-fp32', action='store_true', help='keep the unquantized exports next to the int8 ones')
+    args = parser.parse_args()
+    os.makedirs(args.output, exist_ok=True)
+
+    import easyocr
+    reader = easyocr.Reader(OCR_LANGUAGES, gpu=False, quantize=False)
+
+    targets = [
+        (DetectorScores(unwrap(reader.detector)), torch.randn(1, 3, 640, 960), ONNX_DETECTOR_FILE,
+         'image', 'scores', {'image': {0: 'batch', 2: 'height', 3: 'width'},
+                             'scores': {0: 'batch', 1: 'score_height', 2: 'score_width'}}),
+        (RecognizerLogits(unwrap(reader.recognizer)), torch.randn(1, 1, 64, 256), ONNX_RECOGNIZER_FILE,
+         'image', 'logits', {'image': {0: 'batch', 3: 'width'}, 'logits': {0: 'batch', 1: 'steps'}}),
+    ]
+    for module, dummy, filename, input_name, output_name, dynamic_axes in targets:
+        int8_path = os.path.join(args.output, filename)
+        fp32_path = int8_path.replace('_int8.onnx', '_fp32.onnx')
+        export(module, dummy, fp32_path, input_name, output_name, dynamic_axes)
+        quantize(fp32_path, int8_path)
+        if not args.keep_fp32:
+            os.remove(fp32_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""Offline bulk extraction over a directory of card images.
+
+Runs the same decode, preprocessing, OCR and field extraction as the
+``/upload`` and ``/extract-id-number`` endpoints of newLogic.py, without a web
+server, on a pool of worker processes that each load one OCR reader:
+
+    python extract_cards.py --input archive/ --output cards.jsonl
+    python extract_cards.py --file-list todo.txt --output ids.csv --mode id --workers 4
+    python extract_cards.py --input archive/ --output cards.csv --prompt "name, email, mobile"
+
+Every finished image is appended to the output (JSONL or CSV, by extension),
+and the path of every one that succeeded to the checkpoint file
+(``<output>.checkpoint`` by default). Re-running the same command skips the
+paths already in the checkpoint, so an interrupted backfill picks up where it
+stopped and the images that failed are tried again; each attempt leaves its
+record in the output. An image whose result was written just before a crash
+may be written again on resume.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from card_fields import requested_fields
+from id_roi import ID_ROI, read_id_numbers, scored_numbers
+from ocr_backends import create_reader
+from ocr_tiers import read_id_tiered
+from preprocessing import load_image, preprocess_and_rotate
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+CARD_FIELDS = ['name', 'designation', 'company', 'email', 'personal_mobile_number',
+               'company_number', 'website', 'address']
+ID_FIELDS = ['detected_card_type', 'primary_number', 'primary_type', 'Aadhar', 'PAN',
+             'General Numbers', 'confidence', 'confidence_score']
+
+# --- Worker side ---
+
+_reader = None
+_newlogic = None
+
+
+def _init_worker(backend, threads):
+    """Loads one OCR reader per worker process."""
+    global _reader, _newlogic
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _reader = create_reader(backend, threads=threads)
+    # newLogic holds the response builders; imported by the workers only, so
+    # the parent process does not need to load Flask
+    import newLogic
+    _newlogic = newLogic
+
+
+def _read_id(image_np):
+    """One OCR pass for the ID tiers, with the number confidences."""
+    if ID_ROI:
+        return read_id_numbers(_reader, image_np, detail=1)
+    results = _reader.readtext(image_np, detail=1)
+    return scored_numbers(results), results
+
+
+def extract(path, mode, prompt, max_dimension):
+    """Runs one image through the endpoint pipeline; returns its output record."""
+    started = time.perf_counter()
+    try:
+        with open(path, 'rb') as stream:
+            image = load_image(stream, max_dimension)
+        processed_img, img, analysis = preprocess_and_rotate(image, max_dimension, with_analysis=True)
+        turn = analysis.turn
+        if mode == 'id':
+            tiered = read_id_tiered(_read_id, processed_img, img, profile=analysis.profile)
+            result = _newlogic.build_id_response(tiered.numbers, tiered.texts, tiered.confidences, turn)
+        else:
+            texts = _reader.readtext(processed_img, detail=0)
+            result = _newlogic.build_business_card_response(texts, prompt)
+        record = {'path': path, 'status': 'ok', 'rotation': turn.angle, 'result': result}
+    except Exception as e:
+        record = {'path': path, 'status': 'error', 'error': str(e)}
+    record['seconds'] = round(time.perf_counter() - started, 3)
+    return record
+
+
+# --- Parent side ---
+
+def list_images(input_dir=None, file_list=None):
+    """Image paths from a directory tree or a file with one path per line."""
+    if file_list:
+        with open(file_list) as listing:
+            return [line.strip() for line in listing if line.strip()]
+    paths = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        paths.extend(os.path.join(root, name) for name in sorted(files) if name.lower().endswith(IMAGE_EXTENSIONS))
+    return paths
+
+
+def read_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as checkpoint:
+        return {line.rstrip('\n') for line in checkpoint if line.strip()}
+
+
+class OutputWriter:
+    """Appends records to a JSONL or CSV file, flushing after each one."""
+
+    def __init__(self, path, columns):
+        self.csv = path.lower().endswith('.csv')
+        self.columns = columns
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'a', newline='' if self.csv else None, encoding='utf-8')
+        if self.csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=['path', 'status', 'error', 'seconds'] + columns,
+                                         extrasaction='ignore')
+            if is_new:
+                self.writer.writeheader()
+
+    def write(self, record):
+        if self.csv:
+            row = {key: value for key, value in record.items() if key != 'result'}
+            for column, value in (record.get('result') or {}).items():
+                row[column] = '; '.join(map(str, value)) if isinstance(value, list) else value
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', help='directory to walk for .jpg/.jpeg/.png files')
+    source.add_argument('--file-list', help='file with one image path per line')
+    parser.add_argument('--output', required=True, help='.jsonl or .csv file, appended to')
+    parser.add_argument('--checkpoint', help='default: <output>.checkpoint')
+    parser.add_argument('--mode', choices=['card', 'id'], default='card',
+                        help='business card fields (/upload) or ID numbers (/extract-id-number)')
+    parser.add_argument('--prompt', default='', help='prompt-mode fields, as the /upload prompt')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes, each loads its own OCR model')
+    parser.add_argument('--threads', type=int, default=1, help='intra-op threads per worker')
+    parser.add_argument('--backend', default=None, help='OCR backend (default: OCR_BACKEND)')
+    parser.add_argument('--max-dimension', type=int, default=1600, help='longest edge images are decoded at')
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or args.output + '.checkpoint'
+    done = read_checkpoint(checkpoint_path)
+    paths = [path for path in list_images(args.input, args.file_list) if path not in done]
+    print(f"{len(paths)} image(s) to process, {len(done)} already done according to {checkpoint_path}")
+    if not paths:
+        return
+
+    if args.mode == 'id':
+        columns = ID_FIELDS
+    elif args.prompt:
+        columns = requested_fields(args.prompt)
+    else:
+        columns = CARD_FIELDS
+    writer = OutputWriter(args.output, columns)
+    checkpoint = open(checkpoint_path, 'a')
+    started = time.perf_counter()
+    failed = 0
+    executor = ProcessPoolExecutor(max_workers=max(1, args.workers), initializer=_init_worker,
+                                   initargs=(args.backend, args.threads))
+    try:
+        futures = [executor.submit(extract, path, args.mode, args.prompt, args.max_dimension) for path in paths]
+        for count, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            writer.write(record)
+            if record['status'] == 'ok':
+                checkpoint.write(record['path'] + '\n')
+                checkpoint.flush()
+            else:
+                # Left out of the checkpoint, so a resumed run tries it again
+                failed += 1
+                print(f"{record['path']}: {record['error']}", file=sys.stderr)
+            if count % 50 == 0 or count == len(paths):
+                elapsed = time.perf_counter() - started
+                print(f"[{count}/{len(paths)}] {count / elapsed:.2f} images/s, {failed} failed")
+    except KeyboardInterrupt:
+        print("Interrupted; re-run the same command to resume")
+        raise
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        writer.close()
+        checkpoint.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Local stand-in for ``genai.GenerativeModel``, for trying AI_Agent.py without the API.
+
+Set GEMINI_FAKE to a comma-separated list of options and AI_Agent.py uses
+this model instead of calling Google:
+
+    GEMINI_FAKE="latency=2.5,jitter=1,fail=0.2" python AI_Agent.py
+
+* ``latency`` / ``jitter`` - seconds each call takes (latency +- jitter/2);
+* ``fail`` - share of calls that raise, like an API error;
+* ``invalid`` - share of calls that answer with text that is not JSON.
+
+Answers are canned JSON in the shape the prompts ask for. Calls honour
+``request_options={'timeout': ...}`` like the real client, by raising
+TimeoutError once the timeout has passed. The size of every image part
+received is recorded; ``payload_stats()`` summarizes them.
+"""
+import json
+import random
+import threading
+import time
+
+BUSINESS_CARD_ANSWER = {
+    'name': 'Ravi Kumar', 'designation': 'Senior Engineer', 'company': 'Acme Solutions Pvt Ltd',
+    'email': 'ravi@acme.com', 'personal_mobile_number': '+91 9876543210', 'company_number': 'Not Found',
+    'website': 'www.acme.com', 'address': '12, MG Road, Hyderabad - 500034',
+}
+ID_CARD_ANSWER = {'Aadhar': ['234567890123'], 'PAN': [], 'General Numbers': ['234567890123']}
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Answers ``generate_content`` after a configurable delay, failing on request."""
+
+    def __init__(self, latency=1.0, jitter=0.0, fail=0.0, invalid=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.fail = fail
+        self.invalid = invalid
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.payload_sizes = []
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Builds a model from a GEMINI_FAKE value such as ``"latency=2,fail=0.1"``."""
+        options = {}
+        for item in filter(None, (part.strip() for part in spec.split(','))):
+            key, _, value = item.partition('=')
+            if key not in ('latency', 'jitter', 'fail', 'invalid', 'seed'):
+                raise ValueError(f'Unknown GEMINI_FAKE option {key!r}')
+            options[key] = int(value) if key == 'seed' else float(value)
+        return cls(**options)
+
+    def payload_stats(self):
+        """Count, mean and largest image payload received, in bytes."""
+        with self._lock:
+            sizes = list(self.payload_sizes)
+        if not sizes:
+            return {'count': 0, 'mean_bytes': None, 'max_bytes': None}
+        return {'count': len(sizes), 'mean_bytes': sum(sizes) // len(sizes), 'max_bytes': max(sizes)}
+
+    def generate_content(self, contents, request_options=None):
+        with self._lock:
+            self.calls += 1
+            self.payload_sizes.extend(len(part['data']) for part in contents
+                                      if isinstance(part, dict) and 'data' in part)
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter / 2, self.jitter / 2))
+            roll = self._random.random()
+        timeout = (request_options or {}).get('timeout')
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f'Fake Gemini call timed out after {timeout:g}s')
+        time.sleep(delay)
+
+        if roll < self.fail:
+            raise RuntimeError('Fake Gemini error')
+        if roll < self.fail + self.invalid:
+            return FakeResponse('Sorry, I could not read that card.')
+        prompt = ' '.join(part.get('text', '') for part in contents if isinstance(part, dict))
+        answer = ID_CARD_ANSWER if 'Aadhar or PAN' in prompt else BUSINESS_CARD_ANSWER
+        return FakeResponse('```json\n' + json.dumps(answer) + '\n```')
@@ -0,0 +1,53 @@
+"""Compact image payloads for Gemini.
+
+Gemini reads a card just as well from a ~1000 px JPEG as from the full
+camera frame, and the upload dominates a call's latency. ``prepare_image``
+scales the card down to GEMINI_MAX_EDGE and encodes it as JPEG or WebP at
+GEMINI_IMAGE_QUALITY, returning an inline-data part for ``generate_content``.
+The frame it gets is already cut down to the card by preprocessing
+(``preprocessing.crop_to_card``). Payload size and encode time are exported
+on /metrics.
+"""
+import os
+import time
+
+import cv2
+
+import metrics
+
+# Gemini input configuration (overridable through environment variables)
+GEMINI_MAX_EDGE = int(os.environ.get('GEMINI_MAX_EDGE', 1024))
+GEMINI_IMAGE_FORMAT = os.environ.get('GEMINI_IMAGE_FORMAT', 'jpeg').lower()
+GEMINI_IMAGE_QUALITY = int(os.environ.get('GEMINI_IMAGE_QUALITY', 85))
+
+FORMATS = {
+    'jpeg': ('.jpg', 'image/jpeg', cv2.IMWRITE_JPEG_QUALITY),
+    'webp': ('.webp', 'image/webp', cv2.IMWRITE_WEBP_QUALITY),
+}
+if GEMINI_IMAGE_FORMAT not in FORMATS:
+    raise ValueError(f"Unknown GEMINI_IMAGE_FORMAT {GEMINI_IMAGE_FORMAT!r}; expected jpeg or webp")
+
+PAYLOAD_BYTES = metrics.Histogram('gemini_payload_bytes', 'Size of the image sent to Gemini.',
+                                  buckets=(25e3, 50e3, 100e3, 200e3, 400e3, 800e3, 1.6e6, 3.2e6))
+ENCODE_SECONDS = metrics.Histogram('gemini_encode_duration_seconds', 'Time to resize and encode the Gemini image.',
+                                   buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+
+
+def prepare_image(img, max_edge=GEMINI_MAX_EDGE, image_format=GEMINI_IMAGE_FORMAT,
+                  quality=GEMINI_IMAGE_QUALITY):
+    """Encodes an RGB card image for Gemini; returns ``{'mime_type', 'data'}``."""
+    started = time.perf_counter()
+    height, width = img.shape[:2]
+    if max_edge and max(height, width) > max_edge:
+        scale = max_edge / max(height, width)
+        img = cv2.resize(img, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+    extension, mime_type, quality_flag = FORMATS[image_format]
+    ok, encoded = cv2.imencode(extension, cv2.cvtColor(img, cv2.COLOR_RGB2BGR), [quality_flag, quality])
+    if not ok:
+        raise ValueError(f'Could not encode the image as {image_format}')
+    data = encoded.tobytes()
+
+    PAYLOAD_BYTES.observe(len(data))
+    ENCODE_SECONDS.observe(time.perf_counter() - started)
+    return {'mime_type': mime_type, 'data': data}
@@ -0,0 +1,175 @@
+"""Bounded-latency Gemini calls, raced against local OCR.
+
+AI_Agent.py used to wait for Gemini and only then, when it failed, start
+EasyOCR, so a slow API made visitors wait for both in turn. Now both paths
+start together and ``race`` picks the answer:
+
+* ``first`` (default) - the first valid result wins. A local result that is
+  not valid (no ID number, no field found) is held back until Gemini answers
+  or GEMINI_DEADLINE runs out.
+* ``prefer_gemini`` - a valid Gemini result is used whenever it arrives
+  within GEMINI_DEADLINE; the local result is used otherwise.
+
+Gemini calls go through a ``GeminiGate``: at most GEMINI_MAX_CONCURRENCY are
+outstanding (extra requests are served by OCR alone rather than queued), and
+a circuit breaker skips Gemini for GEMINI_BREAKER_COOLDOWN seconds after
+GEMINI_BREAKER_FAILURES failures in a row, then lets a single probe call
+through. A call that loses the race keeps running in the background until
+its own GEMINI_TIMEOUT; its outcome still counts for the breaker.
+"""
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import metrics
+
+# Gemini configuration (overridable through environment variables)
+GEMINI_DEADLINE = float(os.environ.get('GEMINI_DEADLINE', 6))
+GEMINI_TIMEOUT = float(os.environ.get('GEMINI_TIMEOUT', 15))
+GEMINI_POLICY = os.environ.get('GEMINI_POLICY', 'first')
+GEMINI_MAX_CONCURRENCY = int(os.environ.get('GEMINI_MAX_CONCURRENCY', 4))
+GEMINI_BREAKER_FAILURES = int(os.environ.get('GEMINI_BREAKER_FAILURES', 5))
+GEMINI_BREAKER_COOLDOWN = float(os.environ.get('GEMINI_BREAKER_COOLDOWN', 30))
+
+POLICIES = ('first', 'prefer_gemini')
+if GEMINI_POLICY not in POLICIES:
+    raise ValueError(f"Unknown GEMINI_POLICY {GEMINI_POLICY!r}; expected one of {', '.join(POLICIES)}")
+
+RACE_WINS = metrics.Counter('ocr_race_wins', 'Requests answered by each extraction path.', ['source'])
+GEMINI_SKIPPED = metrics.Counter('gemini_skipped', 'Requests answered without a Gemini result, by reason.',
+                                 ['reason'])
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed, open for ``cooldown`` seconds, then half-open."""
+
+    def __init__(self, failures=GEMINI_BREAKER_FAILURES, cooldown=GEMINI_BREAKER_COOLDOWN):
+        self.failures = max(1, failures)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._probing or time.monotonic() - self._opened_at >= self.cooldown:
+                return 'half_open'
+            return 'open'
+
+    def allow(self):
+        """Whether a call may go out now; in half-open state only one probe at a time."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._consecutive += 1
+            if self._probing or self._consecutive >= self.failures:
+                if self._opened_at is None or self._probing:
+                    print(f"Gemini circuit breaker opened after {self._consecutive} failure(s)")
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class GeminiGate:
+    """Runs Gemini calls in the background, bounded by a semaphore and a circuit breaker."""
+
+    def __init__(self, max_concurrency=GEMINI_MAX_CONCURRENCY, breaker=None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='gemini')
+
+    def submit(self, call, *args):
+        """Starts ``call(*args)`` and returns its Future, or None when Gemini is skipped."""
+        if not self._slots.acquire(blocking=False):
+            GEMINI_SKIPPED.labels('concurrency').inc()
+            return None
+        if not self.breaker.allow():
+            self._slots.release()
+            GEMINI_SKIPPED.labels('circuit_open').inc()
+            return None
+        try:
+            future = self._executor.submit(call, *args)
+        except RuntimeError:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        self._slots.release()
+        if future.exception() is None:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+
+
+def race(local_future, finish_local, gemini_future, finish_gemini, deadline=GEMINI_DEADLINE,
+         policy=GEMINI_POLICY):
+    """Waits for the local OCR and Gemini futures and returns ``(source, response)``.
+
+    ``finish_local`` / ``finish_gemini`` turn a future's result into
+    ``(response, valid)``. ``gemini_future`` may be None. The local result
+    is used when nothing valid arrives; its exception is raised if it failed
+    too.
+    """
+    finishers = {local_future: ('ocr', finish_local)}
+    if gemini_future is not None:
+        finishers[gemini_future] = ('gemini', finish_gemini)
+    expires = time.monotonic() + deadline
+    pending = set(finishers)
+    fallback = None
+    local_error = None
+
+    while pending:
+        timeout = None
+        if gemini_future in pending:
+            timeout = expires - time.monotonic()
+            if timeout <= 0:
+                # Out of budget: Gemini finishes in the background, unused
+                pending.discard(gemini_future)
+                GEMINI_SKIPPED.labels('deadline').inc()
+                continue
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        # Gemini first, so it wins a tie under prefer_gemini
+        for future in sorted(done, key=lambda done_future: done_future is not gemini_future):
+            source, finish = finishers[future]
+            try:
+                response, valid = finish(future.result())
+            except Exception as e:
+                if source == 'ocr':
+                    local_error = e
+                else:
+                    print(f"Gemini failed: {e}")
+                continue
+            if source == 'gemini':
+                if valid:
+                    RACE_WINS.labels('gemini').inc()
+                    return 'gemini', response
+            elif valid and (policy != 'prefer_gemini' or gemini_future not in pending):
+                RACE_WINS.labels('ocr').inc()
+                return 'ocr', response
+            else:
+                fallback = response
+
+    if fallback is not None:
+        RACE_WINS.labels('ocr').inc()
+        return 'ocr', fallback
+    raise local_error or RuntimeError('No extraction path produced a result')
@@ -0,0 +1,194 @@
+"""Region-of-interest OCR for ID numbers.
+
+``/extract-id-number`` is after the Aadhaar (12 digits) or PAN (AAAAA9999A)
+string, which a general ``readtext`` misreads as look-alike letters.
+``read_id_numbers`` runs text detection once, ranks the detected boxes by how
+much they look like an ID number and recognizes the best few with the
+recognizer restricted to digits and capitals. The rest of the card is
+recognized unrestricted from the same detection: the card type keywords
+("income tax", "government of india") and ``extracted_text`` come from that
+full-card text, and only the number is taken from the restricted lines.
+When none of them validates, the number is looked for in the full-card text
+as a plain ``readtext`` would.
+
+Ranking signals per box, all computed on pixels without recognition:
+
+* glyph count - ID numbers have 10 (PAN) to 12 (Aadhaar) characters;
+* glyph height uniformity - digits and capitals share one height, while
+  ordinary words mix x-height, ascenders and descenders;
+* aspect ratio of the box and its vertical position on the card.
+
+Boxes that sit next to each other on one line are also tried merged, since
+the detector may split "1234 5678 9012" at the wide gaps between groups.
+
+With ``detail=1`` the recognizer confidences are kept: numbers come back as
+``(number, confidence)`` pairs (``scored_numbers``) for ocr_tiers.py to
+decide whether another OCR pass is needed.
+"""
+import os
+
+import cv2
+import numpy as np
+
+import metrics
+from id_validation import find_candidates, is_valid_number
+
+ID_ROI = os.environ.get('ID_ROI', '1') == '1'
+# Candidate boxes recognized before falling back to the whole card
+ID_ROI_CANDIDATES = int(os.environ.get('ID_ROI_CANDIDATES', 3))
+ID_ALLOWLIST = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ '
+
+# Glyph counts of a PAN and an Aadhaar number
+MIN_GLYPHS, MAX_GLYPHS = 10, 12
+# Width/height range of a single-line ID number box
+MIN_ASPECT, MAX_ASPECT = 4.0, 14.0
+# Boxes on one line closer than this many box heights are tried merged
+MERGE_GAP = 1.5
+
+
+def find_numbers(text):
+    """Aadhaar / PAN numbers in ``text``, cleaned and corrected (see id_validation.py)."""
+    return list(dict.fromkeys(number for _, _, number, _ in find_candidates(text)))
+
+
+def scored_numbers(results, per_line=False):
+    """``[(number, confidence)]`` found in detail=1 OCR results, best confidence per number.
+
+    Numbers are matched over the joined text, as ``find_numbers`` is used,
+    and score the lowest confidence of the lines they span, lowered for any
+    character that had to be corrected; ``per_line`` matches every line on
+    its own instead (overlapping ROI candidates).
+    """
+    scores = {}
+    if per_line:
+        for _, text, confidence in results:
+            for _, _, number, penalty in find_candidates(text):
+                scores[number] = max(scores.get(number, 0.0), float(confidence) * penalty)
+        return list(scores.items())
+
+    spans, offset = [], 0
+    for _, text, confidence in results:
+        spans.append((offset, offset + len(text), float(confidence)))
+        offset += len(text) + 1
+    full_text = ' '.join(text for _, text, _ in results)
+    for start, end, number, penalty in find_candidates(full_text):
+        confidence = min(line_confidence for line_start, line_end, line_confidence in spans
+                         if line_start < end and start < line_end)
+        scores[number] = max(scores.get(number, 0.0), confidence * penalty)
+    return list(scores.items())
+
+
+def _range_score(value, low, high, slack):
+    """1 inside [low, high], falling linearly to 0 at ``slack`` outside it."""
+    if low <= value <= high:
+        return 1.0
+    distance = low - value if value < low else value - high
+    return max(0.0, 1.0 - distance / slack)
+
+
+def glyph_profile(crop):
+    """Returns (glyph count, height uniformity in [0, 1]) for a text box crop."""
+    if crop.size == 0 or min(crop.shape) < 4:
+        return 0, 0.0
+    _, binary = cv2.threshold(crop, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # Glyphs have to be the foreground, whichever way round the card prints them
+    if np.count_nonzero(binary) > binary.size / 2:
+        binary = cv2.bitwise_not(binary)
+    count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    box_height = crop.shape[0]
+    heights = stats[1:count, cv2.CC_STAT_HEIGHT]
+    heights = heights[heights >= box_height * 0.3]
+    if len(heights) == 0:
+        return 0, 0.0
+    variation = float(np.std(heights) / np.mean(heights))
+    return len(heights), max(0.0, 1.0 - 5.0 * variation)
+
+
+def score_box(grey, box):
+    """Likelihood in [0, 1] that a horizontal box holds an ID number."""
+    x_min, x_max, y_min, y_max = box
+    height, width = grey.shape[:2]
+    x_min, y_min = max(0, int(x_min)), max(0, int(y_min))
+    x_max, y_max = min(width, int(x_max)), min(height, int(y_max))
+    if x_max <= x_min or y_max <= y_min:
+        return 0.0
+
+    glyphs, uniformity = glyph_profile(grey[y_min:y_max, x_min:x_max])
+    glyph_score = _range_score(glyphs, MIN_GLYPHS, MAX_GLYPHS + 2, 6)
+    aspect_score = _range_score((x_max - x_min) / (y_max - y_min), MIN_ASPECT, MAX_ASPECT, 4)
+    # Numbers sit in the middle or lower part of the card, rarely in the header
+    position_score = _range_score((y_min + y_max) / 2 / height, 0.3, 0.95, 0.3)
+    return 0.35 * glyph_score + 0.3 * uniformity + 0.2 * aspect_score + 0.15 * position_score
+
+
+def line_merges(horizontal_list):
+    """Boxes formed by joining neighbours on the same line."""
+    merged = []
+    ordered = sorted(horizontal_list, key=lambda box: (box[2], box[0]))
+    for i, first in enumerate(ordered):
+        current = list(first)
+        for other in ordered[i + 1:]:
+            box_height = current[3] - current[2]
+            overlap = min(current[3], other[3]) - max(current[2], other[2])
+            gap = other[0] - current[1]
+            if overlap < 0.6 * box_height or not 0 <= gap <= MERGE_GAP * box_height:
+                continue
+            current = [current[0], other[1], min(current[2], other[2]), max(current[3], other[3])]
+            merged.append(list(current))
+    return merged
+
+
+def rank_candidates(grey, horizontal_list, limit=ID_ROI_CANDIDATES):
+    """Returns the ``limit`` boxes (single or merged) most likely to be an ID number."""
+    boxes = [list(box) for box in horizontal_list] + line_merges(horizontal_list)
+    scored = sorted(((score_box(grey, box), box) for box in boxes), key=lambda item: -item[0])
+    return [box for score, box in scored[:limit] if score > 0]
+
+
+def _holds_valid_number(text):
+    return any(is_valid_number(number) for _, _, number, _ in find_candidates(text))
+
+
+def read_id_numbers(reader, image_np, candidates=ID_ROI_CANDIDATES, detail=0):
+    """Recognizes the text of a card, reading its ID number with a restricted recognizer.
+
+    Returns ``(numbers, text_results)``; ``text_results`` are the lines of the
+    whole card, top to bottom. Numbers come from the candidate lines when one
+    of them validates, from the whole card otherwise.
+    With ``detail=1`` the numbers are ``(number, confidence)`` pairs and the
+    text results ``(box, text, confidence)`` tuples.
+    """
+    from easyocr.utils import reformat_input
+
+    image, grey = reformat_input(image_np)
+    horizontal_list, free_list = reader.detect(image, reformat=False)
+    horizontal_list, free_list = horizontal_list[0], free_list[0]
+
+    top = rank_candidates(grey, horizontal_list, candidates)
+    candidate_lines = []
+    if top:
+        candidate_lines = reader.recognize(grey, top, [], allowlist=ID_ALLOWLIST, detail=1,
+                                           paragraph=False, reformat=False)
+
+    # Single boxes whose restricted reading holds a valid number are not read twice
+    singles = {tuple(box) for box in horizontal_list}
+    kept, read_boxes = [], set()
+    if len(candidate_lines) == len(top):
+        for box, line in zip(top, candidate_lines):
+            if tuple(box) in singles and _holds_valid_number(line[1]):
+                kept.append(line)
+                read_boxes.add(tuple(box))
+    rest = [box for box in horizontal_list if tuple(box) not in read_boxes]
+    results = list(kept)
+    if rest or free_list:
+        results += reader.recognize(grey, rest, free_list, detail=1, paragraph=False, reformat=False)
+    results.sort(key=lambda line: (min(point[1] for point in line[0]), min(point[0] for point in line[0])))
+
+    with metrics.stage('regex'):
+        # Candidates overlap (merged lines), so read each one on its own
+        numbers = scored_numbers(candidate_lines, per_line=True)
+        if not any(is_valid_number(number) for number, _ in numbers):
+            numbers = scored_numbers(results)
+    if detail:
+        return numbers, results
+    return [number for number, _ in numbers], [text for _, text, _ in results]
@@ -0,0 +1,163 @@
+"""Validation and OCR-error correction of Aadhaar and PAN numbers.
+
+Any 12-digit run used to pass for an Aadhaar number, and a single misread
+character ("2345 67B9 O124") made the number vanish altogether, so the
+operator had to rescan. Numbers are now checked the way the issuers define
+them:
+
+* Aadhaar - 12 digits, not starting with 0 or 1, the last one a Verhoeff
+  check digit;
+* PAN - five letters, four digits, one letter, the fourth letter being the
+  holder type (P person, C company, H HUF, F firm, A AOP, T trust, B BOI,
+  L local authority, J artificial juridical person, G government).
+
+Candidates are matched loosely and corrected for the recognizer's usual
+confusions: a letter where a digit must be (O/0, I/1, S/5, B/8, ...), or the
+other way round in a PAN, has only one reading, so it is fixed and the result
+checked. A digit misread as another digit (8/3, 1/7) is not guessed at: the
+checksum catches every such error but cannot say which digit was wrong:
+for five in six misreads more than one look-alike swap validates
+(benchmarks/bench_id_validation.py). Those readings are kept as invalid
+numbers, ranked behind the valid ones, and never count as an Aadhaar number.
+
+The Verhoeff check runs on numpy arrays, so a whole batch of candidates is
+validated in one pass of twelve table lookups.
+
+Every correction lowers the number's score (``penalty``), which callers
+multiply into the recognizer confidence.
+"""
+import re
+
+import numpy as np
+
+# Verhoeff dihedral-group multiplication, position permutation and inverse tables
+VERHOEFF_D = np.array([
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 2, 3, 4, 0, 6, 7, 8, 9, 5], [2, 3, 4, 0, 1, 7, 8, 9, 5, 6],
+    [3, 4, 0, 1, 2, 8, 9, 5, 6, 7], [4, 0, 1, 2, 3, 9, 5, 6, 7, 8], [5, 9, 8, 7, 6, 0, 4, 3, 2, 1],
+    [6, 5, 9, 8, 7, 1, 0, 4, 3, 2], [7, 6, 5, 9, 8, 2, 1, 0, 4, 3], [8, 7, 6, 5, 9, 3, 2, 1, 0, 4],
+    [9, 8, 7, 6, 5, 4, 3, 2, 1, 0],
+], dtype=np.int8)
+VERHOEFF_P = np.array([
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 5, 7, 6, 2, 8, 3, 0, 9, 4], [5, 8, 0, 3, 7, 9, 6, 1, 4, 2],
+    [8, 9, 1, 6, 0, 4, 3, 5, 2, 7], [9, 4, 5, 3, 1, 2, 6, 8, 7, 0], [4, 2, 8, 6, 5, 7, 3, 9, 0, 1],
+    [2, 7, 9, 3, 8, 0, 6, 4, 1, 5], [7, 0, 4, 6, 9, 1, 3, 2, 5, 8],
+], dtype=np.int8)
+VERHOEFF_INV = np.array([0, 4, 3, 2, 1, 5, 6, 7, 8, 9], dtype=np.int8)
+
+PAN_HOLDER_TYPES = 'PCHFATBLJG'
+AADHAAR_RE = re.compile(r'[2-9]\d{11}')
+PAN_RE = re.compile(f'[A-Z]{{3}}[{PAN_HOLDER_TYPES}][A-Z]\\d{{4}}[A-Z]')
+
+# Single readings of a glyph in the wrong character class
+DIGIT_FOR_LETTER = {'O': '0', 'Q': '0', 'D': '0', 'U': '0', 'I': '1', 'L': '1', 'J': '1', '|': '1',
+                    'Z': '2', 'A': '4', 'S': '5', 'G': '6', 'T': '7', 'B': '8'}
+LETTER_FOR_DIGIT = {'0': 'O', '1': 'I', '2': 'Z', '4': 'A', '5': 'S', '6': 'G', '7': 'T', '8': 'B'}
+# Cost of a letter/digit class fix, and the score kept per unit of correction cost
+CLASS_FIX_COST = 0.5
+CORRECTION_PENALTY = 0.85
+# A loose Aadhaar match must have this many real digits, so words are not "corrected" into numbers
+MIN_AADHAAR_DIGITS = 8
+MAX_PAN_FIXES = 2
+
+_AADHAAR_CHARS = '0-9' + ''.join(DIGIT_FOR_LETTER).replace('|', r'\|')
+CANDIDATE_RE = re.compile(
+    f'(?<![A-Z0-9])(?:[{_AADHAAR_CHARS}]{{4}} ?[{_AADHAAR_CHARS}]{{4}} ?[{_AADHAAR_CHARS}]{{4}}'
+    f'|[A-Z0-9]{{10}})(?![A-Z0-9])')
+
+def verhoeff_valid(digits):
+    """Checksum test for a (rows, length) array of digits; returns a bool per row."""
+    digits = np.atleast_2d(digits)
+    check = np.zeros(len(digits), dtype=np.int8)
+    length = digits.shape[1]
+    for position in range(length):
+        check = VERHOEFF_D[check, VERHOEFF_P[position % 8, digits[:, length - 1 - position]]]
+    return check == 0
+
+
+def verhoeff_check_digit(digits):
+    """Check digit to append to a sequence of digits."""
+    check = 0
+    for position, digit in enumerate(reversed(digits)):
+        check = VERHOEFF_D[check, VERHOEFF_P[(position + 1) % 8, int(digit)]]
+    return int(VERHOEFF_INV[check])
+
+
+def validate_aadhaar_batch(numbers):
+    """Vectorized ``is_valid_aadhaar`` over many 12-character strings."""
+    numbers = list(numbers)
+    if not numbers:
+        return np.zeros(0, dtype=bool)
+    well_formed = np.array([len(number) == 12 and number.isdigit() for number in numbers])
+    raw = np.frombuffer(''.join(number if ok else '0' * 12 for number, ok in zip(numbers, well_formed))
+                        .encode('ascii'), dtype=np.uint8).reshape(-1, 12)
+    digits = (raw - ord('0')).astype(np.int8)
+    return well_formed & (digits[:, 0] >= 2) & verhoeff_valid(digits)
+
+
+def is_valid_aadhaar(number):
+    return bool(AADHAAR_RE.fullmatch(number)) and bool(verhoeff_valid(np.frombuffer(
+        number.encode('ascii'), dtype=np.uint8) - ord('0'))[0])
+
+
+def is_valid_pan(number):
+    return bool(PAN_RE.fullmatch(number))
+
+
+def is_valid_number(number):
+    """Whether a cleaned number is a valid Aadhaar or PAN number."""
+    return is_valid_aadhaar(number) if len(number) == 12 else is_valid_pan(number)
+
+
+def correct_aadhaar(text):
+    """``(number, cost)`` for a 12-character Aadhaar reading, or None if it cannot be made valid."""
+    text = text.replace(' ', '')
+    if sum(char.isdigit() for char in text) < MIN_AADHAAR_DIGITS:
+        return None
+    fixes = sum(not char.isdigit() for char in text)
+    number = ''.join(char if char.isdigit() else DIGIT_FOR_LETTER[char] for char in text)
+    cost = fixes * CLASS_FIX_COST
+    if not is_valid_aadhaar(number):
+        return None
+    return number, cost
+
+
+def correct_pan(text):
+    """``(number, cost)`` for a 10-character PAN reading, or None if it cannot be made valid."""
+    chars, fixes = [], 0
+    for position, char in enumerate(text):
+        wants_digit = 5 <= position <= 8
+        if char.isdigit() != wants_digit:
+            char = DIGIT_FOR_LETTER.get(char) if wants_digit else LETTER_FOR_DIGIT.get(char)
+            if char is None:
+                return None
+            fixes += 1
+        chars.append(char)
+    number = ''.join(chars)
+    if fixes > MAX_PAN_FIXES or not is_valid_pan(number):
+        return None
+    return number, fixes * CLASS_FIX_COST
+
+
+def find_candidates(text):
+    """Yields ``(start, end, number, penalty)`` for every ID number in OCR text.
+
+    ``number`` is the corrected number when a reading validates after
+    correction, or the cleaned match itself when it has the strict Aadhaar
+    or PAN shape but does not validate (penalty 1; ``is_valid_number`` tells
+    them apart). ``penalty`` is the score kept after corrections.
+    """
+    for match in CANDIDATE_RE.finditer(text.upper()):
+        raw = match.group().replace(' ', '')
+        corrected = correct_aadhaar(raw) if len(raw) == 12 else correct_pan(raw)
+        if corrected is not None:
+            number, cost = corrected
+            yield match.start(), match.end(), number, CORRECTION_PENALTY ** cost
+        elif re.fullmatch(r'\d{12}|[A-Z]{5}\d{4}[A-Z]', raw):
+            yield match.start(), match.end(), raw, 1.0
+
+
+def rank_numbers(numbers, confidences=None):
+    """Orders numbers valid first, then by confidence; duplicates dropped."""
+    confidences = confidences or {}
+    unique = list(dict.fromkeys(numbers))
+    return sorted(unique, key=lambda number: (not is_valid_number(number), -confidences.get(number, 0.0)))
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from PIL import Image
 import numpy as np
@@ -7,7 +7,20 @@ import re
 import cv2
 import os
 from werkzeug.utils import secure_filename
-import gc
+from werkzeug.exceptions import HTTPException
+import threading
+from id_roi import ID_ROI, read_id_numbers, scored_numbers
+from id_validation import is_valid_aadhaar, is_valid_number, is_valid_pan
+from ocr_tiers import OCR_ACCEPT_CONFIDENCE, read_id_tiered
+from ocr_backends import create_reader
+from ocr_batcher import local_batcher
+from memory_governor import MemoryBusy, MemoryGovernor, reexec
+from result_cache import ResultCache
+from orientation import shrink
+from preprocessing import ANALYSIS_DIMENSION, PREPROCESS_CARD_CROP, crop_to_card, load_image, orient
+from warmup import Readiness, warm_up
+import metrics
+import uploads
 
 app = Flask(__name__)
 
@@ -41,82 +54,144 @@ CORS(app, resources={
 
 # Configuration for file uploads
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
+# Stream uploads with early size/type/dimension checks (see uploads.py)
+uploads.init_app(app)
 ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png'}
 
-# Global OCR reader - lazy initialization to save memory
+# Longest edge ID uploads are decoded at (JPEGs are decoded in draft mode)
+ID_MAX_DIMENSION = int(os.environ.get('ID_MAX_DIMENSION', 1200))
+
+# Global OCR reader - loaded and warmed up in the background at startup
+# (OCR_WARMUP=0 falls back to loading it on the first request)
 ocr_reader = None
+ocr_reader_lock = threading.Lock()
+OCR_WARMUP = os.environ.get('OCR_WARMUP', '1') == '1'
+readiness = Readiness('lightweight')
+
+# Caps the images processed at once by measured memory, recycles the process
+# when it stays too big (see memory_governor.py); budgeted from the RSS after
+# warm-up, or from zero with OCR_WARMUP=0
+memory = MemoryGovernor(on_drain=readiness.mark_unready)
+
+# Micro-batcher over the shared reader, created together with it
+ocr_batcher = None
+ocr_batcher_lock = threading.Lock()
+
+# Cache of results for repeated uploads of the same card (exact pixels)
+ocr_cache = ResultCache()
+
+# Values owned by the batcher and the cache, read when /metrics is scraped
+metrics.Gauge('ocr_batch_queue_depth', 'OCR calls waiting for the micro-batcher.').set_function(
+    lambda: ocr_batcher.queue_depth() if ocr_batcher is not None else 0)
+metrics.Gauge('ocr_cache_hit_ratio', 'Share of cache lookups answered from the cache.').set_function(
+    lambda: ocr_cache.stats()['hit_ratio'])
+metrics.Gauge('ocr_cache_entries', 'Results held in the cache.').set_function(
+    lambda: ocr_cache.stats()['entries'])
 
 def get_ocr_reader():
     """Lazy initialization of OCR reader to save memory"""
     global ocr_reader
     if ocr_reader is None:
-        try:
-            import easyocr
-            ocr_reader = easyocr.Reader(['en'], gpu=False)
-        except ImportError:
-            # Fallback to basic text extraction without OCR
-            ocr_reader = "basic"
+        with ocr_reader_lock:
+            if ocr_reader is None:
+                try:
+                    # EasyOCR or its ONNX Runtime port, see OCR_BACKEND in ocr_backends.py
+                    ocr_reader = create_reader()
+                except ImportError:
+                    # Fallback to basic text extraction without OCR
+                    ocr_reader = "basic"
     return ocr_reader
 
+def warm_ocr_reader():
+    """Loads the OCR reader and runs one dummy inference, then marks the app ready"""
+    try:
+        reader = get_ocr_reader()
+        warmup_seconds = warm_up(reader) if reader != "basic" else None
+        # The budget for images is what the warmed-up model leaves of the limit
+        memory.calibrate()
+        readiness.mark_ready(warmup_seconds)
+    except Exception as e:
+        readiness.mark_failed(e)
+
+def get_ocr_batcher():
+    """Lazily builds the micro-batcher that groups concurrent OCR calls"""
+    global ocr_batcher
+    if ocr_batcher is None:
+        with ocr_batcher_lock:
+            if ocr_batcher is None:
+                ocr_batcher = local_batcher(get_ocr_reader)
+    return ocr_batcher
+
 def allowed_file(filename):
     """Checks if the uploaded file has an allowed extension."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def lightweight_preprocess(image):
-    """Lightweight preprocessing to reduce memory usage"""
+def lightweight_preprocess(image, max_dimension=ID_MAX_DIMENSION):
+    """Lightweight preprocessing to reduce memory usage
+
+    Returns ``(gray, upright RGB card, orientation)``, or ``(None, None, None)``
+    when it fails. The RGB card is what the alternate OCR pass prepares its
+    own profile from (see ocr_tiers.py).
+    """
     try:
         # Convert to numpy array with memory optimization
         img = np.array(image.convert("RGB"))
         
         # Resize if image is too large (memory optimization)
         h, w, _ = img.shape
-        max_dimension = 1200
         if max(h, w) > max_dimension:
             scale = max_dimension / max(h, w)
             new_h, new_w = int(h * scale), int(w * scale)
             img = cv2.resize(img, (new_w, new_h))
         
-        # Rotate if needed
-        h, w, _ = img.shape
-        if h > w:
-            img = cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
+        # Card detection and orientation look at one small copy of the frame
+        small = shrink(img, ANALYSIS_DIMENSION)
+
+        # Crop to the card when it lies on a background
+        if PREPROCESS_CARD_CROP:
+            img, small = crop_to_card(img, small)
+        
+        # Turn the card upright from its text lines (see orientation.py)
+        img, turn = orient(img, small)
             
         # Simple grayscale conversion
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         
-        # Force garbage collection
-        gc.collect()
-        
-        return gray
+        return gray, img, turn
     except Exception as e:
         print(f"Preprocessing error: {e}")
-        return None
+        return None, None, None
+
+def extract_text_lightweight(image_np, source=None):
+    """Lightweight text extraction, in as few OCR passes as the card needs (see ocr_tiers.py)
 
-def extract_text_lightweight(image_np):
-    """Lightweight text extraction with memory optimization"""
+    ``source`` is the RGB card ``image_np`` was made from (``image_np`` itself
+    when not given). Returns ``(numbers, text_results, confidences)``.
+    """
     try:
         reader = get_ocr_reader()
         if reader == "basic":
             # Basic pattern matching without OCR
-            return [], []
+            return [], [], {}
         
-        # Use EasyOCR with memory optimization
-        results = reader.readtext(image_np, detail=0, paragraph=False)
+        if ID_ROI:
+            # Read the number from the likeliest boxes with a restricted recognizer, the text from the whole card
+            def read(image):
+                return read_id_numbers(reader, image, detail=1)
+        else:
+            # Use EasyOCR with memory optimization, batched with concurrent requests
+            def read(image):
+                results = get_ocr_batcher().readtext(image, detail=1)
+                with metrics.stage('regex'):
+                    return scored_numbers(results), results
         
-        # Clean up memory immediately
-        gc.collect()
+        with metrics.stage('ocr'):
+            result = read_id_tiered(read, image_np, image_np if source is None else source)
         
-        full_text = ' '.join(results) if results else ""
-        
-        # Extract patterns
-        aadhar_pattern = r'\b(?:\d{4}\s?\d{4}\s?\d{4}|\d{12})\b'
-        pan_pattern = r'\b[A-Z]{5}\d{4}[A-Z]\b'
-        numbers = re.findall(f'{aadhar_pattern}|{pan_pattern}', full_text)
-        
-        return numbers, results
+        return result.numbers, result.texts, result.confidences
     except Exception as e:
         print(f"Text extraction error: {e}")
-        return [], []
+        return [], [], {}
 
 def detect_card_type_lightweight(text_results, numbers):
     """Lightweight card type detection using keyword analysis"""
@@ -156,6 +231,21 @@ def detect_card_type_lightweight(text_results, numbers):
 @app.route('/extract-id-number', methods=['POST'])
 def extract_id_number():
     """Memory-optimized ID number extraction"""
+    with metrics.RequestTimer('/extract-id-number') as timer:
+        # Waits, or decodes smaller, while memory is short
+        try:
+            with metrics.stage('admission'):
+                ticket = memory.admit(ID_MAX_DIMENSION)
+        except MemoryBusy as e:
+            timer.status = 'busy'
+            response = jsonify({'error': str(e)})
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 503
+        with ticket:
+            return process_id_request(timer, ticket)
+
+def process_id_request(timer, ticket):
+    """Handles one admitted ID upload, recording its stages and card type on ``timer``"""
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No file part in the request'}), 400
@@ -164,28 +254,41 @@ def extract_id_number():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
 
-        # Process image with memory optimization
-        image = Image.open(file.stream)
+        # Decode straight at the target resolution, honouring EXIF orientation
+        with metrics.stage('decode'):
+            image = load_image(file.stream, ticket.max_dimension)
         
         # Lightweight preprocessing
-        processed_img = lightweight_preprocess(image)
+        with metrics.stage('preprocess'):
+            processed_img, card_img, turn = lightweight_preprocess(image, ticket.max_dimension)
         if processed_img is None:
+            timer.status = 'error'
             return jsonify({'error': 'Image processing failed'}), 500
+
+        with metrics.stage('cache'):
+            cache_keys = ocr_cache.lookup_keys(processed_img, 'id')
+            cached = ocr_cache.get(cache_keys, 'id')
+        if cached is not None:
+            timer.card_type = cached['detected_card_type']
+            timer.status = 'cached'
+            ticket.discard()
+            return jsonify(cached)
         
         # Extract text and numbers
-        number_results, text_results = extract_text_lightweight(processed_img)
+        number_results, text_results, confidences = extract_text_lightweight(processed_img, card_img)
         
-        # Clean up image memory
-        del image, processed_img
-        gc.collect()
+        # Release the images before building the response
+        del image, processed_img, card_img
         
         # Process results
         cleaned_numbers = [re.sub(r'\s+', '', num) for num in number_results]
-        detected_card_type = detect_card_type_lightweight(text_results, cleaned_numbers)
+        with metrics.stage('card_type'):
+            detected_card_type = detect_card_type_lightweight(text_results, cleaned_numbers)
+        timer.card_type = detected_card_type
         
         # Categorize numbers
-        aadhar_numbers = [num for num in cleaned_numbers if re.match(r'^\d{12}$', num)]
-        pan_numbers = [num for num in cleaned_numbers if re.match(r'^[A-Z]{5}\d{4}[A-Z]$', num)]
+        aadhar_numbers = [num for num in cleaned_numbers if is_valid_aadhaar(num)]
+        pan_numbers = [num for num in cleaned_numbers if is_valid_pan(num)]
         
         # Determine primary number
         primary_number = None
@@ -212,34 +315,65 @@ def extract_id_number():
             'PAN': pan_numbers,
             'General Numbers': cleaned_numbers,
             'extracted_text': text_results[:5] if text_results else [],  # Limit to save memory
-            'confidence': 'high' if primary_number and (detected_card_type in ['Aadhar', 'PAN']) else 'medium'
+            'orientation': turn.as_dict(),
+            # From the recognizer: 'high' only for a valid number read with confidence
+            'confidence': 'high' if primary_number and is_valid_number(primary_number)
+                          and confidences.get(primary_number, 0.0) >= OCR_ACCEPT_CONFIDENCE else 'medium',
+            'confidence_score': round(confidences[primary_number], 3) if primary_number in confidences else None
         }
         
-        # Final cleanup
-        gc.collect()
+        ocr_cache.put(cache_keys, response, 'id',
+                      sensitive=bool(cleaned_numbers) or detected_card_type in ['Aadhar', 'PAN'])
         
         return jsonify(response)
         
+    except HTTPException:
+        # Upload limit violations raised while streaming the file
+        raise
     except Exception as e:
-        # Clean up memory on error
-        gc.collect()
+        timer.status = 'error'
         return jsonify({'error': f'Processing failed: {str(e)}'}), 500
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Simple health check endpoint"""
-    return jsonify({'status': 'healthy', 'service': 'ID Card OCR', 'version': 'lightweight'})
+    """Liveness check; readiness of the OCR model is reported alongside"""
+    return jsonify({
+        'status': 'healthy',
+        'service': 'ID Card OCR',
+        'version': 'lightweight',
+        'readiness': readiness.status(),
+        'cache': ocr_cache.stats(),
+        'memory': memory.stats()
+    })
+
+@app.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 503 until the OCR model is loaded and warmed up"""
+    status = readiness.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Stage latencies, in-flight requests, queue depth, cache hit ratio and memory for Prometheus"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
 
 @app.route('/', methods=['GET'])
 def home():
     """Root endpoint"""
     return jsonify({
         'message': 'Visitor Management ML Service - Lightweight Version',
-        'endpoints': ['/extract-id-number', '/health'],
+        'endpoints': ['/extract-id-number', '/health', '/health/ready', '/metrics'],
         'status': 'running'
     })
 
 if __name__ == '__main__':
     # Memory-optimized configuration
     port = int(os.environ.get('PORT', 5000))
+    # Run standalone, the process recycles by re-executing itself
+    memory.on_recycle = reexec
+    if OCR_WARMUP:
+        # Serve (and answer liveness checks) while the model loads
+        threading.Thread(target=warm_ocr_reader, name='ocr-warmup', daemon=True).start()
+    else:
+        readiness.mark_ready()
     app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
@@ -0,0 +1,375 @@
+"""Memory budget for the lightweight deployment.
+
+lightweight_app.py used to call ``gc.collect()`` after every stage. That cost
+CPU time on every request and capped nothing: numpy and OpenCV buffers are
+freed by reference counting the moment they go out of scope, and what
+actually makes a small instance run out of memory is several large images
+being processed at once, plus the heap growth they leave behind.
+``MemoryGovernor`` budgets for that instead:
+
+* it tracks the process RSS, the heap held by malloc (where numpy, OpenCV
+  and torch CPU tensors live) and, when torch runs on a GPU, its allocator;
+* it learns what one image costs: the peak RSS growth of requests that ran
+  on their own, per megapixel of the decode size (median of the recent ones;
+  until there are any, a conservative default);
+* the watermarks are shares of the headroom between the baseline RSS and
+  MEMORY_LIMIT_MB, not of the whole limit: the loaded model alone can take
+  up most of a small instance. ``calibrate`` measures the baseline once the
+  model is loaded and warmed up; until then it is taken as zero;
+* ``admit`` lets an image in only while RSS plus the estimated footprint of
+  every image in flight stays under the high watermark
+  (MEMORY_HIGH_WATERMARK). Above it, freed heap is handed back to the OS first
+  (``malloc_trim``), then the image is decoded smaller (down to
+  MEMORY_MIN_DIMENSION), and failing that it waits for images in flight
+  to finish, up to MEMORY_QUEUE_TIMEOUT, before the request is refused
+  with a Retry-After;
+* after MEMORY_RECYCLE_REQUESTS requests, or once RSS stays above the
+  recycle watermark (MEMORY_RECYCLE_WATERMARK) after a request, it stops
+  admitting, lets the images in flight finish and calls ``on_recycle``.
+  The standalone app re-executes itself, which starts it over with a fresh
+  heap. When the baseline alone is over MEMORY_RECYCLE_WATERMARK of the
+  limit, a fresh process would be over it too and recycle again at once;
+  RSS recycling is then turned off, and said so in the log.
+
+The numbers are served on /metrics and /health.
+"""
+import collections
+import ctypes
+import ctypes.util
+import os
+import signal
+import statistics
+import sys
+import threading
+import time
+
+import metrics
+
+# Budget (overridable through environment variables)
+MEMORY_LIMIT_MB = float(os.environ.get('MEMORY_LIMIT_MB', 512))
+MEMORY_HIGH_WATERMARK = float(os.environ.get('MEMORY_HIGH_WATERMARK', 0.75))
+MEMORY_RECYCLE_WATERMARK = float(os.environ.get('MEMORY_RECYCLE_WATERMARK', 0.9))
+# Recycle after this many requests; 0 only recycles on the RSS threshold
+MEMORY_RECYCLE_REQUESTS = int(os.environ.get('MEMORY_RECYCLE_REQUESTS', 0))
+MEMORY_QUEUE_TIMEOUT = float(os.environ.get('MEMORY_QUEUE_TIMEOUT', 10))
+MEMORY_MIN_DIMENSION = int(os.environ.get('MEMORY_MIN_DIMENSION', 800))
+MEMORY_RETRY_AFTER = int(os.environ.get('MEMORY_RETRY_AFTER', 5))
+
+MB = 2 ** 20
+# Footprint per megapixel assumed until requests have been measured, and the
+# least it is ever taken to be (the RGB frame, its gray copy and the buffers)
+INITIAL_FOOTPRINT_PER_MP = 80 * MB
+MIN_FOOTPRINT_PER_MP = 16 * MB
+# Solo requests the footprint estimate is the median of
+FOOTPRINT_SAMPLES = 15
+# Decoded frames are cards, about 1.6 times as wide as they are high
+CARD_ASPECT = 1.6
+# Each downscaling step shrinks the longest edge by this factor
+DOWNSCALE_STEP = 0.8
+# Time the last response gets to reach the client before the process recycles
+RECYCLE_GRACE = 1.0
+
+ADMISSIONS = metrics.Counter('ocr_memory_admissions', 'Images admitted by the memory governor, by outcome.',
+                             ['outcome'])
+RECYCLES = metrics.Counter('ocr_worker_recycles', 'Worker recycles started by the memory governor.', ['reason'])
+RESERVED = metrics.Gauge('ocr_memory_reserved_bytes', 'Estimated memory held by the images in flight.')
+BASELINE = metrics.Gauge('ocr_memory_baseline_bytes', 'RSS after warm-up that the memory budget starts from.')
+FOOTPRINT = metrics.Gauge('ocr_image_footprint_bytes', 'Estimated peak memory of one image, per megapixel.')
+HEAP_IN_USE = metrics.Gauge('process_heap_in_use_bytes', 'Bytes allocated through malloc and not yet freed.')
+TORCH_ALLOCATED = metrics.Gauge('ocr_torch_cuda_allocated_bytes', 'Bytes held by the torch CUDA allocator.')
+
+
+class MemoryBusy(Exception):
+    """Raised when an image cannot be admitted within the memory budget."""
+
+    def __init__(self, message='Not enough memory for another image, please retry shortly',
+                 retry_after=MEMORY_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# --- Measurements ---
+
+def reset_peak_rss():
+    """Restarts peak RSS tracking at the current RSS; False where unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class _MallInfo2(ctypes.Structure):
+    _fields_ = [(name, ctypes.c_size_t) for name in
+                ('arena', 'ordblks', 'smblks', 'hblks', 'hblkhd', 'usmblks', 'fsmblks', 'uordblks',
+                 'fordblks', 'keepcost')]
+
+
+def _load_libc():
+    name = ctypes.util.find_library('c')
+    if not name:
+        return None
+    try:
+        libc = ctypes.CDLL(name)
+        libc.mallinfo2.restype = _MallInfo2
+        libc.malloc_trim.argtypes = [ctypes.c_size_t]
+        return libc
+    except (OSError, AttributeError):
+        # Not glibc, or glibc older than 2.33
+        return None
+
+
+_libc = _load_libc()
+
+
+def heap_in_use_bytes():
+    """Bytes handed out by malloc and not freed yet (glibc only)."""
+    if _libc is None:
+        return None
+    info = _libc.mallinfo2()
+    return info.uordblks + info.hblkhd
+
+
+def trim_heap():
+    """Returns freed heap pages to the OS; True when glibc could do it."""
+    return _libc is not None and bool(_libc.malloc_trim(0))
+
+
+def torch_allocated_bytes():
+    """Bytes held by the torch CUDA allocator, or None when torch is not on a GPU."""
+    torch = sys.modules.get('torch')
+    if torch is None or not torch.cuda.is_available() or not torch.cuda.is_initialized():
+        return None
+    return torch.cuda.memory_allocated()
+
+
+def megapixels(max_dimension):
+    """Size of a card decoded with ``max_dimension`` as its longest edge."""
+    return max_dimension * max_dimension / CARD_ASPECT / 1e6
+
+
+def reexec():
+    """Replaces this process with a fresh copy of itself (same interpreter and arguments)."""
+    print('Memory governor: restarting the process')
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+def terminate():
+    """Asks this process to shut down gracefully; a process manager starts a new one."""
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+# --- Governor ---
+
+class Ticket:
+    """One admitted image; release it by leaving the ``with`` block."""
+
+    def __init__(self, governor, max_dimension, footprint, start_rss, solo):
+        self.governor = governor
+        self.max_dimension = max_dimension  # longest edge to decode the image at
+        self.footprint = footprint          # bytes reserved for it
+        self.start_rss = start_rss
+        self.solo = solo                    # nothing else ran alongside it (so far)
+        self.measure = True
+
+    def discard(self):
+        """Keeps this request out of the footprint estimate (no OCR ran, e.g. a cache hit)."""
+        self.measure = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.governor.release(self)
+
+
+class MemoryGovernor:
+    """Admission control and recycling against a memory budget."""
+
+    def __init__(self, limit_mb=MEMORY_LIMIT_MB, high_watermark=MEMORY_HIGH_WATERMARK,
+                 recycle_watermark=MEMORY_RECYCLE_WATERMARK, recycle_requests=MEMORY_RECYCLE_REQUESTS,
+                 queue_timeout=MEMORY_QUEUE_TIMEOUT, min_dimension=MEMORY_MIN_DIMENSION,
+                 on_drain=None, on_recycle=terminate):
+        self.limit_bytes = limit_mb * MB
+        self.high_watermark = high_watermark
+        self.recycle_watermark = recycle_watermark
+        self.baseline = None          # RSS after warm-up, see calibrate()
+        self.recycle_on_rss = True
+        self._budget_from(0)
+        self.recycle_requests = recycle_requests
+        self.queue_timeout = queue_timeout
+        self.min_dimension = min_dimension
+        self.on_drain = on_drain      # called with the reason when admission stops
+        self.on_recycle = on_recycle  # called once the last image in flight is done
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._reserved = 0
+        self._served = 0
+        self._samples = collections.deque(maxlen=FOOTPRINT_SAMPLES)
+        self._solo = None
+        self._draining = None
+
+        RESERVED.set_function(lambda: self._reserved)
+        BASELINE.set_function(lambda: self.baseline or 0)
+        FOOTPRINT.set_function(self.footprint_per_mp)
+        HEAP_IN_USE.set_function(heap_in_use_bytes)
+        TORCH_ALLOCATED.set_function(torch_allocated_bytes)
+
+    def _budget_from(self, baseline):
+        headroom = max(self.limit_bytes - baseline, 0)
+        self.high_bytes = baseline + headroom * self.high_watermark
+        self.recycle_bytes = baseline + headroom * self.recycle_watermark
+
+    def calibrate(self):
+        """Measures the baseline RSS and budgets the watermarks from it; returns it (None where unsupported).
+
+        Call it once the model is loaded and warmed up, before serving images.
+        """
+        trim_heap()
+        baseline = metrics.process_rss_bytes()
+        if baseline is None:
+            return None
+        with self._cond:
+            self.baseline = baseline
+            self._budget_from(baseline)
+            # A fresh process would start over the recycle watermark and recycle again at once
+            self.recycle_on_rss = baseline < self.limit_bytes * self.recycle_watermark
+        print(f"Memory governor: baseline {baseline / MB:.0f} MB RSS; high watermark "
+              f"{self.high_bytes / MB:.0f} MB, recycle watermark {self.recycle_bytes / MB:.0f} MB")
+        if not self.recycle_on_rss:
+            print(f"Memory governor: the baseline is already over {self.recycle_watermark:.0%} of the "
+                  f"{self.limit_bytes / MB:.0f} MB limit; not recycling on RSS (raise MEMORY_LIMIT_MB)")
+        return baseline
+
+    def footprint_per_mp(self):
+        if not self._samples:
+            return INITIAL_FOOTPRINT_PER_MP
+        return max(MIN_FOOTPRINT_PER_MP, statistics.median(self._samples))
+
+    def footprint(self, max_dimension):
+        return int(self.footprint_per_mp() * megapixels(max_dimension))
+
+    def _fitting_dimension(self, max_dimension):
+        """Largest decode size that fits the budget right now, or None."""
+        rss = metrics.process_rss_bytes() or 0
+        dimension, trimmed = max_dimension, False
+        while True:
+            if rss + self._reserved + self.footprint(dimension) <= self.high_bytes:
+                return dimension
+            if not trimmed:
+                trimmed = True
+                if trim_heap():
+                    rss = metrics.process_rss_bytes() or 0
+                    continue
+            smaller = int(dimension * DOWNSCALE_STEP)
+            if smaller < self.min_dimension:
+                return None
+            dimension = smaller
+
+    def admit(self, max_dimension):
+        """Admits one image; returns a Ticket or raises MemoryBusy.
+
+        ``ticket.max_dimension`` is the longest edge the image may be decoded
+        at, which is ``max_dimension`` unless memory is short.
+        """
+        deadline = time.monotonic() + self.queue_timeout
+        outcome = 'admitted'
+        with self._cond:
+            while True:
+                if self._draining:
+                    ADMISSIONS.labels('rejected').inc()
+                    raise MemoryBusy('Worker is restarting to free memory, please retry shortly')
+                dimension = self._fitting_dimension(max_dimension)
+                if dimension is None and self._in_flight == 0:
+                    # Nothing to wait for: the smallest size has to do
+                    dimension = self.min_dimension
+                if dimension is not None:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    ADMISSIONS.labels('rejected').inc()
+                    raise MemoryBusy()
+                outcome = 'queued'
+                self._cond.wait(remaining)
+
+            if outcome == 'admitted' and dimension < max_dimension:
+                outcome = 'downscaled'
+            ADMISSIONS.labels(outcome).inc()
+            if self._solo is not None:
+                self._solo.solo = False
+            solo = self._in_flight == 0 and reset_peak_rss()
+            start_rss = metrics.process_rss_bytes() or 0
+            ticket = Ticket(self, dimension, self.footprint(dimension), start_rss, solo)
+            self._solo = ticket if solo else None
+            self._in_flight += 1
+            self._reserved += ticket.footprint
+            return ticket
+
+    def release(self, ticket):
+        """Called when an admitted image is done; learns its footprint and decides on recycling."""
+        with self._cond:
+            self._in_flight -= 1
+            self._reserved -= ticket.footprint
+            self._served += 1
+            if self._solo is ticket:
+                self._solo = None
+                peak = metrics.process_peak_rss_bytes()
+                if ticket.solo and ticket.measure and peak:
+                    growth = peak - ticket.start_rss
+                    self._samples.append(growth / megapixels(ticket.max_dimension))
+
+            if not self._draining:
+                reason = None
+                if self.recycle_requests and self._served >= self.recycle_requests:
+                    reason = 'requests'
+                elif self.recycle_on_rss and self._over_recycle_watermark():
+                    reason = 'rss'
+                if reason:
+                    self._start_draining(reason)
+            if self._draining and self._in_flight == 0:
+                timer = threading.Timer(RECYCLE_GRACE, self._recycle)
+                timer.daemon = True
+                timer.start()
+            self._cond.notify_all()
+
+    def _over_recycle_watermark(self):
+        if (metrics.process_rss_bytes() or 0) < self.recycle_bytes:
+            return False
+        # Freed heap counts towards RSS until it is handed back
+        trim_heap()
+        return (metrics.process_rss_bytes() or 0) >= self.recycle_bytes
+
+    def _start_draining(self, reason):
+        self._draining = reason
+        RECYCLES.labels(reason).inc()
+        print(f"Memory governor: recycling after {self._served} requests at "
+              f"{(metrics.process_rss_bytes() or 0) / MB:.0f} MB RSS ({reason})")
+        if self.on_drain is not None:
+            self.on_drain(f'recycling ({reason})')
+
+    def _recycle(self):
+        if self.on_recycle is not None:
+            self.on_recycle()
+
+    def stats(self):
+        """Snapshot of the budget for /health."""
+        with self._cond:
+            rss, heap, torch_bytes = metrics.process_rss_bytes(), heap_in_use_bytes(), torch_allocated_bytes()
+            return {
+                'rss_mb': round(rss / MB, 1) if rss else None,
+                'baseline_mb': round(self.baseline / MB, 1) if self.baseline else None,
+                'heap_in_use_mb': round(heap / MB, 1) if heap is not None else None,
+                'torch_cuda_allocated_mb': round(torch_bytes / MB, 1) if torch_bytes is not None else None,
+                'high_watermark_mb': round(self.high_bytes / MB, 1),
+                'recycle_watermark_mb': round(self.recycle_bytes / MB, 1),
+                'recycle_on_rss': self.recycle_on_rss,
+                'in_flight': self._in_flight,
+                'reserved_mb': round(self._reserved / MB, 1),
+                'footprint_mb_per_megapixel': round(self.footprint_per_mp() / MB, 1),
+                'measured_requests': len(self._samples),
+                'served': self._served,
+                'draining': self._draining,
+            }
@@ -0,0 +1,328 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+A small counter / gauge / histogram registry, enough for ``/metrics`` to be
+scraped without pulling in prometheus_client:
+
+    with metrics.RequestTimer('/extract-id-number') as timer:
+        with metrics.stage('decode'):
+            image = load_image(...)
+        ...
+        timer.card_type = 'Aadhar'
+
+``stage`` finds the request being timed through a thread-local, so helpers
+deep in the call stack can time themselves without it being passed down.
+Stages are exclusive: a stage opened inside another (number extraction
+inside an OCR pass) is taken out of the outer one, and a stage entered
+several times (once per OCR pass) counts once, with its total time.
+When the request finishes, every stage is recorded in
+``ocr_stage_duration_seconds`` and the whole request in
+``ocr_request_duration_seconds``, both labelled with the endpoint and the card
+type, which is only known at the end. Gauges can be backed by a callback
+(``set_function``) to report values owned elsewhere, such as queue depth or
+cache counters, at scrape time.
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values, **kwargs):
+        """Returns the child for one combination of label values."""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f'{self.name} takes labels {self.labelnames}')
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+            return child
+
+    def _default(self):
+        # Metrics without labels are used directly
+        return self.labels()
+
+    def _samples(self):
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            yield from child.samples(self.name, self.labelnames, key)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines += [f'{name}{labels} {_format_value(value)}' for name, labels, value in self._samples()]
+        return '\n'.join(lines)
+
+
+class _CounterChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if amount < 0:
+            raise ValueError('Counters can only go up')
+        with self._lock:
+            self._value += amount
+
+    def samples(self, name, labelnames, key):
+        yield name + '_total', _labels(labelnames, key), self._value
+
+
+class Counter(_Metric):
+    """Monotonic count; exposed as ``<name>_total``."""
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._value = 0.0
+        self._function = None
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Reads the value from ``function()`` at every scrape."""
+        self._function = function
+
+    def samples(self, name, labelnames, key):
+        value = self._value
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception:
+                return
+            if value is None:
+                return
+        yield name, _labels(labelnames, key), value
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, or is read from a callback."""
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def dec(self, amount=1):
+        self._default().dec(amount)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._upper_bounds = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self, name, labelnames, key):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for bound, count in zip(list(self._upper_bounds) + [math.inf], counts):
+            cumulative += count
+            yield name + '_bucket', _labels(labelnames, key, [('le', _format_value(float(bound)))]), cumulative
+        yield name + '_sum', _labels(labelnames, key), total
+        yield name + '_count', _labels(labelnames, key), cumulative
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets (in seconds for timings)."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+
+class Registry:
+    """The metrics exposed together on one ``/metrics`` page."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'Metric {metric.name} is already registered')
+            self._metrics[metric.name] = metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def _proc_status_bytes(field):
+    """A kB field of /proc/self/status in bytes, or None (Linux only)."""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def process_rss_bytes():
+    """Resident set size of this process, from /proc (Linux only)."""
+    return _proc_status_bytes('VmRSS')
+
+
+def process_peak_rss_bytes():
+    """Peak resident set size of this process since it started or was last reset, from /proc."""
+    return _proc_status_bytes('VmHWM')
+
+
+# --- Metrics shared by the apps ---
+
+STAGE_SECONDS = Histogram('ocr_stage_duration_seconds', 'Time spent in one stage of a request.',
+                          ['endpoint', 'card_type', 'stage'])
+REQUEST_SECONDS = Histogram('ocr_request_duration_seconds', 'Time to answer a request, end to end.',
+                            ['endpoint', 'card_type', 'status'])
+IN_FLIGHT = Gauge('ocr_requests_in_flight', 'Requests being processed right now.', ['endpoint'])
+GEMINI_SECONDS = Histogram('gemini_request_duration_seconds', 'Latency of Gemini extraction calls.',
+                           ['extraction_type', 'outcome'])
+PROCESS_RSS = Gauge('process_resident_memory_bytes', 'Resident memory size in bytes.')
+PROCESS_RSS.set_function(process_rss_bytes)
+
+_local = threading.local()
+
+
+class RequestTimer:
+    """Times one request and its stages; see the module docstring."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.card_type = 'unknown'
+        self.status = 'ok'
+        self.stages = {}
+        self._nested = []
+
+    def __enter__(self):
+        self._previous = getattr(_local, 'timer', None)
+        _local.timer = self
+        IN_FLIGHT.labels(self.endpoint).inc()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._started
+        _local.timer = self._previous
+        IN_FLIGHT.labels(self.endpoint).dec()
+        if exc_type is not None:
+            self.status = 'error'
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.labels(self.endpoint, self.card_type, name).observe(seconds)
+        REQUEST_SECONDS.labels(self.endpoint, self.card_type, self.status).observe(elapsed)
+        return False
+
+
+@contextmanager
+def stage(name):
+    """Times a block as stage ``name`` of the current request (no-op outside one)."""
+    timer = getattr(_local, 'timer', None)
+    if timer is None:
+        yield
+        return
+    # Time spent in stages opened inside this one
+    timer._nested.append(0.0)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        nested = timer._nested.pop()
+        timer.stages[name] = timer.stages.get(name, 0.0) + elapsed - nested
+        if timer._nested:
+            timer._nested[-1] += elapsed
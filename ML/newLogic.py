@@ -1,27 +1,44 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from PIL import Image
-import numpy as np
-import io
-import easyocr
 import re
-import cv2
 import os
 from werkzeug.utils import secure_filename
+from preprocessing import preprocess_and_rotate, load_image
+import ocr_pool
+from ocr_pool import get_pool, PoolSaturated, OCRTimeout
+from result_cache import ResultCache
+from id_roi import ID_ROI, scored_numbers
+from id_validation import is_valid_aadhaar, is_valid_number, is_valid_pan
+from ocr_tiers import OCR_ACCEPT_CONFIDENCE, read_id_tiered
+from card_fields import extract_business_card, extract_custom_data
+import uploads
+import batch
 
 app = Flask(__name__)
 # CORS configuration for both endpoints - allow your frontend domain
 CORS(app, resources={
     r"/extract-id-number": {"origins": ["http://localhost:3000", "https://your-frontend-domain.onrender.com"]}, 
-    r"/upload": {"origins": ["http://localhost:3000", "https://your-frontend-domain.onrender.com"]}
+    r"/upload": {"origins": ["http://localhost:3000", "https://your-frontend-domain.onrender.com"]},
+    r"/extract-id-number/batch": {"origins": ["http://localhost:3000", "https://your-frontend-domain.onrender.com"]},
+    r"/upload/batch": {"origins": ["http://localhost:3000", "https://your-frontend-domain.onrender.com"]}
 })
 
 # Configuration for file uploads
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
+# Stream uploads with early size/type/dimension checks (see uploads.py)
+uploads.init_app(app)
 ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png'}
 
-# Initialize OCR Reader (one-time setup for efficiency)
-reader = easyocr.Reader(['en'], gpu=False)
+# Longest edge each endpoint decodes uploads at (JPEGs are decoded in draft mode)
+ID_MAX_DIMENSION = int(os.environ.get('ID_MAX_DIMENSION', 1600))
+CARD_MAX_DIMENSION = int(os.environ.get('CARD_MAX_DIMENSION', 1600))
+
+# OCR runs on a pool of worker processes, each with its own preloaded reader
+# (see ocr_pool.py for OCR_WORKERS / OCR_QUEUE_SIZE / OCR_TIMEOUT); concurrent
+# requests are micro-batched (see ocr_batcher.py for OCR_BATCH_WINDOW_MS / OCR_MAX_BATCH)
+
+# Cache of results for repeated uploads of the same card (exact pixels)
+ocr_cache = ResultCache()
 
 # --- Placeholder phrases to ignore ---
 PLACEHOLDER_PHRASES = {
@@ -31,44 +48,30 @@ PLACEHOLDER_PHRASES = {
     '123 anywhere st., any city'
 }
 
-# --- Public email domains to avoid misinterpreting as company names ---
-PUBLIC_EMAIL_DOMAINS = {
-    'gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com', 'aol.com', 'icloud.com', 'protonmail.com'
-}
-
 def allowed_file(filename):
     """Checks if the uploaded file has an allowed extension."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def preprocess_and_rotate(image):
-    """Preprocesses the image for better OCR results, including rotation."""
-    img = np.array(image.convert("RGB"))
-    
-    # Rotate image if it's taller than it is wide
-    h, w, _ = img.shape
-    if h > w:
-        img = cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
-        
-    # Convert to grayscale and apply sharpening
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    sharpen_kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
-    sharp = cv2.filter2D(gray, -1, sharpen_kernel)
-    
-    # Apply thresholding
-    _, thresh = cv2.threshold(sharp, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    
-    return thresh, img
-
-def extract_text_and_numbers(image_np):
-    """Extracts text and numbers from an image using EasyOCR."""
-    results = reader.readtext(image_np, detail=0, paragraph=False)
-    full_text = ' '.join(results)
-    
-    # Extract Aadhar (12 digits, with optional spaces) and PAN (10 alphanumeric characters)
-    aadhar_pattern = r'\b(?:\d{4}\s?\d{4}\s?\d{4}|\d{12})\b'
-    pan_pattern = r'\b[A-Z]{5}\d{4}[A-Z]\b'
-    numbers = re.findall(f'{aadhar_pattern}|{pan_pattern}', full_text)
-    return numbers, results
+def ocr_unavailable_response(error):
+    """Builds the response returned when the OCR pool is saturated or times out."""
+    if isinstance(error, PoolSaturated):
+        response = jsonify({'error': str(error)})
+        response.headers['Retry-After'] = str(error.retry_after)
+        return response, 503
+    return jsonify({'error': str(error)}), 504
+
+def read_full_card(image_np):
+    """One OCR pass over the whole card, with the number confidences."""
+    results = ocr_pool.readtext(image_np, detail=1)
+    return scored_numbers(results), results
+
+def read_id_card(processed_img, source, profile=None):
+    """OCRs an ID card in as few passes as it needs (see ocr_tiers.py)."""
+    if ID_ROI:
+        # Read the number from the likeliest boxes with a restricted recognizer, the text from the whole card
+        return read_id_tiered(lambda image: ocr_pool.read_id_numbers(image, detail=1), processed_img, source,
+                              profile=profile)
+    return read_id_tiered(read_full_card, processed_img, source, profile=profile)
 
 def detect_id_card_type(text_results, numbers):
     """Detects the type of ID card based on text content and number patterns."""
@@ -115,224 +118,124 @@ def detect_id_card_type(text_results, numbers):
     else:
         return 'Other'
 
-def extract_email(text):
-    """Extracts email addresses using regex."""
-    match = re.search(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
-    return match.group(0) if match else None
-
-def extract_mobile_number(text):
-    """Extracts a 10-digit mobile number, optionally with a +91 prefix."""
-    mobile_patterns = [
-        r'(?:m|mob|mobile)?[:\s]*(\+91[-\s]?)?([6-9]\d{9})\b',
-        r'\b([6-9]\d{9})\b'
-    ]
-    
-    for pattern in mobile_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        for match in matches:
-            number = "".join(filter(None, match)).strip()
-            if not re.search(r'(?:ext|extension|x|fax)\s*[:\s]*' + re.escape(number), text, re.IGNORECASE):
-                return number
-    
-    return None
-
-def extract_company_number(text):
-    """Extracts a company landline number, potentially with context or an extension."""
-    patterns = [
-        r'(?:tel|phone|ph|o|office|work|fax)[:\s]*([\+]\d{1,3}[-\s]?)?(\(?\d{2,5}\)?[-\s]?\d{6,8}(\s*(?:ext|extension|x)[-:\s]*\d+)?)',
-        r'(\+91[-\s]*(?:0?[1-5]\d|40|80|11|22|33|44)[-\s]*\d{6,8})(\s*(?:ext|extension|x)[-:\s]*\d+)?'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            full_number = "".join([g for g in match.groups() if g is not None]).strip()
-            clean_number = re.sub(r'[^\d]', '', full_number)
-            if len(clean_number) == 10 and clean_number.startswith(('6','7','8','9')):
-                continue
-            return full_number
-    
-    return None
-
-def extract_website(text):
-    """Extracts a website URL, improved to not misidentify email addresses."""
-    match = re.search(r'\b(?:https?:\/\/)?(?:www\.)?[-a-zA-Z0-9:%._\+~#=]{2,256}\.[a-zA-Z]{2,6}\b', text, re.IGNORECASE)
-    if match:
-        url = match.group(0)
-        if '@' in url:
-            return None
-        if any(tld in url for tld in ['.com', '.in', '.org', '.net', '.co', '.io', '.tech']):
-            return url
-    return None
-
-def extract_company_name(lines):
-    """Extracts company name using a broader list of keywords."""
-    company_keywords = [
-        'pvt', 'ltd', 'limited', 'llp', 'inc', 'corp', 'solutions', 'services', 
-        'industries', 'group', 'associates', 'consulting', 'global', 'technologies', 'software'
-    ]
-    for line in lines:
-        if any(keyword in line.lower() for keyword in company_keywords):
-            return line.strip().title()
-    for line in lines:
-        if line.isupper() and 2 < len(line.split()) < 5:
-            return line.title()
-    return "Not Found"
-
-def extract_address(lines):
-    """Extracts address by identifying generic address-related keywords."""
-    address_parts = []
-    address_keywords = [
-        'block', 'house', 'road', 'street', 'avenue', 'lane', 'floor', 'building', 
-        'marg', 'sector', 'pincode', 'india', r'\b\d{5,6}\b', 'nagar', 'park', 'ave'
-    ]
-    non_address_keywords = ['@', 'www', '.com', 'phone', 'mobile', 'email', 'pvt', 'ltd', r'\+91', 'director', 'manager']
-    
-    cleaned_lines = []
-    for line in lines:
-        cleaned_line = line.strip()
-        cleaned_line = re.sub(r'[Ii][Ii][lI](?=\s|,|$)', 'III', cleaned_line, flags=re.IGNORECASE)
-        cleaned_line = cleaned_line.replace(';', ',')
-        if cleaned_line:
-            cleaned_lines.append(cleaned_line)
+def build_id_response(number_results, text_results, confidences=None, orientation=None):
+    """Builds the /extract-id-number response from the OCR output.
+
+    ``confidences`` maps cleaned numbers to recognizer confidence; without
+    it the confidence label falls back to the detected card type.
+    ``orientation`` is the rotation decision, echoed for debugging.
+    """
+    cleaned_numbers = [re.sub(r'\s+', '', num) for num in number_results]
     
-    start_index = -1
-    for i, line in enumerate(cleaned_lines):
-        if any(re.search(keyword, line.lower()) for keyword in address_keywords):
-            if not any(re.search(keyword, line.lower()) for keyword in non_address_keywords):
-                start_index = i
-                break
+    # Detect the type of ID card
+    detected_card_type = detect_id_card_type(text_results, cleaned_numbers)
     
-    if start_index != -1:
-        for i in range(start_index, len(cleaned_lines)):
-            line = cleaned_lines[i].strip()
-            line_lower = line.lower()
-            if not line: continue
-            if any(re.search(keyword, line_lower) for keyword in non_address_keywords): break
-            words = line.split()
-            if len(words) in [2, 3] and all(word.isalpha() for word in words):
-                if not any(re.search(keyword, line_lower) for keyword in address_keywords):
-                    continue
-            address_parts.append(line)
-            if len(address_parts) >= 2 and any(re.search(keyword, line_lower) for keyword in ['india', r'\b\d{5,6}\b']):
-                break
+    # Categorize numbers by type; only checksummed Aadhaar and well-formed PAN numbers qualify
+    aadhar_numbers = [num for num in cleaned_numbers if is_valid_aadhaar(num)]
+    pan_numbers = [num for num in cleaned_numbers if is_valid_pan(num)]
     
-    pincode = None
-    for line in cleaned_lines:
-        pincode_match = re.search(r'\b(\d{6})\b', line)
-        if pincode_match:
-            pincode = pincode_match.group(1)
-            break
+    # Determine the primary number and type
+    primary_number = None
+    primary_type = detected_card_type
     
-    if pincode and not any(pincode in part for part in address_parts):
-        address_parts.append(pincode)
-        
-    if address_parts:
-        address = ', '.join(part for part in address_parts if part).strip()
-        address = re.sub(r'\s*,\s*', ', ', address).replace(" ,", ",")
-        
-        address_parts_formatted = address.split(', ')
-        final_parts = []
-        for part in address_parts_formatted:
-            formatted_part = part.title()
-            formatted_part = re.sub(r'\bIii\b', 'III', formatted_part)
-            words = formatted_part.split(' ')
-            corrected_words = [word.upper() if len(word) == 2 and word.isalpha() else word for word in words]
-            final_parts.append(' '.join(corrected_words))
-        
-        address = ', '.join(final_parts)
-        address = re.sub(r'([A-Za-z]+)\s*-\s*(III)', r'\1-\2', address)
-        address = re.sub(r',\s*(\d{5,6})$', r' - \1', address)
-        return address
-
-    return "Not Found"
+    if detected_card_type == 'Aadhar' and aadhar_numbers:
+        primary_number = aadhar_numbers[0]
+    elif detected_card_type == 'PAN' and pan_numbers:
+        primary_number = pan_numbers[0]
+    elif aadhar_numbers:
+        primary_number = aadhar_numbers[0]
+        primary_type = 'Aadhar'
+    elif pan_numbers:
+        primary_number = pan_numbers[0]
+        primary_type = 'PAN'
+    elif cleaned_numbers:
+        primary_number = cleaned_numbers[0]
+        primary_type = detected_card_type
 
-def extract_name_and_designation(lines):
-    """Extracts name and designation using a more robust filtering approach."""
-    name = None
-    designation = None
-    
-    designation_keywords = [
-        'director', 'manager', 'engineer', 'strategy', 'delivery', 'officer', 'ceo', 'cto', 
-        'cfo', 'coo', 'founder', 'partner', 'consultant', 'president', 'executive', 
-        'analyst', 'developer', 'designer', 'architect', 'head', 'lead', 'specialist', 'project manager'
-    ]
-    
-    non_name_keywords = [
-        '@', '.com', 'www', 'http', '+', 'tel', 'mob', 'email', 'website',
-        'pvt', 'ltd', 'inc', 'corp', 'solutions', 'services', 'technologies', 'industries', 'llp', 'group',
-        'road', 'street', 'floor', 'lane', 'marg', 'sector', 'pincode', 'nagar', 'house', 
-        'block', 'building', 'avenue', 'india'
-    ]
-    
-    candidates = []
-    for line in lines:
-        line_lower = line.lower()
-        if not any(char.isdigit() for char in line) and not any(kw in line_lower for kw in non_name_keywords):
-            if 0 < len(line.split()) < 5:
-                candidates.append(line.strip())
-
-    remaining_candidates = []
-    for line in candidates:
-        if any(re.search(r'\b' + keyword + r'\b', line.lower()) for keyword in designation_keywords):
-            if not designation:
-                designation = line.title()
-        else:
-            remaining_candidates.append(line)
-
-    if remaining_candidates:
-        name_candidates = [c for c in remaining_candidates if len(c.split()) in [2, 3]]
-        if name_candidates:
-            name = max(name_candidates, key=len).title()
-        elif remaining_candidates:
-            name = max(remaining_candidates, key=len).title()
-
-    return name, designation
-
-def extract_custom_data(lines, prompt):
-    """Extracts data based on the user prompt."""
-    if not prompt:
-        return None
-
-    prompt = prompt.lower().strip()
-    full_text = ' '.join(lines)
-    result = {}
-
-    # Define common fields and their extraction logic
-    field_extractors = {
-        'name': lambda: extract_name_and_designation(lines)[0],
-        'designation': lambda: extract_name_and_designation(lines)[1],
-        'company': lambda: extract_company_name(lines),
-        'email': lambda: extract_email(full_text),
-        'mobile': lambda: extract_mobile_number(full_text),
-        'phone': lambda: extract_mobile_number(full_text),  # Alias for mobile
-        'company number': lambda: extract_company_number(full_text),
-        'company tel': lambda: extract_company_number(full_text),  # Alias
-        'website': lambda: extract_website(full_text),
-        'address': lambda: extract_address(lines),
-        'items': lambda: ', '.join([line for line in lines if any(kw in line.lower() for kw in ['item', 'items', 'product', 'products'])])
+    return {
+        'detected_card_type': detected_card_type,
+        'primary_number': primary_number,
+        'primary_type': primary_type,
+        'Aadhar': aadhar_numbers,
+        'PAN': pan_numbers,
+        'General Numbers': cleaned_numbers,
+        'extracted_text': text_results[:10],  # First 10 text elements for debugging
+        'orientation': orientation.as_dict() if orientation else None,
+        'confidence': confidence_label(primary_number, detected_card_type, confidences),
+        'confidence_score': round(confidences[primary_number], 3) if primary_number in (confidences or {}) else None
     }
 
-    # Parse prompt to identify requested fields
-    requested_fields = []
-    for field in field_extractors.keys():
-        if field in prompt:
-            requested_fields.append(field)
-
-    # If no specific fields are mentioned, try to infer from context
-    if not requested_fields:
-        if 'receipt' in prompt:
-            requested_fields = ['items', 'company', 'address']
-        elif 'business card' in prompt:
-            requested_fields = ['name', 'designation', 'company', 'email', 'mobile', 'company tel', 'website', 'address']
-        else:
-            requested_fields = list(field_extractors.keys())  # Default to all fields
-
-    # Extract requested fields
-    for field in requested_fields:
-        result[field] = field_extractors[field]() or "Not Found"
-
-    return result or {"message": "No relevant data extracted based on prompt"}
+def confidence_label(primary_number, detected_card_type, confidences=None):
+    """'high' for a valid number read with confidence, 'medium' otherwise."""
+    if confidences is None:
+        return 'high' if primary_number and (detected_card_type in ['Aadhar', 'PAN']) else 'medium'
+    if primary_number and is_valid_number(primary_number) and confidences.get(primary_number, 0.0) >= OCR_ACCEPT_CONFIDENCE:
+        return 'high'
+    return 'medium'
+
+def build_business_card_response(results, prompt=''):
+    """Builds the /upload response from the OCR lines of a business card."""
+    # Filter out placeholder text
+    filtered_results = [line for line in results if line.lower().strip() not in PLACEHOLDER_PHRASES]
+
+    if prompt:
+        # Use prompt-based extraction
+        return extract_custom_data(filtered_results, prompt)
+
+    # Default behavior: extract business card details in one pass (see card_fields.py)
+    return extract_business_card(filtered_results)
+
+def process_id_image(stream):
+    """Decodes, preprocesses and OCRs an ID card upload into the response dict.
+
+    Raises PoolSaturated / OCRTimeout when the OCR pool cannot take the job.
+    """
+    image = load_image(stream, ID_MAX_DIMENSION)
+    processed_img, img, analysis = preprocess_and_rotate(image, ID_MAX_DIMENSION, with_analysis=True)
+
+    cache_keys = ocr_cache.lookup_keys(processed_img, 'id')
+    cached = ocr_cache.get(cache_keys, 'id')
+    if cached is not None:
+        return cached
+
+    result = read_id_card(processed_img, img, analysis.profile)
+    response = build_id_response(result.numbers, result.texts, result.confidences, analysis.turn)
+    ocr_cache.put(cache_keys, response, 'id',
+                  sensitive=bool(response['General Numbers']) or response['detected_card_type'] in ['Aadhar', 'PAN'])
+    return response
+
+def process_business_card_image(stream, prompt=''):
+    """Decodes, preprocesses and OCRs a business card upload into the response dict.
+
+    Raises PoolSaturated / OCRTimeout when the OCR pool cannot take the job.
+    """
+    image = load_image(stream, CARD_MAX_DIMENSION)
+    processed_img, _ = preprocess_and_rotate(image, CARD_MAX_DIMENSION)
+
+    cache_namespace = f'card:{prompt.lower()}'
+    cache_keys = ocr_cache.lookup_keys(processed_img, cache_namespace)
+    cached = ocr_cache.get(cache_keys, cache_namespace)
+    if cached is not None:
+        return cached
+
+    results = ocr_pool.readtext(processed_img)
+    response_data = build_business_card_response(results, prompt)
+    ocr_cache.put(cache_keys, response_data, cache_namespace)
+    return response_data
+
+def health_status():
+    """Liveness payload shared by the Flask and ASGI entry points.
+
+    The process answering is liveness; ``readiness`` says whether the OCR
+    workers are loaded and warmed up.
+    """
+    return {
+        'status': 'healthy',
+        'service': 'ID Card OCR',
+        'readiness': get_pool().readiness.status(),
+        'ocr_pool': get_pool().stats(),
+        'cache': ocr_cache.stats(),
+    }
 
 @app.route('/extract-id-number', methods=['POST'])
 def extract_id_number():
@@ -345,48 +248,9 @@ def extract_id_number():
         return jsonify({'error': 'No file selected'}), 400
 
     try:
-        image = Image.open(file.stream)
-        processed_img, _ = preprocess_and_rotate(image)
-        number_results, text_results = extract_text_and_numbers(processed_img)
-
-        cleaned_numbers = [re.sub(r'\s+', '', num) for num in number_results]
-        
-        # Detect the type of ID card
-        detected_card_type = detect_id_card_type(text_results, cleaned_numbers)
-        
-        # Categorize numbers by type
-        aadhar_numbers = [num for num in cleaned_numbers if re.match(r'^\d{12}$', num)]
-        pan_numbers = [num for num in cleaned_numbers if re.match(r'^[A-Z]{5}\d{4}[A-Z]$', num)]
-        
-        # Determine the primary number and type
-        primary_number = None
-        primary_type = detected_card_type
-        
-        if detected_card_type == 'Aadhar' and aadhar_numbers:
-            primary_number = aadhar_numbers[0]
-        elif detected_card_type == 'PAN' and pan_numbers:
-            primary_number = pan_numbers[0]
-        elif aadhar_numbers:
-            primary_number = aadhar_numbers[0]
-            primary_type = 'Aadhar'
-        elif pan_numbers:
-            primary_number = pan_numbers[0]
-            primary_type = 'PAN'
-        elif cleaned_numbers:
-            primary_number = cleaned_numbers[0]
-            primary_type = detected_card_type
-
-        response = {
-            'detected_card_type': detected_card_type,
-            'primary_number': primary_number,
-            'primary_type': primary_type,
-            'Aadhar': aadhar_numbers,
-            'PAN': pan_numbers,
-            'General Numbers': cleaned_numbers,
-            'extracted_text': text_results[:10],  # First 10 text elements for debugging
-            'confidence': 'high' if primary_number and (detected_card_type in ['Aadhar', 'PAN']) else 'medium'
-        }
-        return jsonify(response), 200
+        return jsonify(process_id_image(file.stream)), 200
+    except (PoolSaturated, OCRTimeout) as e:
+        return ocr_unavailable_response(e)
     except Exception as e:
         return jsonify({'error': f'Failed to process image: {str(e)}'}), 500
 
@@ -404,58 +268,53 @@ def upload_image():
         return jsonify({"error": "Invalid file type. Allowed types: jpg, jpeg, png"}), 400
 
     try:
-        image = Image.open(file.stream)
-        processed_img, _ = preprocess_and_rotate(image)
-        results = reader.readtext(processed_img, detail=0, paragraph=False)
-        
-        # Filter out placeholder text
-        filtered_results = [line for line in results if line.lower().strip() not in PLACEHOLDER_PHRASES]
-        
         # Get user prompt if provided
         prompt = request.form.get('prompt', '').strip()
-
-        if prompt:
-            # Use prompt-based extraction
-            response_data = extract_custom_data(filtered_results, prompt)
-        else:
-            # Default behavior: extract business card details
-            full_text = ' '.join(filtered_results)
-            email = extract_email(full_text)
-            mobile_number = extract_mobile_number(full_text)
-            company_number = extract_company_number(full_text)
-            website = extract_website(full_text)
-            name, designation = extract_name_and_designation(filtered_results)
-            company = extract_company_name(filtered_results)
-
-            if company == "Not Found" and email:
-                domain = email.split('@')[1]
-                if domain.lower() not in PUBLIC_EMAIL_DOMAINS:
-                    tlds = ['.com', '.in', '.org', '.net', '.co.uk', '.co.in', '.co']
-                    for tld in sorted(tlds, key=len, reverse=True):
-                        if domain.endswith(tld):
-                            domain = domain[:-len(tld)]
-                            break
-                    company = domain.replace('-', ' ').title()
-
-            address = extract_address(filtered_results)
-            
-            response_data = {
-                "name": name if name else "Not Found",
-                "designation": designation if designation else "Not Found",
-                "company": company if company else "Not Found",
-                "email": email if email else "Not Found",
-                "personal_mobile_number": mobile_number if mobile_number else "Not Found",
-                "company_number": company_number if company_number else "Not Found",
-                "website": website if website else "Not Found",
-                "address": address if address else "Not Found",
-            }
-
-        return jsonify(response_data), 200
-            
+        return jsonify(process_business_card_image(file.stream, prompt)), 200
+    except (PoolSaturated, OCRTimeout) as e:
+        return ocr_unavailable_response(e)
     except Exception as e:
         return jsonify({"error": f"An error occurred during processing: {e}"}), 500
 
+def batch_response(process):
+    """Streams NDJSON results for every uploaded image (see batch.py)."""
+    files = request.files.getlist('file') + request.files.getlist('files')
+    if not files:
+        return jsonify({'error': 'No file part in the request'}), 400
+    try:
+        items = batch.expand_uploads([(file.filename, file.stream) for file in files])
+    except batch.BatchTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    # The request context keeps the uploaded files open while the results stream
+    return Response(stream_with_context(batch.stream_results(items, process)), mimetype=batch.NDJSON_MIMETYPE)
+
+@app.route('/extract-id-number/batch', methods=['POST'])
+@uploads.accepts_archives
+def extract_id_number_batch():
+    """Extract ID numbers from many images (or zips of them), streamed back as NDJSON."""
+    return batch_response(process_id_image)
+
+@app.route('/upload/batch', methods=['POST'])
+@uploads.accepts_archives
+def upload_image_batch():
+    """Extract business card details from many images (or zips of them), streamed back as NDJSON."""
+    prompt = request.form.get('prompt', '').strip()
+    return batch_response(lambda stream: process_business_card_image(stream, prompt))
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check with OCR pool occupancy and cache counters"""
+    return jsonify(health_status())
+
+@app.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 503 until the OCR workers are warmed up"""
+    status = get_pool().readiness.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
 if __name__ == '__main__':
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     port = int(os.environ.get('PORT', 5000))
+    # Load + warm the model and fork the workers before serving
+    get_pool().start()
     app.run(host='0.0.0.0', port=port, debug=False)
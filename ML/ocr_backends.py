@@ -0,0 +1,111 @@
+"""Pluggable OCR backends.
+
+Every backend returns an object with the EasyOCR ``Reader`` surface the apps
+rely on (``readtext``, ``detect`` and ``recognize``), so the OCR pool, the
+micro-batcher and the warm-up code work the same whichever one is loaded.
+Pick one with OCR_BACKEND:
+
+* ``easyocr`` (default) - the stock PyTorch reader;
+* ``onnx`` - the same CRAFT detector and recognizer exported to ONNX and
+  int8-quantized by export_onnx.py, executed by ONNX Runtime. Only the two
+  forward passes move to ONNX Runtime; EasyOCR's resizing, box grouping and
+  CTC decoding run unchanged, so the results keep their shape and ordering.
+
+benchmarks/compare_backends.py measures latency, memory and agreement of the
+backends on the same images before one is switched on in production.
+"""
+import os
+
+OCR_BACKEND = os.environ.get('OCR_BACKEND', 'easyocr')
+OCR_LANGUAGES = ['en']
+# Where export_onnx.py writes the quantized models
+OCR_ONNX_DIR = os.environ.get('OCR_ONNX_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'onnx'))
+ONNX_DETECTOR_FILE = 'craft_int8.onnx'
+ONNX_RECOGNIZER_FILE = 'english_g2_int8.onnx'
+
+
+class ONNXDetector:
+    """Stands in for the CRAFT torch module inside ``easyocr.detection.test_net``."""
+
+    def __init__(self, session):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, x):
+        import torch
+        score = self.session.run(None, {self.input_name: x.cpu().numpy()})[0]
+        # test_net only reads the score maps, the feature map was dropped at export
+        return torch.from_numpy(score), None
+
+
+class ONNXRecognizer:
+    """Stands in for the recognition torch module inside ``easyocr.recognition``."""
+
+    def __init__(self, session):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, image, text=None):
+        import torch
+        # The CTC head ignores ``text``, it was not exported
+        return torch.from_numpy(self.session.run(None, {self.input_name: image.cpu().numpy()})[0])
+
+
+def _onnx_session(path, threads):
+    import onnxruntime as ort
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"{path} not found, run export_onnx.py first")
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if threads:
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+    return ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+
+
+def _easyocr_reader(threads=None):
+    import easyocr
+    return easyocr.Reader(OCR_LANGUAGES, gpu=False)
+
+
+def _onnx_reader(threads=None):
+    import easyocr
+    from easyocr.detection import get_textbox
+    from easyocr.utils import CTCLabelConverter
+
+    # Build the reader without its torch models; it still resolves the
+    # character set and language settings the pre/post-processing needs
+    reader = easyocr.Reader(OCR_LANGUAGES, gpu=False, detector=False, recognizer=False)
+    dict_list = {lang: os.path.join(os.path.dirname(easyocr.__file__), 'dict', lang + '.txt')
+                 for lang in OCR_LANGUAGES}
+    reader.converter = CTCLabelConverter(reader.character, {}, dict_list)
+    reader.detect_network = 'craft'
+    reader.get_textbox = get_textbox
+    reader.detector = ONNXDetector(_onnx_session(os.path.join(OCR_ONNX_DIR, ONNX_DETECTOR_FILE), threads))
+    reader.recognizer = ONNXRecognizer(_onnx_session(os.path.join(OCR_ONNX_DIR, ONNX_RECOGNIZER_FILE), threads))
+    return reader
+
+
+BACKENDS = {
+    'easyocr': _easyocr_reader,
+    'onnx': _onnx_reader,
+}
+
+
+def create_reader(backend=None, threads=None):
+    """Builds the OCR reader for ``backend`` (OCR_BACKEND by default).
+
+    ``threads`` caps the intra-op threads of backends that manage their own
+    thread pool; the torch backend follows ``torch.set_num_threads``.
+    """
+    backend = backend or OCR_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown OCR_BACKEND '{backend}', expected one of: {', '.join(BACKENDS)}")
+    print(f"Loading OCR backend '{backend}'")
+    return BACKENDS[backend](threads)
@@ -0,0 +1,201 @@
+"""Micro-batching of OCR requests that arrive close together.
+
+Kiosks tend to post cards within a few hundred milliseconds of each other.
+``OCRBatcher`` holds incoming images for a short window (or until the batch is
+full), runs CRAFT detection over the whole batch in one forward pass and the
+recognizer over every detected box in one call, then hands each caller back
+its own lines. Only detection is batched in the tensor sense: the readers
+here run with ``gpu=False``, and on CPU EasyOCR recognizes one box at a time
+whatever ``batch_size`` says, so recognition saves call overhead, not
+compute.
+"""
+import os
+import queue
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+# Batching configuration (overridable through environment variables)
+OCR_BATCH_WINDOW_MS = float(os.environ.get('OCR_BATCH_WINDOW_MS', 50))
+OCR_MAX_BATCH = int(os.environ.get('OCR_MAX_BATCH', 4))
+OCR_RECOGNIZER_BATCH = int(os.environ.get('OCR_RECOGNIZER_BATCH', 16))
+
+
+def _pad(image, height, width):
+    """Pads an image with white up to (height, width) so a batch shares one shape."""
+    h, w = image.shape[:2]
+    if h == height and w == width:
+        return image
+    padded = np.full((height, width) + image.shape[2:], 255, dtype=image.dtype)
+    padded[:h, :w] = image
+    return padded
+
+
+def readtext_batch(reader, images, detail=0):
+    """Runs detection and recognition for several images as one batch.
+
+    Detection gets a single 4D tensor. For recognition the grayscale images
+    are stacked vertically and every box is shifted into that tall canvas, so
+    one ``recognize`` call covers all images (on a GPU reader the crops are
+    batched together; on CPU EasyOCR still reads them one by one). Detector
+    boxes carry a margin, so each box is clipped to its own image first and
+    cannot pick up pixels of the image stacked below it.
+    """
+    from easyocr.utils import reformat_input
+
+    if not images:
+        return []
+    colors, greys = zip(*(reformat_input(image) for image in images))
+    height = max(img.shape[0] for img in colors)
+    width = max(img.shape[1] for img in colors)
+
+    batch = np.stack([_pad(img, height, width) for img in colors])
+    horizontal_agg, free_agg = reader.detect(batch, reformat=False)
+
+    offsets = [i * height for i in range(len(images))]
+    canvas = np.vstack([_pad(grey, height, width) for grey in greys])
+    horizontal_list, free_list = [], []
+    for offset, img, boxes, polys in zip(offsets, colors, horizontal_agg, free_agg):
+        h, w = img.shape[:2]
+        for x_min, x_max, y_min, y_max in boxes:
+            x_min, x_max = max(0, x_min), min(w, x_max)
+            y_min, y_max = max(0, y_min), min(h, y_max)
+            if x_max > x_min and y_max > y_min:
+                horizontal_list.append([x_min, x_max, y_min + offset, y_max + offset])
+        free_list.extend([[min(max(x, 0), w - 1), min(max(y, 0), h - 1) + offset] for x, y in poly]
+                         for poly in polys)
+
+    results = [[] for _ in images]
+    if horizontal_list or free_list:
+        recognized = reader.recognize(canvas, horizontal_list, free_list, detail=1,
+                                      paragraph=False, batch_size=OCR_RECOGNIZER_BATCH, reformat=False)
+        for box, text, confidence in recognized:
+            top = min(point[1] for point in box)
+            index = max(0, bisect_right(offsets, top) - 1)
+            offset = offsets[index]
+            box = [[x, y - offset] for x, y in box]
+            results[index].append((box, text, confidence))
+
+    if detail == 0:
+        return [[text for _, text, _ in lines] for lines in results]
+    return results
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class _Job:
+    __slots__ = ('image', 'detail', 'future', 'enqueued')
+
+    def __init__(self, image, detail):
+        self.image = image
+        self.detail = detail
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class OCRBatcher:
+    """Collects images for a short window and runs them as one OCR batch.
+
+    ``submit_batch(images)`` must return a Future resolving to one
+    ``detail=1`` result list per image; it can dispatch to the OCR process
+    pool or to a local reader. With ``window_ms`` of 0 every image is
+    dispatched as soon as it arrives.
+    """
+
+    def __init__(self, submit_batch, window_ms=OCR_BATCH_WINDOW_MS, max_batch=OCR_MAX_BATCH,
+                 name='ocr-batch'):
+        self.submit_batch = submit_batch
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.name = name
+        self._queue = queue.Queue()
+        self._latencies = []
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, image, detail=0):
+        """Queues an image and returns a Future for its OCR lines."""
+        job = _Job(image, detail)
+        self._queue.put(job)
+        return job.future
+
+    def readtext(self, image, detail=0, timeout=None):
+        """Blocking convenience wrapper around ``submit``."""
+        return self.submit(image, detail).result(timeout=timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        """Returns batch count and p50/p99 latency over recent requests."""
+        with self._stats_lock:
+            latencies = list(self._latencies)
+            batches = self._batches
+        if not latencies:
+            return {'batches': batches, 'p50_ms': None, 'p99_ms': None}
+        return {
+            'batches': batches,
+            'p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+            'p99_ms': round(_percentile(latencies, 99) * 1000, 1),
+        }
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = batch[0].enqueued + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            try:
+                future = self.submit_batch([job.image for job in batch])
+            except Exception as e:
+                for job in batch:
+                    job.future.set_exception(e)
+                continue
+            future.add_done_callback(lambda f, batch=batch, started=started: self._fan_out(f, batch, started))
+
+    def _fan_out(self, future, batch, started):
+        finished = time.perf_counter()
+        try:
+            results = future.result()
+        except Exception as e:
+            for job in batch:
+                job.future.set_exception(e)
+            return
+        for job, lines in zip(batch, results):
+            if job.detail == 0:
+                lines = [text for _, text, _ in lines]
+            job.future.set_result(lines)
+
+        latencies = [finished - job.enqueued for job in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._latencies = (self._latencies + latencies)[-1000:]
+        print(f"[{self.name}] size={len(batch)} run={(finished - started) * 1000:.0f}ms "
+              f"p50={_percentile(latencies, 50) * 1000:.0f}ms p99={_percentile(latencies, 99) * 1000:.0f}ms")
+
+
+def local_batcher(get_reader, window_ms=OCR_BATCH_WINDOW_MS, max_batch=OCR_MAX_BATCH, name='ocr-batch'):
+    """Builds a batcher that runs batches on an in-process reader, one at a time."""
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+    return OCRBatcher(lambda images: executor.submit(lambda: readtext_batch(get_reader(), images, detail=1)),
+                      window_ms=window_ms, max_batch=max_batch, name=name)
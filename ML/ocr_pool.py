@@ -0,0 +1,279 @@
+"""Process pool of preloaded OCR readers shared by the Flask handlers.
+
+Every worker process builds its own reader once (EasyOCR or its ONNX Runtime
+port, see ocr_backends.py), so concurrent requests no longer serialize on a
+single module-level reader. The pool only admits ``workers + queue_size``
+jobs at a time; anything beyond that is refused straight away so the caller
+can answer 503 instead of piling up.
+
+With OCR_PRELOAD=1 (the default) ``OCRPool.start`` loads and warms the model
+once in the parent and then forks the workers, which share the weights
+copy-on-write instead of each loading them again. OCR_PRELOAD=0 switches to
+spawned workers that load their own reader, for platforms without fork or
+torch builds that misbehave after it.
+
+A worker that dies (OOM kill, crash in native OCR code) breaks the whole
+executor. The job it was running fails with ``WorkerLost``, which callers
+answer with 503 like ``PoolSaturated``, and a fresh set of workers is started
+in its place; with preloading they are forked from the parent again and
+inherit its warmed reader.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import id_roi
+from ocr_backends import create_reader
+from ocr_batcher import OCRBatcher, OCR_BATCH_WINDOW_MS, readtext_batch
+from warmup import Readiness, warm_up
+
+# Pool configuration (overridable through environment variables)
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', 2))
+OCR_QUEUE_SIZE = int(os.environ.get('OCR_QUEUE_SIZE', 4))
+OCR_TIMEOUT = float(os.environ.get('OCR_TIMEOUT', 30))
+OCR_RETRY_AFTER = int(os.environ.get('OCR_RETRY_AFTER', 5))
+OCR_PRELOAD = os.environ.get('OCR_PRELOAD', '1') == '1'
+# Intra-op threads per worker (torch or ONNX Runtime); the pool already provides the parallelism
+OCR_TORCH_THREADS = int(os.environ.get('OCR_TORCH_THREADS', 1))
+
+
+class PoolSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+    def __init__(self, message='OCR workers are busy, please retry shortly', retry_after=OCR_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class WorkerLost(PoolSaturated):
+    """Raised when the worker running a job died; the pool has started new workers."""
+
+    def __init__(self, retry_after=OCR_RETRY_AFTER):
+        super().__init__('An OCR worker stopped unexpectedly, please retry shortly', retry_after)
+
+
+class OCRTimeout(Exception):
+    """Raised when an OCR job does not finish within the request timeout."""
+
+
+# --- Worker side ---
+
+_worker_reader = None
+
+
+def _build_reader():
+    return create_reader(threads=OCR_TORCH_THREADS)
+
+
+def _init_worker():
+    """Prepares a worker; the reader is inherited when the parent preloaded it."""
+    global _worker_reader
+    try:
+        import torch
+        torch.set_num_threads(OCR_TORCH_THREADS)
+    except ImportError:
+        pass
+    if _worker_reader is None:
+        _worker_reader = _build_reader()
+        warm_up(_worker_reader)
+
+
+def _ping():
+    return os.getpid()
+
+
+def worker_reader():
+    """Returns the reader owned by the current worker process."""
+    if _worker_reader is None:
+        _init_worker()
+    return _worker_reader
+
+
+def _readtext(image_np, kwargs):
+    """Runs ``readtext`` inside a worker process."""
+    return worker_reader().readtext(image_np, **kwargs)
+
+
+def _readtext_batch(images):
+    """Runs one micro-batch inside a worker process."""
+    return readtext_batch(worker_reader(), images, detail=1)
+
+
+def _read_id_numbers(image_np, detail):
+    """Runs the ID-number fast path inside a worker process."""
+    return id_roi.read_id_numbers(worker_reader(), image_np, detail=detail)
+
+
+# --- Parent side ---
+
+class OCRPool:
+    """Bounded pool of OCR worker processes."""
+
+    def __init__(self, workers=OCR_WORKERS, queue_size=OCR_QUEUE_SIZE, timeout=OCR_TIMEOUT,
+                 preload=OCR_PRELOAD):
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_size)
+        self.timeout = timeout
+        self.preload = preload
+        self.readiness = Readiness('ocr-pool')
+        self._executor = self._new_executor()
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._restarts = 0
+
+    def _new_executor(self):
+        mp_context = multiprocessing.get_context('fork' if self.preload else 'spawn')
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=mp_context, initializer=_init_worker)
+
+    def _replace_broken(self, broken):
+        """Puts a fresh executor in place of ``broken``, once however many jobs saw it break.
+
+        The broken executor has already killed and reaped its workers; the new
+        ones are started (forked from this, preloaded, process) on its first job.
+        """
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = self._new_executor()
+            self._restarts += 1
+        print(f"OCR pool: a worker died, starting {self.workers} new worker(s)")
+
+    def start(self):
+        """Loads and warms the model, then brings every worker up.
+
+        Call this from the main thread before serving. With preloading the
+        workers are forked only after the warm-up, so they inherit a model
+        that is already paged in and allocated.
+        """
+        global _worker_reader
+        try:
+            warmup_seconds = None
+            if self.preload and _worker_reader is None:
+                _worker_reader = _build_reader()
+                warmup_seconds = warm_up(_worker_reader)
+            pids = {future.result() for future in
+                    [self._executor.submit(_ping) for _ in range(self.workers)]}
+            print(f"OCR pool started {len(pids)} worker(s) ({'preloaded fork' if self.preload else 'spawn'})")
+            self.readiness.mark_ready(warmup_seconds)
+        except Exception as e:
+            self.readiness.mark_failed(e)
+            raise
+
+    def submit(self, fn, *args):
+        """Queues ``fn(*args)`` on a worker, or raises PoolSaturated when full.
+
+        ``fn`` must be a module-level function so it can be pickled; it can
+        reach the worker's reader through ``worker_reader()``.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise PoolSaturated()
+        with self._lock:
+            self._in_flight += 1
+            executor = self._executor
+        try:
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # Broke after its last job; this one has not run yet, so a fresh pool takes it
+                self._replace_broken(executor)
+                executor = self._executor
+                future = executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        # The slot is only freed once the worker is really done, even if the
+        # caller already gave up waiting on it.
+        future.add_done_callback(lambda done: self._finished(done, executor))
+        return future
+
+    def run(self, fn, *args, timeout=None):
+        """Runs ``fn(*args)`` on a worker and waits for the result."""
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise OCRTimeout(f'OCR did not finish within {timeout or self.timeout:g}s')
+        except BrokenProcessPool:
+            raise WorkerLost()
+
+    def readtext(self, image_np, timeout=None, **kwargs):
+        """Drop-in replacement for ``reader.readtext`` backed by the pool."""
+        return self.run(_readtext, image_np, kwargs, timeout=timeout)
+
+    def stats(self):
+        """Returns a snapshot of pool occupancy."""
+        with self._lock:
+            in_flight = self._in_flight
+        return {
+            'ready': self.readiness.ready,
+            'workers': self.workers,
+            'capacity': self.capacity,
+            'in_flight': in_flight,
+            'queued': max(0, in_flight - self.workers),
+            'restarts': self._restarts,
+        }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor = self._executor
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _finished(self, future, executor):
+        self._release()
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._replace_broken(executor)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+
+_pool = None
+_batcher = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the process-wide OCR pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OCRPool()
+    return _pool
+
+
+def get_batcher():
+    """Returns the micro-batcher that feeds batches into the OCR pool."""
+    global _batcher
+    if _batcher is None:
+        with _pool_lock:
+            if _batcher is None:
+                _batcher = OCRBatcher(lambda images: get_pool().submit(_readtext_batch, images))
+    return _batcher
+
+
+def readtext(image_np, detail=0, timeout=None):
+    """Recognizes text on the pool, micro-batched with concurrent requests.
+
+    Set OCR_BATCH_WINDOW_MS=0 to send every image to a worker on its own.
+    """
+    timeout = timeout or get_pool().timeout
+    if OCR_BATCH_WINDOW_MS <= 0:
+        return get_pool().readtext(image_np, timeout=timeout, detail=detail, paragraph=False)
+    try:
+        return get_batcher().readtext(image_np, detail=detail, timeout=timeout)
+    except FutureTimeoutError:
+        raise OCRTimeout(f'OCR did not finish within {timeout:g}s')
+    except BrokenProcessPool:
+        raise WorkerLost()
+
+
+def read_id_numbers(image_np, timeout=None, detail=0):
+    """Reads the Aadhaar / PAN number of a card on a worker (see id_roi.py)."""
+    return get_pool().run(_read_id_numbers, image_np, detail, timeout=timeout)
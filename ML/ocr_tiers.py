@@ -0,0 +1,128 @@
+"""Confidence-driven OCR passes for ID numbers.
+
+One ``readtext`` per upload either wasted time (a clear card read at full
+resolution) or gave up too early (a dark or upside-down one). ``read_id_tiered``
+runs cheap passes first and stops as soon as one yields a valid number -
+a PAN of the right shape or an Aadhaar number whose Verhoeff check digit
+holds - recognized with at least OCR_ACCEPT_CONFIDENCE:
+
+* ``fast`` - the card scaled down to OCR_FAST_DIMENSION;
+* ``full`` - the card as preprocessed (skipped when ``fast`` already was);
+* ``alternate`` - another preprocessing profile (adaptive threshold, or
+  sharpen + Otsu when adaptive was the one applied);
+* ``rotated`` - the card turned 180 degrees; off by default, since
+  preprocessing already turns cards upright before any OCR (orientation.py).
+
+The last two only run when the text itself read poorly; a card whose text
+reads well but holds no valid number will not get better by re-reading it.
+When no pass is accepted the best one is used. OCR_ID_TIERS lists the passes
+to try (``full`` alone restores the single pass); the pass that answered is
+counted on /metrics as ``ocr_id_tier_total``.
+"""
+import os
+import re
+
+import cv2
+import numpy as np
+
+import metrics
+import preprocessing
+from id_validation import is_valid_number, rank_numbers
+
+# Tier configuration (overridable through environment variables)
+OCR_ID_TIERS = [tier.strip() for tier in os.environ.get('OCR_ID_TIERS', 'fast,full,alternate').split(',')
+                if tier.strip()]
+OCR_FAST_DIMENSION = int(os.environ.get('OCR_FAST_DIMENSION', 800))
+OCR_ACCEPT_CONFIDENCE = float(os.environ.get('OCR_ACCEPT_CONFIDENCE', 0.5))
+
+TIERS = ('fast', 'full', 'alternate', 'rotated')
+for _tier in OCR_ID_TIERS:
+    if _tier not in TIERS:
+        raise ValueError(f"Unknown tier {_tier!r} in OCR_ID_TIERS; expected some of {', '.join(TIERS)}")
+
+TIER_ANSWERED = metrics.Counter('ocr_id_tier', 'OCR pass that produced the ID answer.', ['tier'])
+PASSES = metrics.Histogram('ocr_id_passes', 'OCR passes run per ID card.', buckets=(1, 2, 3, 4))
+
+
+class TieredResult:
+    """Outcome of ``read_id_tiered``."""
+
+    def __init__(self, numbers, texts, confidences, tier, passes):
+        self.numbers = numbers          # cleaned numbers, best first
+        self.texts = texts              # recognized lines of the pass used
+        self.confidences = confidences  # {number: recognizer confidence}
+        self.tier = tier
+        self.passes = passes
+
+
+def alternate_profile(source, profile=None):
+    """A preprocessing profile other than ``profile``, by default the one ``auto`` picks for ``source``."""
+    if profile is None:
+        profile = preprocessing.choose_profile(preprocessing.analyze_quality(source))
+    return 'sharpen' if profile == 'adaptive' else 'adaptive'
+
+
+def _tier_image(tier, processed, source, profile):
+    if tier == 'fast':
+        h, w = processed.shape[:2]
+        if max(h, w) <= OCR_FAST_DIMENSION:
+            return processed
+        scale = OCR_FAST_DIMENSION / max(h, w)
+        return cv2.resize(processed, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    if tier == 'full':
+        return processed
+    if tier == 'alternate':
+        return preprocessing.apply_profile(source, alternate_profile(source, profile))
+    return cv2.rotate(processed, cv2.ROTATE_180)
+
+
+def _assess(numbers, results):
+    """Ranks one pass: (valid numbers found, best valid confidence, mean text confidence)."""
+    confidences = {}
+    for number, confidence in numbers:
+        number = re.sub(r'\s+', '', number)
+        confidences[number] = max(confidences.get(number, 0.0), confidence)
+    valid = [confidence for number, confidence in confidences.items() if is_valid_number(number)]
+    text_confidence = float(np.mean([confidence for _, _, confidence in results])) if results else 0.0
+    return confidences, (bool(valid), max(valid, default=0.0), text_confidence)
+
+
+def read_id_tiered(read, processed, source, tiers=OCR_ID_TIERS, accept=OCR_ACCEPT_CONFIDENCE, profile=None):
+    """Reads an ID card in as few OCR passes as its quality allows.
+
+    ``read(image)`` runs one pass and returns ``(scored numbers, results)``
+    as ``id_roi.read_id_numbers(..., detail=1)`` does. ``processed`` is the
+    preprocessed card and ``source`` the image the alternate profile is
+    made from: the RGB frame, though a grayscale one works as well (it
+    only lacks the colour cue of ``preprocessing.analyze_quality``).
+    ``profile`` is the one ``processed`` was prepared with
+    (``preprocessing.Analysis.profile``); without it the card is measured
+    again to tell.
+    """
+    # The alternate profile is written into the thread's preprocessing buffers
+    processed = np.array(processed)
+    best, best_rank, passes, read_full = None, None, 0, False
+    for tier in tiers or ['full']:
+        if tier == 'full' and read_full:
+            continue
+        if tier in ('alternate', 'rotated') and best_rank is not None and best_rank[2] >= accept:
+            # The text read fine; there is no better number to find
+            break
+        image = _tier_image(tier, processed, source, profile)
+        read_full = read_full or image is processed
+        numbers, results = read(image)
+        passes += 1
+        with metrics.stage('regex'):
+            confidences, rank = _assess(numbers, results)
+        if best_rank is None or rank > best_rank:
+            best, best_rank = (tier, confidences, results), rank
+        if rank[0] and rank[1] >= accept:
+            break
+
+    tier, confidences, results = best
+    # Valid numbers first, then by confidence, so [0] is the likeliest primary number
+    with metrics.stage('regex'):
+        numbers = rank_numbers(confidences, confidences)
+    TIER_ANSWERED.labels(tier).inc()
+    PASSES.observe(passes)
+    return TieredResult(numbers, [text for _, text, _ in results], confidences, tier, passes)
@@ -0,0 +1,385 @@
+"""Shared image preprocessing for the OCR apps.
+
+Replaces the ``preprocess_and_rotate`` copies that used to live in app.py,
+newLogic.py, AI_Agent.py and scan_Bussinesscard.py. Large frames are scaled
+down before they are converted to numpy or filtered, and every intermediate
+image is written into a per-thread buffer that is reused across calls instead
+of being allocated afresh. The reuse only spares the allocator: against
+one-off arrays it makes no measurable difference to latency
+(benchmarks/bench_preprocessing.py). The peak memory and time saved on
+large uploads come from the early downscale.
+
+The arrays returned by ``preprocess_and_rotate`` may be such buffers: they stay
+valid until the next call on the same thread, so callers that keep them
+around longer must ``.copy()`` them.
+
+Photos of a card lying on a desk are first cropped to the card: the largest
+convex quadrilateral of plausible card proportions is found on a small copy of
+the frame and warped flat (``crop_to_card``), so the OCR neither scans the
+background nor reads skewed text. Frames without such a quad are used whole.
+The small copy is made once per image (``orientation.shrink``, cheap at any
+scale factor) and warped along with the card, so the later analysis stages
+work on it rather than on the full-resolution card.
+
+The OCR input is then prepared by one of these profiles (PREPROCESS_PROFILE):
+
+* ``sharpen`` (default) - 3x3 sharpen + Otsu, the original pipeline;
+* ``adaptive`` - local threshold, for uneven lighting (shadows, glare);
+* ``clahe`` - local contrast equalization, for faded or washed-out cards;
+* ``gray`` - grayscale only, for clean cards on coloured stock;
+* ``none`` - the RGB frame itself, not a copy, for clean cards.
+
+``auto`` picks one per image from a quick look at a small copy of the card
+(``analyze_quality``). That look costs more than the filters it can skip:
+2 to 3 ms per card more than always sharpening
+(benchmarks/bench_profiles.py --no-ocr), and whether the profile it picks
+reads better is only shown by that benchmark run with OCR. So it is opt-in;
+without it the card is measured only when ocr_tiers.py needs an alternate
+profile and was not told the one applied. The profile is counted on /metrics
+(``ocr_preprocess_profile_total``) and handed to later stages, with the
+measurements, as an ``Analysis`` (``with_analysis``).
+
+Before that the card is turned upright: 0, 90, 180 or 270 degrees, decided
+from the direction and shape of its text lines (orientation.py), counted as
+``ocr_orientation_total``.
+"""
+import os
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+import metrics
+import orientation
+
+# Longest edge fed to the filters; 0 keeps the original resolution
+PREPROCESS_MAX_DIMENSION = int(os.environ.get('PREPROCESS_MAX_DIMENSION', 1600))
+# Frames above this many pixels use one-off arrays rather than pinning big buffers
+PREPROCESS_BUFFER_MAX_PIXELS = int(os.environ.get('PREPROCESS_BUFFER_MAX_PIXELS', 4_000_000))
+# Crop and flatten the card out of background-heavy or tilted photos
+PREPROCESS_CARD_CROP = os.environ.get('PREPROCESS_CARD_CROP', '1') == '1'
+
+# The small copy of the frame that analysis stages share (longest edge)
+ANALYSIS_DIMENSION = orientation.ORIENTATION_DIMENSION
+# Card detection runs on a copy this size (longest edge)
+CARD_DETECT_DIMENSION = 480
+# A quad is taken for the card when it covers this share of the frame...
+MIN_CARD_AREA, MAX_CARD_AREA = 0.06, 0.92
+# ...and its long/short side ratio is in this range (ID-1 cards are 1.59, business cards ~1.75)
+MIN_CARD_ASPECT, MAX_CARD_ASPECT = 1.2, 2.2
+
+# One of PROFILES to always use it, or auto to pick one per image
+PREPROCESS_PROFILE = os.environ.get('PREPROCESS_PROFILE', 'sharpen')
+
+PROFILES = ('none', 'gray', 'clahe', 'adaptive', 'sharpen')
+if PREPROCESS_PROFILE != 'auto' and PREPROCESS_PROFILE not in PROFILES:
+    raise ValueError(f"Unknown PREPROCESS_PROFILE {PREPROCESS_PROFILE!r}; expected auto or one of {', '.join(PROFILES)}")
+
+# Quality analysis runs on a copy this size (longest edge)
+QUALITY_DIMENSION = 480
+# Background brightness spread (share of its brightest level) above which lighting is uneven
+UNEVEN_ILLUMINATION = 0.2
+# Gap between paper (median) and ink (darkest 1%) below which the card is faded
+LOW_CONTRAST = 100
+# Laplacian variance below which the text is soft (on the small copy, orientation.shrink)
+BLUR_SHARPNESS = 550
+# Mean HSV saturation (0-255) above which the card stock is coloured
+COLOURED_STOCK = 40
+
+PROFILE_CHOSEN = metrics.Counter('ocr_preprocess_profile', 'Preprocessing profile applied to OCR input.', ['profile'])
+ORIENTATION_CHOSEN = metrics.Counter('ocr_orientation', 'Clockwise rotation applied to turn cards upright.',
+                                     ['rotation', 'method'])
+
+SHARPEN_KERNEL = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]], dtype=np.float32)
+
+_local = threading.local()
+
+
+def _buffer(name, shape):
+    """Returns a reusable uint8 buffer of the given shape for this thread."""
+    if shape[0] * shape[1] > PREPROCESS_BUFFER_MAX_PIXELS:
+        return np.empty(shape, dtype=np.uint8)
+    buffers = getattr(_local, 'buffers', None)
+    if buffers is None:
+        buffers = _local.buffers = {}
+    buf = buffers.get(name)
+    if buf is None or buf.shape != shape:
+        buf = buffers[name] = np.empty(shape, dtype=np.uint8)
+    return buf
+
+
+def to_rgb_array(image):
+    """Views a PIL image as an RGB array, converting only when the mode differs."""
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return np.asarray(image)
+
+
+def downscale(image, max_dimension):
+    """Shrinks a PIL image so its longest edge is at most ``max_dimension``.
+
+    Done on the PIL side with box (area) filtering, before the frame is ever
+    copied into numpy, so the full-resolution array is never materialized.
+    """
+    w, h = image.size
+    if not max_dimension or max(h, w) <= max_dimension:
+        return image
+    scale = max_dimension / max(h, w)
+    return image.resize((int(w * scale), int(h * scale)), Image.BOX)
+
+
+def load_image(stream, max_dimension=PREPROCESS_MAX_DIMENSION):
+    """Decodes an uploaded image at (about) the target resolution.
+
+    JPEGs are put in draft mode so libjpeg decodes straight at 1/2, 1/4 or
+    1/8 scale, whichever still covers the target; EXIF orientation is then
+    applied and the remaining gap closed with a box downscale.
+    """
+    image = Image.open(stream)
+    if max_dimension and image.format == 'JPEG':
+        w, h = image.size
+        scale = max_dimension / max(w, h)
+        if scale < 1:
+            image.draft('RGB', (int(np.ceil(w * scale)), int(np.ceil(h * scale))))
+    image = ImageOps.exif_transpose(image)
+    return downscale(image, max_dimension)
+
+
+def rotate(img, angle):
+    """Turns ``img`` ``angle`` degrees clockwise (0, 90, 180 or 270) into the rotated buffer."""
+    if not angle:
+        return img
+    h, w = img.shape[:2]
+    shape = ((h, w) if angle == 180 else (w, h)) + img.shape[2:]
+    return cv2.rotate(img, orientation.ROTATIONS[angle], dst=_buffer('rotated', shape))
+
+
+def orient(img, small=None):
+    """Turns a card upright; returns ``(img, orientation.Orientation)``.
+
+    ``small`` is the card's downscaled copy, which the decision is made on.
+    """
+    turn = orientation.detect_orientation(img, small=small)
+    ORIENTATION_CHOSEN.labels(str(turn.angle), turn.method).inc()
+    return rotate(img, turn.angle), turn
+
+
+def to_gray(img):
+    """Grayscale conversion into the thread's gray buffer."""
+    if img.ndim == 2:
+        return img
+    out = _buffer('gray', img.shape[:2])
+    # BGR weights on RGB data, as the original per-app copies did
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=out)
+
+
+def sharpen_and_threshold(gray):
+    """3x3 sharpen followed by Otsu binarization, both into one buffer."""
+    out = _buffer('binary', gray.shape)
+    cv2.filter2D(gray, -1, SHARPEN_KERNEL, dst=out)
+    cv2.threshold(out, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=out)
+    return out
+
+
+def _clahe():
+    clahe = getattr(_local, 'clahe', None)
+    if clahe is None:
+        clahe = _local.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    return clahe
+
+
+def equalize(gray):
+    """CLAHE into the thread's binary buffer."""
+    out = _buffer('binary', gray.shape)
+    return _clahe().apply(gray, dst=out)
+
+
+def adaptive_threshold(gray):
+    """Local mean threshold with a window of about one text line."""
+    out = _buffer('binary', gray.shape)
+    block = max(11, max(gray.shape) // 40 | 1)
+    # Box mean rather than Gaussian weights: about 4x faster, as good on printed text
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, block, 15, dst=out)
+
+
+def _percentiles(gray, shares):
+    """Grey levels below which the given shares of the pixels fall, from the histogram."""
+    cumulative = np.cumsum(cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel())
+    return np.searchsorted(cumulative, np.asarray(shares) * cumulative[-1])
+
+
+class Analysis:
+    """What preprocessing measured on an image, for the stages that come after it."""
+
+    def __init__(self, small, turn, quality, profile):
+        self.small = small      # the card at ANALYSIS_DIMENSION (before turning it upright), if made
+        self.turn = turn        # orientation.Orientation
+        self.quality = quality  # analyze_quality() of the card, None when the profile was pinned
+        self.profile = profile  # profile the OCR input was prepared with
+
+
+def analyze_quality(img):
+    """Sharpness, contrast, illumination and saturation of an RGB (or grayscale) frame.
+
+    Pass the small copy of the card preprocessing already made; a bigger
+    frame works too, it is only sampled down. A grayscale frame has no
+    saturation (0).
+    """
+    h, w = img.shape[:2]
+    # Measured at one fixed size, so sharpness compares across upload resolutions;
+    # point sampling the (area-averaged) small copy is fast and fine for statistics
+    scale = QUALITY_DIMENSION / max(h, w)
+    small = cv2.resize(img, (max(8, int(w * scale)), max(8, int(h * scale))), interpolation=cv2.INTER_NEAREST)
+    gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY) if small.ndim == 3 else small
+    ink, paper = _percentiles(gray, (0.01, 0.5))
+    _, deviation = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))
+
+    # An 8x smaller thumbnail has the colour and, once dilated to wipe out the
+    # (dark) text, the lighting
+    thumb = cv2.resize(small, (small.shape[1] // 8, small.shape[0] // 8), interpolation=cv2.INTER_AREA)
+    background = cv2.dilate(cv2.cvtColor(thumb, cv2.COLOR_RGB2GRAY) if thumb.ndim == 3 else thumb,
+                            np.ones((7, 7), np.uint8))
+    dim, bright = _percentiles(background, (0.05, 0.95))
+    return {
+        'sharpness': float(deviation[0, 0]) ** 2,
+        'contrast': float(paper - ink),
+        'illumination': float(bright - dim) / max(float(bright), 1),
+        'saturation': cv2.mean(cv2.cvtColor(thumb, cv2.COLOR_RGB2HSV))[1] if thumb.ndim == 3 else 0.0,
+    }
+
+
+def choose_profile(quality):
+    """The profile ``auto`` applies to a frame of this quality."""
+    if quality['illumination'] > UNEVEN_ILLUMINATION:
+        return 'adaptive'
+    if quality['contrast'] < LOW_CONTRAST:
+        return 'clahe'
+    if quality['sharpness'] < BLUR_SHARPNESS:
+        return 'sharpen'
+    if quality['saturation'] > COLOURED_STOCK:
+        return 'gray'
+    return 'none'
+
+
+def apply_profile(img, profile):
+    """Prepares the OCR input from an RGB (or grayscale) frame with the named profile.
+
+    ``none`` returns ``img`` itself, not a copy: the OCR input and the frame
+    are then one array (possibly a preprocessing buffer), so a caller that
+    edits either in place, to draw on it or rotate it, must copy it first.
+    The other profiles return a grayscale image in the thread's buffers.
+    """
+    if profile == 'none':
+        return img
+    gray = to_gray(img)
+    if profile == 'gray':
+        return gray
+    if profile == 'clahe':
+        return equalize(gray)
+    if profile == 'adaptive':
+        return adaptive_threshold(gray)
+    return sharpen_and_threshold(gray)
+
+
+def _order_corners(quad):
+    """Orders four points clockwise, starting from the top-left one."""
+    center = quad.mean(axis=0)
+    quad = quad[np.argsort(np.arctan2(quad[:, 1] - center[1], quad[:, 0] - center[0]))]
+    return np.roll(quad, -int(np.argmin(quad.sum(axis=1))), axis=0).astype(np.float32)
+
+
+def _scale_between(img, small):
+    """Per-axis factors (x, y) that take coordinates on ``small`` to ``img``."""
+    return np.array([img.shape[1] / small.shape[1], img.shape[0] / small.shape[0]], dtype=np.float32)
+
+
+def find_card_quad(img, small=None):
+    """Corners of the card in an RGB frame (tl, tr, br, bl), or None if there is no clear card.
+
+    ``small`` is a downscaled copy of ``img`` to detect on, if one was made already.
+    """
+    small = orientation.shrink(img if small is None else small, CARD_DETECT_DIMENSION)
+    gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_RGB2GRAY), (5, 5), 0)
+    # Edge thresholds around the median brightness adapt to the exposure
+    median = float(np.median(gray))
+    edges = cv2.Canny(gray, int(max(0, 0.66 * median)), int(min(255, 1.33 * median)))
+    edges = cv2.dilate(edges, None, iterations=1)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    frame_area = small.shape[0] * small.shape[1]
+    for contour in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+        area = cv2.contourArea(contour)
+        if area < MIN_CARD_AREA * frame_area:
+            break
+        quad = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        if len(quad) != 4 or not cv2.isContourConvex(quad):
+            # Rounded corners or a glare notch: accept the minimum-area box if it fits snugly
+            rect = cv2.minAreaRect(contour)
+            if rect[1][0] * rect[1][1] == 0 or area / (rect[1][0] * rect[1][1]) < 0.85:
+                continue
+            quad = cv2.boxPoints(rect)
+        quad = _order_corners(np.asarray(quad, dtype=np.float32).reshape(4, 2))
+        if cv2.contourArea(quad) > MAX_CARD_AREA * frame_area:
+            # The card already fills the frame
+            return None
+        # Mean of opposite sides: top/bottom and right/left
+        sides = np.linalg.norm(quad - np.roll(quad, -1, axis=0), axis=1)
+        across, down = (sides[0] + sides[2]) / 2, (sides[1] + sides[3]) / 2
+        if min(across, down) > 0 and MIN_CARD_ASPECT <= max(across, down) / min(across, down) <= MAX_CARD_ASPECT:
+            return quad * _scale_between(img, small)
+    return None
+
+
+def warp_card(img, quad):
+    """Warps the quad ``(tl, tr, br, bl)`` of a frame into an upright rectangle."""
+    tl, tr, br, bl = quad
+    width = int(round(max(np.linalg.norm(tr - tl), np.linalg.norm(br - bl))))
+    height = int(round(max(np.linalg.norm(bl - tl), np.linalg.norm(br - tr))))
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(quad.astype(np.float32), target)
+    return cv2.warpPerspective(img, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                               borderMode=cv2.BORDER_REPLICATE)
+
+
+def crop_to_card(img, small=None):
+    """The card cut out of the frame and flattened, or the frame itself when none is found.
+
+    With ``small`` (a downscaled copy of ``img``) returns ``(card, small card)``,
+    the small copy warped the same way.
+    """
+    quad = find_card_quad(img, small)
+    if quad is not None:
+        card = warp_card(img, quad)
+        if small is None:
+            return card
+        return card, warp_card(small, quad / _scale_between(img, small))
+    return img if small is None else (img, small)
+
+
+def preprocess_and_rotate(image, max_dimension=PREPROCESS_MAX_DIMENSION, profile=PREPROCESS_PROFILE,
+                          with_analysis=False):
+    """Preprocesses a PIL image for OCR, including rotation.
+
+    Returns ``(processed, img)``: the OCR input prepared by ``profile`` (picked
+    per image when ``auto``) and the upright RGB frame; ``with_analysis``
+    appends the ``Analysis`` (orientation decision, quality, profile). With
+    the ``none`` profile ``processed`` is ``img``, the same array, so a
+    caller that modifies one in place must copy it first.
+    """
+    img = to_rgb_array(downscale(image, max_dimension))
+    small = None
+    if PREPROCESS_CARD_CROP or profile == 'auto' or orientation.PREPROCESS_ORIENTATION == 'text':
+        small = orientation.shrink(img, ANALYSIS_DIMENSION)
+    if PREPROCESS_CARD_CROP:
+        img, small = crop_to_card(img, small)
+    img, turn = orient(img, small)
+    quality = None
+    if profile == 'auto':
+        # Rotation does not change the statistics, so the small copy needs no turning
+        quality = analyze_quality(small)
+        profile = choose_profile(quality)
+    PROFILE_CHOSEN.labels(profile).inc()
+    if with_analysis:
+        return apply_profile(img, profile), img, Analysis(small, turn, quality, profile)
+    return apply_profile(img, profile), img
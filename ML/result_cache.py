@@ -0,0 +1,226 @@
+"""In-memory cache of OCR results keyed by the preprocessed image.
+
+Kiosk retries and returning visitors re-upload the same card, so results are
+cached under a SHA-256 of the preprocessed pixels, and only an exact match
+is a hit. Entries are evicted LRU-first, expire after a TTL and are bounded
+by a total byte budget.
+
+Near-hits on a 256-bit difference hash are opt-in (OCR_CACHE_NEAR_DISTANCE
+> 0): cards printed from one template differ in only a few bits of that hash
+(two business cards of different people: 3 bits; two Aadhaar cards that
+differ only in the number: 6), so a near-hit can be another person's card.
+They never return ID entries.
+
+Results that carry Aadhaar/PAN numbers are only stored when
+OCR_CACHE_STORE_IDS=1, and then only Fernet-encrypted (needs the optional
+``cryptography`` package).
+
+``SingleFlight`` complements the cache for slow upstream calls: concurrent
+misses for the same key share the one call already in flight instead of each
+starting their own.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# Cache configuration (overridable through environment variables)
+OCR_CACHE_ENTRIES = int(os.environ.get('OCR_CACHE_ENTRIES', 256))
+OCR_CACHE_TTL = float(os.environ.get('OCR_CACHE_TTL', 3600))
+OCR_CACHE_MAX_MB = float(os.environ.get('OCR_CACHE_MAX_MB', 16))
+# Hamming distance for perceptual near-hits; 0 (the default) serves exact matches only
+OCR_CACHE_NEAR_DISTANCE = int(os.environ.get('OCR_CACHE_NEAR_DISTANCE', 0))
+OCR_CACHE_STORE_IDS = os.environ.get('OCR_CACHE_STORE_IDS', '0') == '1'
+OCR_CACHE_KEY = os.environ.get('OCR_CACHE_KEY')
+
+
+def image_digest(image_np, namespace=''):
+    """Exact content hash of a decoded image, scoped to a namespace."""
+    digest = hashlib.sha256(namespace.encode('utf-8'))
+    digest.update(str(image_np.shape).encode('ascii'))
+    digest.update(np.ascontiguousarray(image_np).data)
+    return digest.hexdigest()
+
+
+def perceptual_hash(image_np):
+    """256-bit difference hash; visually similar images differ in few bits."""
+    gray = image_np if image_np.ndim == 2 else cv2.cvtColor(image_np, cv2.COLOR_RGB2GRAY)
+    small = cv2.resize(gray, (17, 16), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def _build_cipher(key):
+    try:
+        from cryptography.fernet import Fernet
+    except ImportError:
+        print("cryptography is not installed; ID results will not be cached")
+        return None
+    # Without a configured key the cipher only lives as long as the process
+    return Fernet(key or Fernet.generate_key())
+
+
+class _Entry:
+    __slots__ = ('payload', 'encrypted', 'phash', 'namespace', 'expires')
+
+    def __init__(self, payload, encrypted, phash, namespace, expires):
+        self.payload = payload
+        self.encrypted = encrypted
+        self.phash = phash
+        self.namespace = namespace
+        self.expires = expires
+
+
+class ResultCache:
+    """LRU + TTL cache of JSON-serialisable results with a memory cap."""
+
+    def __init__(self, max_entries=OCR_CACHE_ENTRIES, ttl=OCR_CACHE_TTL,
+                 max_bytes=int(OCR_CACHE_MAX_MB * 1024 * 1024),
+                 near_distance=OCR_CACHE_NEAR_DISTANCE, store_ids=OCR_CACHE_STORE_IDS,
+                 key=OCR_CACHE_KEY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.near_distance = near_distance
+        self.cipher = _build_cipher(key) if store_ids else None
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def lookup_keys(self, image_np, namespace=''):
+        """Computes the (digest, phash) pair once so get and put can share it.
+
+        The perceptual hash is only computed when near-hits are enabled.
+        """
+        phash = perceptual_hash(image_np) if self.near_distance > 0 else None
+        return image_digest(image_np, namespace), phash
+
+    def get(self, keys, namespace=''):
+        """Returns the cached result for the image keys, or None."""
+        if not self.enabled:
+            return None
+        digest, phash = keys
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(digest)
+            near = False
+            if entry is None and self.near_distance > 0 and phash is not None:
+                digest, entry = self._nearest(phash, namespace)
+                near = entry is not None
+            if entry is not None and entry.expires < now:
+                self._drop(digest)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            if near:
+                self.near_hits += 1
+            else:
+                self.hits += 1
+            payload, encrypted = entry.payload, entry.encrypted
+        if encrypted:
+            payload = self.cipher.decrypt(payload)
+        return json.loads(payload)
+
+    def put(self, keys, result, namespace='', sensitive=False):
+        """Stores a result; sensitive ones only if ID caching was opted into."""
+        if not self.enabled:
+            return
+        if sensitive and self.cipher is None:
+            return
+        payload = json.dumps(result, separators=(',', ':')).encode('utf-8')
+        if sensitive:
+            payload = self.cipher.encrypt(payload)
+        if len(payload) > self.max_bytes:
+            return
+        digest, phash = keys
+        entry = _Entry(payload, sensitive, phash, namespace, time.monotonic() + self.ttl)
+        with self._lock:
+            self._drop(digest)
+            self._entries[digest] = entry
+            self._bytes += len(payload)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def stats(self):
+        """Counters reported on /health."""
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round((self.hits + self.near_hits) / lookups, 3) if lookups else 0.0,
+            }
+
+    def _nearest(self, phash, namespace):
+        best_digest, best_entry, best_distance = None, None, self.near_distance + 1
+        for digest, entry in self._entries.items():
+            # A near-hit may be a different card from the same template: never hand out ID results that way
+            if entry.namespace != namespace or entry.encrypted or entry.phash is None:
+                continue
+            distance = (entry.phash ^ phash).bit_count()
+            if distance < best_distance:
+                best_digest, best_entry, best_distance = digest, entry, distance
+        return best_digest, best_entry
+
+    def _drop(self, digest):
+        entry = self._entries.pop(digest, None)
+        if entry is not None:
+            self._bytes -= len(entry.payload)
+
+
+class SingleFlight:
+    """Shares one in-flight call among concurrent callers with the same key."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.coalesced = 0
+
+    def submit(self, key, start):
+        """Returns the Future already in flight for ``key``, or the one ``start()`` returns.
+
+        ``start`` may return None to decline (nothing is recorded then).
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            future = start()
+            if future is None:
+                return None
+            self._calls[key] = future
+            self.started += 1
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._calls), 'started': self.started, 'coalesced': self.coalesced}
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
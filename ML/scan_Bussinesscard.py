@@ -1,13 +1,11 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from PIL import Image
-import numpy as np
-import io
 import easyocr
 import re
-import cv2
 import os
 from werkzeug.utils import secure_filename
+from preprocessing import preprocess_and_rotate
 
 app = Flask(__name__)
 # CORS configuration for both endpoints
@@ -24,25 +22,6 @@ def allowed_file(filename):
     """Checks if the uploaded file has an allowed extension."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def preprocess_and_rotate(image):
-    """Preprocesses the image for better OCR results, including rotation."""
-    img = np.array(image.convert("RGB"))
-    
-    # Rotate image if it's taller than it is wide
-    h, w, _ = img.shape
-    if h > w:
-        img = cv2.rotate(img, cv2.ROTATE_90_COUNTERCLOCKWISE)
-        
-    # Convert to grayscale and apply sharpening
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    sharpen_kernel = np.array([[-1,-1,-1], [-1,9,-1], [-1,-1,-1]])
-    sharp = cv2.filter2D(gray, -1, sharpen_kernel)
-    
-    # Apply thresholding
-    _, thresh = cv2.threshold(sharp, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    
-    return thresh, img
-
 def extract_text_and_numbers(image_np):
     """Extracts text and numbers from an image using EasyOCR."""
     results = reader.readtext(image_np, detail=0, paragraph=False)
@@ -0,0 +1,64 @@
+"""Backpressure and CORS of the ASGI entry point (asgi_app.py).
+
+The OCR work is replaced by a slow stand-in, so neither the pool nor an OCR
+backend is started.
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+
+import httpx
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asgi_app  # noqa: E402
+import uploads  # noqa: E402
+
+ORIGIN = asgi_app.ALLOWED_ORIGINS[0]
+
+
+def png_bytes():
+    buf = io.BytesIO()
+    Image.fromarray(np.full((64, 96, 3), 200, np.uint8)).save(buf, 'PNG')
+    return buf.getvalue()
+
+
+async def post_all(count):
+    transport = httpx.ASGITransport(app=asgi_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        return await asyncio.gather(*[
+            client.post('/extract-id-number', files={'file': ('card.png', png_bytes(), 'image/png')},
+                        headers={'Origin': ORIGIN})
+            for _ in range(count)])
+
+
+def test_burst_beyond_the_slots_is_refused_with_503(monkeypatch):
+    def slow_ocr(stream):
+        time.sleep(0.3)
+        return {'ok': True}
+
+    monkeypatch.setattr(asgi_app.newLogic, 'process_id_image', slow_ocr)
+    monkeypatch.setattr(asgi_app, 'slots', asyncio.Semaphore(2))
+    responses = asyncio.run(post_all(5))
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200, 200, 503, 503, 503]
+    refused = [response for response in responses if response.status_code == 503]
+    assert all(response.headers['Retry-After'] for response in refused)
+    assert all(response.headers['access-control-allow-origin'] == ORIGIN for response in refused)
+
+
+def test_early_413_carries_cors_headers():
+    async def post_oversized():
+        transport = httpx.ASGITransport(app=asgi_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+            return await client.post('/extract-id-number', content=b'x' * (uploads.MAX_UPLOAD_BYTES + 1),
+                                     headers={'Origin': ORIGIN, 'Content-Type': 'multipart/form-data; boundary=x'})
+
+    response = asyncio.run(post_oversized())
+    assert response.status_code == 413
+    assert response.headers['access-control-allow-origin'] == ORIGIN
@@ -0,0 +1,82 @@
+"""Gemini image payloads (gemini_input.py) and the card crop they are taken from.
+
+Uses a synthetic card, drawn with OpenCV, lying on a dark desk.
+"""
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gemini_input  # noqa: E402
+import preprocessing  # noqa: E402
+
+CARD_HEIGHT, CARD_WIDTH = 638, 1012
+MAGIC = {'jpeg': (b'\xff\xd8\xff', 0), 'webp': (b'WEBP', 8)}
+
+
+def card_on_desk():
+    """A 1600x1200 RGB frame with a light card in the middle."""
+    card = np.full((CARD_HEIGHT, CARD_WIDTH, 3), 235, np.uint8)
+    cv2.putText(card, 'Ravi Kumar', (60, 200), cv2.FONT_HERSHEY_SIMPLEX, 2, (20, 20, 20), 4)
+    cv2.putText(card, 'ravi@acme.com', (60, 350), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (20, 20, 20), 3)
+    frame = np.full((1200, 1600, 3), 60, np.uint8)
+    frame[280:280 + CARD_HEIGHT, 294:294 + CARD_WIDTH] = card
+    return frame
+
+
+def decode(part):
+    return cv2.imdecode(np.frombuffer(part['data'], np.uint8), cv2.IMREAD_COLOR)
+
+
+@pytest.mark.parametrize('image_format', ['jpeg', 'webp'])
+def test_payload_is_encoded_in_the_requested_format(image_format):
+    frame = card_on_desk()
+
+    part = gemini_input.prepare_image(frame, image_format=image_format)
+
+    assert part['mime_type'] == f'image/{image_format}'
+    magic, offset = MAGIC[image_format]
+    assert part['data'][offset:offset + len(magic)] == magic
+    assert len(part['data']) < frame.nbytes // 10
+
+
+@pytest.mark.parametrize('max_edge', [512, 1024])
+def test_payload_is_scaled_down_to_the_edge_cap(max_edge):
+    frame = card_on_desk()
+
+    height, width = decode(gemini_input.prepare_image(frame, max_edge=max_edge)).shape[:2]
+
+    assert max(height, width) == max_edge
+    assert width / height == pytest.approx(frame.shape[1] / frame.shape[0], rel=0.01)
+
+
+def test_small_image_is_not_upscaled():
+    frame = card_on_desk()
+    small = cv2.resize(frame, (400, 300), interpolation=cv2.INTER_AREA)
+
+    assert decode(gemini_input.prepare_image(small)).shape[:2] == (300, 400)
+
+
+def test_payload_is_taken_from_the_detected_card():
+    frame = card_on_desk()
+
+    card = preprocessing.crop_to_card(frame)
+
+    # The desk is cut away: the crop is about the card's size and light throughout
+    assert card.shape[:2] != frame.shape[:2]
+    assert card.shape[0] == pytest.approx(CARD_HEIGHT, rel=0.02)
+    assert card.shape[1] == pytest.approx(CARD_WIDTH, rel=0.02)
+    assert np.median(card[:20]) > 200 and np.median(card[-20:]) > 200
+    height, width = decode(gemini_input.prepare_image(card)).shape[:2]
+    assert max(height, width) <= gemini_input.GEMINI_MAX_EDGE
+    assert width / height == pytest.approx(CARD_WIDTH / CARD_HEIGHT, rel=0.02)
+
+
+def test_frame_without_a_card_is_sent_whole():
+    desk = np.full((600, 800, 3), 60, np.uint8)
+
+    assert preprocessing.crop_to_card(desk) is desk
@@ -0,0 +1,154 @@
+"""Gemini vs local OCR race, concurrency gate and circuit breaker (gemini_race.py).
+
+Gemini is played by fake_gemini.FakeGenerativeModel with a fixed latency or
+failure rate; the local OCR result is a future completed by the test.
+"""
+import json
+import os
+import sys
+import time
+from concurrent.futures import Future
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_gemini import BUSINESS_CARD_ANSWER, FakeGenerativeModel  # noqa: E402
+from gemini_race import CircuitBreaker, GeminiGate, race  # noqa: E402
+
+OCR_ANSWER = {'name': 'Local Reader'}
+PROMPT = [{'text': 'Extract the business card details as JSON.'}]
+
+
+def call_gemini(model):
+    return model.generate_content(PROMPT)
+
+
+def finish_gemini(response):
+    answer = json.loads(response.text.strip().removeprefix('```json').removesuffix('```'))
+    return answer, bool(answer.get('name'))
+
+
+def finish_ocr(answer):
+    return answer, bool(answer.get('name'))
+
+
+def ocr_result(answer=OCR_ANSWER):
+    future = Future()
+    future.set_result(answer)
+    return future
+
+
+def wait_for(condition, timeout=2.0):
+    """Polls ``condition``; the gate's done callback may run just after ``result()`` returns."""
+    expires = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > expires:
+            raise AssertionError('condition not met in time')
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def gate():
+    gate = GeminiGate(max_concurrency=2, breaker=CircuitBreaker(failures=3, cooldown=0.3))
+    yield gate
+    gate._executor.shutdown(wait=True)
+
+
+def test_first_answers_with_a_valid_ocr_result_without_waiting(gate):
+    gemini = gate.submit(call_gemini, FakeGenerativeModel(latency=1.0))
+
+    started = time.monotonic()
+    source, response = race(ocr_result(), finish_ocr, gemini, finish_gemini, deadline=2, policy='first')
+
+    assert (source, response) == ('ocr', OCR_ANSWER)
+    assert time.monotonic() - started < 0.5
+
+
+def test_first_falls_back_to_invalid_ocr_once_the_deadline_passes(gate):
+    gemini = gate.submit(call_gemini, FakeGenerativeModel(latency=1.0))
+
+    started = time.monotonic()
+    source, response = race(ocr_result({}), finish_ocr, gemini, finish_gemini, deadline=0.2, policy='first')
+
+    elapsed = time.monotonic() - started
+    assert (source, response) == ('ocr', {})
+    assert 0.2 <= elapsed < 0.8
+    assert not gemini.done()
+
+
+def test_first_takes_gemini_when_ocr_found_nothing(gate):
+    gemini = gate.submit(call_gemini, FakeGenerativeModel(latency=0.1))
+
+    source, response = race(ocr_result({}), finish_ocr, gemini, finish_gemini, deadline=2, policy='first')
+
+    assert (source, response) == ('gemini', BUSINESS_CARD_ANSWER)
+
+
+def test_prefer_gemini_waits_for_gemini(gate):
+    gemini = gate.submit(call_gemini, FakeGenerativeModel(latency=0.3))
+
+    started = time.monotonic()
+    source, response = race(ocr_result(), finish_ocr, gemini, finish_gemini, deadline=2, policy='prefer_gemini')
+
+    assert (source, response) == ('gemini', BUSINESS_CARD_ANSWER)
+    assert time.monotonic() - started >= 0.3
+
+
+def test_prefer_gemini_uses_ocr_after_the_deadline(gate):
+    gemini = gate.submit(call_gemini, FakeGenerativeModel(latency=1.0))
+
+    source, response = race(ocr_result(), finish_ocr, gemini, finish_gemini, deadline=0.2, policy='prefer_gemini')
+
+    assert (source, response) == ('ocr', OCR_ANSWER)
+
+
+def test_gemini_failure_falls_back_to_ocr(gate):
+    gemini = gate.submit(call_gemini, FakeGenerativeModel(latency=0.05, fail=1.0))
+
+    source, response = race(ocr_result(), finish_ocr, gemini, finish_gemini, deadline=2, policy='prefer_gemini')
+
+    assert (source, response) == ('ocr', OCR_ANSWER)
+
+
+def test_gate_skips_gemini_beyond_max_concurrency(gate):
+    model = FakeGenerativeModel(latency=0.3)
+    running = [gate.submit(call_gemini, model), gate.submit(call_gemini, model)]
+
+    assert all(running)
+    assert gate.submit(call_gemini, model) is None
+    assert model.calls == 2
+
+    for future in running:
+        future.result()
+    wait_for(lambda: gate._slots._value == gate.max_concurrency)
+    assert gate.submit(call_gemini, model).result().text
+
+
+def test_breaker_opens_after_consecutive_failures_and_recovers_after_cooldown(gate):
+    failing = FakeGenerativeModel(latency=0, fail=1.0)
+    for count in range(1, 4):
+        future = gate.submit(call_gemini, failing)
+        with pytest.raises(RuntimeError):
+            future.result()
+        wait_for(lambda: gate.breaker._consecutive == count)
+    assert gate.breaker.state == 'open'
+    assert gate.submit(call_gemini, failing) is None
+    assert failing.calls == 3
+
+    # Half-open after the cooldown: one probe goes out, a failed probe reopens
+    time.sleep(0.35)
+    assert gate.breaker.state == 'half_open'
+    probe = gate.submit(call_gemini, failing)
+    assert gate.submit(call_gemini, failing) is None
+    with pytest.raises(RuntimeError):
+        probe.result()
+    wait_for(lambda: gate.breaker.state == 'open')
+
+    # A successful probe closes it again
+    time.sleep(0.35)
+    working = FakeGenerativeModel(latency=0)
+    gate.submit(call_gemini, working).result()
+    wait_for(lambda: gate.breaker.state == 'closed')
+    assert gate.submit(call_gemini, working).result().text
+    assert working.calls == 2
@@ -0,0 +1,135 @@
+"""Aadhaar and PAN validation and OCR-error correction (id_validation.py)."""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from id_validation import (PAN_HOLDER_TYPES, correct_aadhaar, correct_pan, find_candidates,  # noqa: E402
+                           is_valid_aadhaar, is_valid_number, is_valid_pan, rank_numbers,
+                           validate_aadhaar_batch, verhoeff_check_digit, verhoeff_valid)
+
+VALID_AADHAAR = ['234567890124', '999999999999', '500000000006', '876543210988']
+
+
+def digits(number):
+    return np.array([int(char) for char in number])
+
+
+@pytest.mark.parametrize('number', VALID_AADHAAR)
+def test_known_valid_aadhaar_numbers(number):
+    assert is_valid_aadhaar(number)
+    assert verhoeff_check_digit(number[:-1]) == int(number[-1])
+    assert correct_aadhaar(number) == (number, 0)
+
+
+@pytest.mark.parametrize('number', ['034567890124', '134567890124', '23456789012', '2345678901245'])
+def test_aadhaar_shape(number):
+    # Aadhaar numbers never start with 0 or 1, and have exactly 12 digits
+    assert not is_valid_aadhaar(number)
+
+
+def test_every_single_digit_error_fails_the_checksum():
+    number = VALID_AADHAAR[0]
+    for position in range(12):
+        for digit in '0123456789':
+            if digit != number[position]:
+                misread = number[:position] + digit + number[position + 1:]
+                assert not verhoeff_valid(digits(misread))[0], misread
+
+
+def test_every_adjacent_transposition_fails_the_checksum():
+    for number in VALID_AADHAAR:
+        for position in range(11):
+            if number[position] != number[position + 1]:
+                swapped = number[:position] + number[position + 1] + number[position] + number[position + 2:]
+                assert not is_valid_aadhaar(swapped), swapped
+
+
+def test_verhoeff_valid_checks_each_row():
+    rows = np.stack([digits('234567890124'), digits('234567890125'), digits('999999999999')])
+
+    assert verhoeff_valid(rows).tolist() == [True, False, True]
+    assert validate_aadhaar_batch(['234567890124', '234567890125', '23456789012X', '134567890124']).tolist() == \
+        [True, False, False, False]
+    assert validate_aadhaar_batch([]).shape == (0,)
+
+
+@pytest.mark.parametrize('reading, fixes', [
+    ('2345 67B9 O124', 2),   # B -> 8, O -> 0
+    ('23456789O124', 1),
+    ('2345678901Z4', 1),
+    ('234S6789OI24', 3),     # S -> 5, O -> 0, I -> 1
+])
+def test_correct_aadhaar_fixes_letters_read_for_digits(reading, fixes):
+    number, cost = correct_aadhaar(reading)
+
+    assert number == '234567890124'
+    assert cost == fixes * 0.5
+
+
+@pytest.mark.parametrize('reading', [
+    '234567890125',     # a digit misread as another digit is not guessed at
+    '234567890214',     # transposed
+    '2345 67B9 O125',   # letters fixed, but the checksum still fails
+    'ABCDEFGH0124',     # too few real digits to be a number
+])
+def test_correct_aadhaar_rejects_readings_that_do_not_validate(reading):
+    assert correct_aadhaar(reading) is None
+
+
+@pytest.mark.parametrize('holder_type', list(PAN_HOLDER_TYPES))
+def test_pan_holder_types(holder_type):
+    assert is_valid_pan(f'ABC{holder_type}E1234F')
+
+
+@pytest.mark.parametrize('holder_type', sorted(set('ABCDEFGHIJKLMNOPQRSTUVWXYZ') - set(PAN_HOLDER_TYPES)))
+def test_pan_with_another_fourth_letter_is_invalid(holder_type):
+    number = f'ABC{holder_type}E1234F'
+
+    assert not is_valid_pan(number)
+    assert correct_pan(number) is None
+
+
+@pytest.mark.parametrize('reading, number', [
+    ('ABCPE1234F', 'ABCPE1234F'),
+    ('ABCPE1S34F', 'ABCPE1534F'),   # S read for 5 in a digit position
+    ('ABCPE12B4F', 'ABCPE1284F'),   # B for 8
+    ('ABCPEI234F', 'ABCPE1234F'),   # I for 1
+    ('ABCPE12O4F', 'ABCPE1204F'),   # O for 0
+    ('A8CPE1234F', 'ABCPE1234F'),   # 8 read for B in a letter position
+    ('AB5PE1234F', 'ABSPE1234F'),   # 5 for S
+    ('0BCPE1234F', 'OBCPE1234F'),   # 0 for O
+    ('ABCPE1234I', 'ABCPE1234I'),
+    ('ABCP81234I', 'ABCPB1234I'),   # 8 for B in the last letter before the digits
+    ('ABCP8I234F', 'ABCPB1234F'),   # one fix of each kind
+])
+def test_correct_pan_fixes_the_character_class(reading, number):
+    fixes = sum(a != b for a, b in zip(reading, number))
+
+    assert correct_pan(reading) == (number, fixes * 0.5)
+    assert is_valid_number(number)
+
+
+@pytest.mark.parametrize('reading', [
+    'A8C1E12S4F',   # three fixes is more than a confident reading
+    'A3CPE1234F',   # 3 has no letter reading
+    'ABCPE1K34F',   # K has no digit reading
+    'ABC1E1234F',   # 1 -> I, which is not a holder type
+])
+def test_correct_pan_rejects_unfixable_readings(reading):
+    assert correct_pan(reading) is None
+
+
+def test_find_candidates_corrects_and_penalizes():
+    text = 'Aadhaar 2345 67B9 O124 PAN abcpe1s34f ref 234567890125'
+
+    found = [(number, round(penalty, 4)) for _, _, number, penalty in find_candidates(text)]
+
+    assert found == [('234567890124', round(0.85 ** 1.0, 4)), ('ABCPE1534F', round(0.85 ** 0.5, 4)),
+                     ('234567890125', 1.0)]
+    assert rank_numbers(['234567890125', 'ABCPE1534F', '234567890124', 'ABCPE1534F'],
+                        {'234567890125': 0.99, '234567890124': 0.6, 'ABCPE1534F': 0.7}) == \
+        ['ABCPE1534F', '234567890124', '234567890125']
@@ -0,0 +1,48 @@
+"""OCR pool (ocr_pool.py) recovery from a worker that dies mid-job.
+
+Workers are forked with a stand-in reader, so no OCR backend is needed.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ocr_pool  # noqa: E402
+
+
+def _die():
+    os._exit(1)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    # Forked workers inherit the parent's reader instead of building one
+    monkeypatch.setattr(ocr_pool, '_worker_reader', object())
+    pool = ocr_pool.OCRPool(workers=1, queue_size=1, preload=True)
+    yield pool
+    pool.shutdown()
+
+
+def test_dead_worker_is_a_503_and_the_pool_recovers(pool):
+    first = pool.run(ocr_pool._ping)
+
+    with pytest.raises(ocr_pool.WorkerLost) as lost:
+        pool.run(_die)
+    assert isinstance(lost.value, ocr_pool.PoolSaturated)
+    assert lost.value.retry_after == ocr_pool.OCR_RETRY_AFTER
+
+    assert pool.run(ocr_pool._ping) != first
+    stats = pool.stats()
+    assert stats['restarts'] == 1
+    assert stats['in_flight'] == 0
+
+
+def test_newlogic_answers_503_with_retry_after():
+    import newLogic
+
+    with newLogic.app.test_request_context():
+        response, status = newLogic.ocr_unavailable_response(ocr_pool.WorkerLost())
+    assert status == 503
+    assert response.headers['Retry-After'] == str(ocr_pool.OCR_RETRY_AFTER)
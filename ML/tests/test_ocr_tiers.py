@@ -0,0 +1,67 @@
+"""ID OCR passes (ocr_tiers.py) on the grayscale input the lightweight app reads.
+
+Run from ML/ with ``python -m pytest tests``; no OCR backend is needed, the
+recognizer is replaced by a pass that reads the card badly, so every tier runs.
+"""
+import os
+import sys
+
+import cv2
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ocr_tiers  # noqa: E402
+import preprocessing  # noqa: E402
+
+
+def card_image():
+    """An RGB ID card with three lines of text."""
+    img = np.full((638, 1012, 3), 235, np.uint8)
+    for row, text in enumerate(['GOVERNMENT OF INDIA', 'Ravi Kumar', '2345 6789 0124']):
+        cv2.putText(img, text, (60, 150 + row * 120), cv2.FONT_HERSHEY_SIMPLEX, 1.4, (30, 30, 30), 3)
+    return img
+
+
+def poor_read(seen):
+    """A pass that reads the text with low confidence and finds no number."""
+    def read(image):
+        seen.append(image.shape)
+        return [], [([[0, 0], [1, 0], [1, 1], [0, 1]], 'G0VT 0F lND1A', 0.2)]
+    return read
+
+
+def test_alternate_pass_from_grayscale_source():
+    gray = cv2.cvtColor(card_image(), cv2.COLOR_RGB2GRAY)
+    seen = []
+    result = ocr_tiers.read_id_tiered(poor_read(seen), gray, gray, tiers=['fast', 'full', 'alternate'])
+    assert result.passes == 3
+    assert [len(shape) for shape in seen] == [2, 2, 2]
+    assert result.texts == ['G0VT 0F lND1A']
+
+
+def test_quality_of_grayscale_frame():
+    gray = cv2.cvtColor(card_image(), cv2.COLOR_RGB2GRAY)
+    quality = preprocessing.analyze_quality(gray)
+    assert quality['saturation'] == 0.0
+    assert preprocessing.choose_profile(quality) in preprocessing.PROFILES
+    for profile in preprocessing.PROFILES:
+        assert preprocessing.apply_profile(gray, profile).shape == gray.shape
+
+
+def test_lightweight_app_runs_every_pass(monkeypatch):
+    import lightweight_app
+
+    seen = []
+    monkeypatch.setattr(lightweight_app, 'ID_ROI', True)
+    monkeypatch.setattr(lightweight_app, 'get_ocr_reader', lambda: object())
+    monkeypatch.setattr(lightweight_app, 'read_id_numbers', lambda reader, image, detail=0: poor_read(seen)(image))
+
+    gray, card, _ = lightweight_app.lightweight_preprocess(Image.fromarray(card_image()))
+    assert gray.ndim == 2 and card.ndim == 3
+    numbers, texts, confidences = lightweight_app.extract_text_lightweight(gray, card)
+    # A failed pass would have been swallowed into ([], [], {})
+    assert len(seen) == 3
+    assert texts == ['G0VT 0F lND1A']
+    assert numbers == [] and confidences == {}
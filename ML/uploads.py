@@ -0,0 +1,181 @@
+"""Streaming, size-limited upload handling for the Flask apps.
+
+By default Werkzeug spools every multipart file to memory or disk in full and
+only then hands it to the view. With ``init_app`` the file part is inspected
+while it streams in instead:
+
+* the request is refused with 413 once it passes MAX_UPLOAD_MB, either up
+  front from Content-Length or mid-stream for chunked bodies;
+* the first bytes must carry a JPEG or PNG signature (415 otherwise);
+* the pixel dimensions are read from the PNG IHDR / JPEG SOF header as soon
+  as it arrives and anything above MAX_IMAGE_PIXELS or MAX_IMAGE_SIDE is
+  refused with 413, before a single pixel is decoded.
+
+Accepted data is spooled to a SpooledTemporaryFile, so only small uploads
+stay in memory.
+
+Views marked with ``accepts_archives`` (the batch endpoints) also take zip
+archives, up to MAX_BATCH_UPLOAD_MB per request; the images inside are
+checked one by one when the batch is processed (see batch.py).
+"""
+import os
+import struct
+from tempfile import SpooledTemporaryFile
+
+from flask import Request, current_app, jsonify
+from PIL import Image
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+# Upload limits (overridable through environment variables)
+MAX_UPLOAD_MB = float(os.environ.get('MAX_UPLOAD_MB', 10))
+MAX_UPLOAD_BYTES = int(MAX_UPLOAD_MB * 1024 * 1024)
+MAX_BATCH_UPLOAD_MB = float(os.environ.get('MAX_BATCH_UPLOAD_MB', 50))
+MAX_BATCH_UPLOAD_BYTES = int(MAX_BATCH_UPLOAD_MB * 1024 * 1024)
+MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 40_000_000))
+MAX_IMAGE_SIDE = int(os.environ.get('MAX_IMAGE_SIDE', 10000))
+# Uploads up to this size stay in memory, larger ones spill to a temp file
+UPLOAD_SPOOL_BYTES = int(os.environ.get('UPLOAD_SPOOL_BYTES', 512 * 1024))
+# How far into the file we look for the dimensions before leaving it to PIL
+HEADER_SNIFF_BYTES = 256 * 1024
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+JPEG_SIGNATURE = b'\xff\xd8\xff'
+ZIP_SIGNATURE = b'PK\x03\x04'
+# SOF markers that carry the frame size (C4, C8 and CC are not frames)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def sniff_format(header):
+    """Returns 'JPEG' or 'PNG' from the leading bytes, None if unrecognised."""
+    if header.startswith(JPEG_SIGNATURE):
+        return 'JPEG'
+    if header.startswith(PNG_SIGNATURE):
+        return 'PNG'
+    return None
+
+
+def sniff_dimensions(header, image_format):
+    """Reads (width, height) from the header bytes, or None if not there yet."""
+    if image_format == 'PNG':
+        if len(header) < 24:
+            return None
+        width, height = struct.unpack('>II', header[16:24])
+        return width, height
+
+    # Walk the JPEG marker segments until a start-of-frame shows up
+    offset = 2
+    while offset + 4 <= len(header):
+        if header[offset] != 0xFF:
+            offset += 1
+            continue
+        marker = header[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        segment_length = struct.unpack('>H', header[offset + 2:offset + 4])[0]
+        if marker in JPEG_SOF_MARKERS:
+            if offset + 9 > len(header):
+                return None
+            height, width = struct.unpack('>HH', header[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + segment_length
+    return None
+
+
+def check_header(header):
+    """Validates the leading bytes of an upload against the type and size limits.
+
+    Returns ``(format, dimensions)``; dimensions is None while the header has
+    not arrived in full yet.
+    """
+    image_format = sniff_format(header)
+    if image_format is None:
+        raise UnsupportedMediaType('Invalid file type. Allowed types: jpg, jpeg, png')
+    dimensions = sniff_dimensions(header, image_format)
+    if dimensions is not None:
+        width, height = dimensions
+        if max(width, height) > MAX_IMAGE_SIDE or width * height > MAX_IMAGE_PIXELS:
+            raise RequestEntityTooLarge(f'Image dimensions {width}x{height} are too large')
+    return image_format, dimensions
+
+
+class SniffingStream:
+    """Write target for one uploaded file that validates it as it arrives."""
+
+    def __init__(self, max_bytes, spool_bytes=UPLOAD_SPOOL_BYTES, allow_archives=False):
+        self.max_bytes = max_bytes
+        self.allow_archives = allow_archives
+        self.size = 0
+        self.image_format = None
+        self.dimensions = None
+        self._header = b''
+        self._file = SpooledTemporaryFile(max_size=spool_bytes, mode='w+b')
+
+    def write(self, data):
+        self.size += len(data)
+        if self.image_format == 'ZIP':
+            if self.max_bytes and self.size > self.max_bytes:
+                raise RequestEntityTooLarge(f'Upload exceeds the {MAX_BATCH_UPLOAD_MB:g} MB batch limit')
+        elif self.size > min(self.max_bytes or MAX_UPLOAD_BYTES, MAX_UPLOAD_BYTES):
+            raise RequestEntityTooLarge(f'Upload exceeds the {MAX_UPLOAD_MB:g} MB limit')
+        if self.dimensions is None and self.image_format != 'ZIP' and len(self._header) < HEADER_SNIFF_BYTES:
+            self._inspect(data)
+        return self._file.write(data)
+
+    def _inspect(self, data):
+        self._header += data[:HEADER_SNIFF_BYTES - len(self._header)]
+        if len(self._header) < len(PNG_SIGNATURE):
+            return
+        if self.allow_archives and self._header.startswith(ZIP_SIGNATURE):
+            # The images inside are checked when the archive is unpacked
+            self.image_format = 'ZIP'
+            self._header = b''
+            return
+        self.image_format, self.dimensions = check_header(self._header)
+        if self.dimensions is not None:
+            self._header = b''
+
+    def __getattr__(self, name):
+        # read/seek/tell/close etc. go to the spooled file
+        return getattr(self._file, name)
+
+
+def accepts_archives(view):
+    """Marks a view whose file parts may also be zip archives of images."""
+    view.accepts_archives = True
+    return view
+
+
+class UploadRequest(Request):
+    """Request class that streams file parts through a SniffingStream."""
+
+    @property
+    def accepts_archives(self):
+        view = current_app.view_functions.get(self.endpoint) if self.endpoint else None
+        return getattr(view, 'accepts_archives', False)
+
+    @property
+    def max_content_length(self):
+        if self.accepts_archives:
+            return MAX_BATCH_UPLOAD_BYTES
+        return super().max_content_length
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SniffingStream(self.max_content_length, allow_archives=self.accepts_archives)
+
+
+def _error_response(error):
+    return jsonify({'error': error.description}), error.code
+
+
+def init_app(app):
+    """Installs the upload limits and streaming file handling on a Flask app."""
+    app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+    app.request_class = UploadRequest
+    app.register_error_handler(RequestEntityTooLarge, _error_response)
+    app.register_error_handler(UnsupportedMediaType, _error_response)
+    # Decompression-bomb guard for anything the header sniffing could not size
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
@@ -0,0 +1,76 @@
+"""Model warm-up and readiness tracking.
+
+Loading the EasyOCR detector and recognizer is the slow part of a cold start,
+and the first ``readtext`` afterwards still pays for lazy allocations. The
+apps therefore load and exercise the model once up front and only report
+ready afterwards; liveness (the process answers HTTP) is reported separately.
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# Taken when the first app module imports this one, close enough to process start
+PROCESS_STARTED = time.perf_counter()
+
+
+def dummy_card():
+    """Small synthetic text image that goes through detection and recognition."""
+    image = np.full((160, 640), 255, dtype=np.uint8)
+    cv2.putText(image, 'WARM UP CARD', (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.4, 0, 3)
+    cv2.putText(image, '1234 5678 9012', (20, 130), cv2.FONT_HERSHEY_SIMPLEX, 1.4, 0, 3)
+    return image
+
+
+def warm_up(reader):
+    """Runs one dummy inference so weights are paged in and buffers allocated.
+
+    Returns the time it took in seconds.
+    """
+    started = time.perf_counter()
+    reader.readtext(dummy_card(), detail=0, paragraph=False)
+    return time.perf_counter() - started
+
+
+class Readiness:
+    """Tracks whether the OCR model of an app is loaded and warmed up."""
+
+    def __init__(self, name):
+        self.name = name
+        self.ready = False
+        self.error = None
+        self.startup_seconds = None
+        self.warmup_seconds = None
+        self._lock = threading.Lock()
+
+    def mark_ready(self, warmup_seconds=None):
+        with self._lock:
+            self.ready = True
+            self.error = None
+            self.warmup_seconds = warmup_seconds
+            self.startup_seconds = time.perf_counter() - PROCESS_STARTED
+        warmup = f" (warm-up inference {warmup_seconds:.2f}s)" if warmup_seconds is not None else ""
+        print(f"[{self.name}] ready {self.startup_seconds:.2f}s after start{warmup}")
+
+    def mark_failed(self, error):
+        with self._lock:
+            self.ready = False
+            self.error = str(error)
+        print(f"[{self.name}] warm-up failed: {error}")
+
+    def mark_unready(self, reason):
+        """Takes the app out of rotation, e.g. while it restarts."""
+        with self._lock:
+            self.ready = False
+            self.error = reason
+        print(f"[{self.name}] not ready: {reason}")
+
+    def status(self):
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'startup_seconds': round(self.startup_seconds, 2) if self.startup_seconds is not None else None,
+                'warmup_seconds': round(self.warmup_seconds, 2) if self.warmup_seconds is not None else None,
+                'error': self.error,
+            }